@@ -19,9 +19,123 @@ class Settings(BaseSettings):
         "http://localhost:4173",
     ]
 
+    # CHW guide retrieval (ChromaDB built by chroma_generate.py)
+    chroma_path: str = "./chw_sentence_db"
+    chroma_collection: str = "chw_sentences"
+    rag_top_k: int = 3
+    rag_sources: list[str] = []  # restrict retrieval to these documents; empty = all
+    chroma_retry_base_seconds: float = 5.0  # after a failed Chroma/embedding load, wait before retrying
+    chroma_retry_max_seconds: float = 300.0  # (doubling per failure, up to this)
+
+    # RAG report generation (/generate-report)
+    rag_max_concurrency: int = 8
+    rag_timeout_seconds: float = 30.0
+    rag_max_retries: int = 2
+    rag_retry_backoff_seconds: float = 0.5
+
+    # Semantic cache in front of the RAG solution call
+    solution_cache_enabled: bool = True
+    solution_cache_path: str = "./cache/solution_cache.json"
+    solution_cache_max_entries: int = 1000
+    solution_cache_ttl_seconds: int = 7 * 24 * 3600
+    solution_cache_semantic: bool = True  # embedding-similarity lookup on top of exact match
+    solution_cache_similarity: float = 0.92  # cosine similarity needed for a semantic hit
+    solution_cache_save_every: int = 10  # writes between saves to disk
+
+    # /upload-full-audio streaming
+    upload_max_bytes: int = 1024 * 1024 * 1024  # 1 GB; larger uploads get HTTP 413
+    upload_chunk_bytes: int = 1024 * 1024
+
+    # Audio analysis
+    pitch_backend: str = "yin"  # "yin" (fast, 16 kHz) or "pyin" (librosa, native rate)
+    pitch_vad: bool = True  # skip silent frames in the yin backend
+    audio_analysis_mode: str = "auto"  # "full", "streaming" or "auto" (stream large files)
+    audio_streaming_min_bytes: int = 5 * 1024 * 1024
+    audio_block_seconds: float = 30.0
+    audio_pcm_cache_dir: str | None = None  # temp dir for decoded PCM of non-WAV uploads
+    audio_pool_workers: int = 2  # processes running analyze_audio_signal
+    audio_pool_max_pending: int = 8  # queued + running jobs before uploads get HTTP 503
+    audio_pool_retry_after_seconds: int = 10
+
+    # /generate-report PDF rendering
+    report_pool_workers: int = 2  # processes running render_pdf_report
+    report_pool_max_pending: int = 16  # queued + running renders before /generate-report gets HTTP 503
+    report_pool_retry_after_seconds: int = 5
+    report_store_dir: str = ""  # when set, keep the latest report per session as <dir>/<session_id>.pdf
+    bulk_export_max_in_flight: int = 4  # sessions loaded/rendering at once in /reports/bulk
+
+    # /ws/audio streaming transcription
+    stream_transcription_backend: str = "openai"  # "openai" (whisper-1) or "faster-whisper" (local CPU)
+    stream_segmentation: str = "vad"  # "vad" (complete utterances) or "blob" (one call per blob)
+    stream_sample_rate: int = 16000
+    stream_vad_threshold_db: float = -45.0  # frame RMS (dBFS) counted as speech
+    stream_min_silence_ms: int = 500  # silence that ends an utterance
+    stream_min_speech_ms: int = 300  # shorter bursts are dropped as noise
+    stream_max_utterance_seconds: float = 15.0  # force a cut in long monologues
+    stream_overlap_seconds: float = 0.3  # audio carried into the next utterance
+    faster_whisper_model: str = "tiny.en"
+
+    # Local first-stage filter before gpt-4o-mini cue classification
+    cue_filter_enabled: bool = True
+    cue_filter_threshold: float = 0.35  # statements scoring below this skip the LLM
+    cue_filter_embeddings: bool = True  # add the embedding-prototype stage to the lexicon
+
+    # Process-wide micro-batching of realtime cue classification
+    cue_batch_enabled: bool = True
+    cue_batch_max_wait_ms: float = 20.0  # longest a statement waits for others to join its batch
+    cue_batch_max_batch: int = 8  # statements per gpt-4o-mini request
+
+    # /ws/audio per-connection pipeline (receive -> transcribe -> classify -> send)
+    ws_audio_queue_size: int = 8  # blobs; the oldest is dropped when full
+    ws_transcript_queue_size: int = 8  # utterances waiting for classification
+    ws_send_queue_size: int = 32  # cue messages waiting to be sent
+    ws_coalesce_max_chars: int = 1000  # max text merged into one classification call
+
+    # Map-reduce analysis of long transcripts
+    long_transcript_chars: int = 15000  # longer transcripts are analyzed in parts; 0 disables
+    long_transcript_chunk_chars: int = 6000
+    long_transcript_overlap_sentences: int = 2  # preceding-context sentences given to each part
+    long_transcript_max_concurrency: int = 4
+
+    # Content-addressed cache of /upload-full-audio stage results
+    upload_cache_enabled: bool = True
+    upload_cache_dir: str = "./cache/uploads"
+
+    # Encounter form extraction
+    combined_form_extraction: bool = True  # one GPT-4o request for analysis + encounter form
+    form_cache_dir: str = "./cache/forms"  # forms keyed by transcript hash for /extract-form-data
+
+    # Session/form store (app/services/session_store.py)
+    session_db_path: str = "./aurion_sessions.db"  # SQLite (WAL) file for sessions, analyses, forms, reports
+    session_store_batch_size: int = 256  # most queued writes committed in one transaction
+
+    # Trace spans (app/services/tracing.py, /metrics/traces)
+    trace_buffer_size: int = 2000  # most recent finished spans kept in memory
+    trace_log_enabled: bool = False  # also print every span as one JSON line
+
+    # LLM token accounting (/metrics/llm)
+    llm_usage_max_sessions: int = 1000  # per-session breakdowns kept (least recently used dropped)
+
+    # Resilient OpenAI client (app/services/llm_client.py)
+    llm_timeout_seconds: float = 120.0  # per attempt
+    llm_deadline_seconds: float = 300.0  # whole call, retries included
+    llm_realtime_timeout_seconds: float = 8.0  # /ws/audio cue classification and transcription
+    llm_realtime_deadline_seconds: float = 15.0
+    llm_max_retries: int = 3
+    llm_retry_base_seconds: float = 0.5  # full-jitter exponential backoff
+    llm_retry_max_seconds: float = 10.0
+    llm_hedge_after_seconds: float = 2.0  # duplicate a slow realtime request (0 disables)
+    llm_breaker_failure_threshold: int = 5  # failures (in the window) needed to open a model's breaker
+    llm_breaker_failure_ratio: float = 0.5  # ...and the share of the window they must make up
+    llm_breaker_window: int = 20  # most recent attempts considered
+    llm_breaker_reset_seconds: float = 30.0
+    llm_max_concurrency: int = 64  # process-wide OpenAI requests in flight
+    llm_max_requests_per_second: float = 0.0  # process-wide start rate (0 = unlimited)
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+        extra = "ignore"  # .env also carries OPENAI_API_KEY etc.
 
 
 settings = Settings()
@@ -1,8 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.stream import router as stream_router
+from app.routes.health import router as health_router
+from app.routes.metrics import router as metrics_router
+from app.routes.admin import router as admin_router
+from app.routes.sessions import router as sessions_router
+from app.services.guide_retrieval import init_guide_collection
+from app.services.solution_cache import solution_cache
+from app.services.audio_jobs import start_audio_pool, shutdown_audio_pool
+from app.services.report_jobs import start_report_pool, shutdown_report_pool
+from app.services.session_store import session_store
+from app.services.tracing import trace_requests
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the Chroma collection and load the embedding model once per worker
+    await asyncio.to_thread(init_guide_collection)
+    await asyncio.to_thread(solution_cache.load)
+    await asyncio.to_thread(session_store.open)
+    start_audio_pool()
+    start_report_pool()
+    yield
+    shutdown_report_pool()
+    shutdown_audio_pool()
+    solution_cache.save()
+    session_store.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow React to connect
 app.add_middleware(
@@ -13,7 +42,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One trace per request (X-Trace-Id), request latency and in-flight gauge
+app.middleware("http")(trace_requests)
+
 # Include the WebSocket router from stream.py
 app.include_router(stream_router)
+app.include_router(health_router, tags=["Health"])
+app.include_router(metrics_router, tags=["Metrics"])
+app.include_router(admin_router, tags=["Admin"])
+app.include_router(sessions_router, tags=["Sessions"])
 
-# Run with: uvicorn app.main:app --reload
\ No newline at end of file
+# Run with: uvicorn app.main:app --reload
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException
+
+from app.services.result_cache import form_cache, upload_cache
+from app.services.solution_cache import solution_cache
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/cache/uploads")
+async def list_upload_cache():
+    """
+    List cached /upload-full-audio results
+
+    Returns:
+        dict: One entry per upload digest with its cached stages and size
+    """
+    entries = upload_cache.entries()
+    return {"status": "success", "count": len(entries), "entries": entries}
+
+
+@router.delete("/cache/uploads/{digest}")
+async def evict_upload(digest: str):
+    """
+    Evict every cached stage of one upload
+
+    Args:
+        digest: SHA-256 of the uploaded audio (returned as `upload_digest`)
+    """
+    try:
+        removed = upload_cache.evict(digest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail="Upload not cached.")
+    return {"status": "success", "evicted": digest}
+
+
+@router.delete("/cache/uploads")
+async def clear_upload_cache(older_than_seconds: int | None = None):
+    """
+    Evict all cached uploads, or only those older than `older_than_seconds`
+    """
+    removed = upload_cache.clear(older_than_seconds)
+    return {"status": "success", "evicted": removed}
+
+
+@router.delete("/cache/forms")
+async def clear_form_cache(older_than_seconds: int | None = None):
+    """
+    Evict all cached encounter forms, or only those older than `older_than_seconds`
+    """
+    removed = form_cache.clear(older_than_seconds)
+    return {"status": "success", "evicted": removed}
+
+
+@router.delete("/cache/solutions")
+async def clear_solution_cache():
+    """
+    Drop every cached RAG solution
+    """
+    solution_cache.clear()
+    solution_cache.save()
+    return {"status": "success"}
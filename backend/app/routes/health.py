@@ -1,4 +1,10 @@
+import asyncio
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.routes import stream
+from app.services.guide_retrieval import init_guide_collection
 
 router = APIRouter()
 
@@ -15,3 +21,40 @@ async def health_check():
         "status": "healthy",
         "message": "Voice Recorder API is running"
     }
+
+
+def _check_guide():
+    collection = init_guide_collection()  # retries a failed load once its backoff expires
+    if collection is None:
+        return {"ok": False, "detail": "CHW guide collection not loaded (run chroma_generate.py)"}
+    try:
+        return {"ok": True, "chunks": collection.count()}
+    except Exception as e:
+        return {"ok": False, "detail": f"Chroma query failed: {e}"}
+
+
+def _check_llm():
+    if stream.client is None:
+        return {"ok": False, "detail": "OpenAI client not initialized (OPENAI_API_KEY missing)"}
+    open_breakers = sorted(model for model, breaker in stream.client.breakers.items() if breaker.opened_at is not None)
+    if open_breakers:
+        return {"ok": False, "detail": "Circuit breaker open", "models": open_breakers}
+    return {"ok": True}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness check: the CHW guide collection answers and the OpenAI client
+    is configured with no open circuit breaker
+
+    Returns:
+        dict: `ready` and one entry per check (HTTP 503 when not ready)
+    """
+    checks = {
+        "chroma": await asyncio.to_thread(_check_guide),
+        "llm": _check_llm(),
+    }
+    ready = all(check["ok"] for check in checks.values())
+    body = {"status": "ready" if ready else "not_ready", "checks": checks}
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services import llm_usage, metrics, tracing
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    """
+    Every metric of this worker in the Prometheus text format
+
+    Stage latencies are `stage_seconds{stage=...}` (upload_save,
+    audio_analysis, whisper, llm, rag, pdf_render, http); per LLM call site
+    they are `llm_call_seconds{call_site=...}`.
+    """
+    return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/metrics/summary")
+async def metrics_summary():
+    """
+    Latency histograms, counters and gauges collected by this worker
+
+    Returns:
+        dict: Metric name -> type, description and labelled series
+    """
+    return metrics.snapshot()
+
+
+@router.get("/metrics/llm")
+async def llm_usage_report(sessions: int = 20):
+    """
+    OpenAI token usage, estimated cost and latency
+
+    Args:
+        sessions: How many of the most recent sessions to include
+
+    Returns:
+        dict: Totals, one entry per call site (with its prompt version and
+        latency percentiles) and per-session breakdowns
+    """
+    return llm_usage.report(sessions)
+
+
+@router.get("/metrics/llm/{session_id}")
+async def llm_session_usage(session_id: str):
+    """
+    OpenAI token usage and estimated cost of one session, per call site
+    """
+    report = llm_usage.session_report(session_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No LLM usage recorded for this session.")
+    return report
+
+
+@router.get("/metrics/traces")
+async def recent_traces(session_id: str | None = None, trace_id: str | None = None, limit: int = 100):
+    """
+    Most recent trace spans, newest first
+
+    Args:
+        session_id: Only spans of this session (e.g. SESS-123456)
+        trace_id: Only spans of this request (its `X-Trace-Id` header)
+        limit: Maximum number of spans
+
+    Returns:
+        dict: Spans with trace/span/parent ids, stage, session id, start,
+        duration and status
+    """
+    spans = tracing.recent_spans(session_id, trace_id, max(1, min(limit, 1000)))
+    return {"status": "success", "count": len(spans), "spans": spans}
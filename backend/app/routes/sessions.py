@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.session_store import MAX_PAGE_SIZE, session_store
+
+router = APIRouter()
+
+
+@router.get("/sessions")
+async def list_sessions(patient: str | None = None, chw: str | None = None, cue: str | None = None,
+                        date_from: str | None = None, date_to: str | None = None,
+                        limit: int = 50, cursor: str | None = None):
+    """
+    Stored sessions, newest first
+
+    Args:
+        patient: Patient name (case-insensitive, exact)
+        chw: CHW name (case-insensitive, exact)
+        cue: SDOH cue, e.g. "Economic Stability" or "Masked Distress"
+        date_from: First visit date, YYYY-MM-DD
+        date_to: Last visit date, YYYY-MM-DD
+        limit: Page size (at most 500)
+        cursor: `next_cursor` of the previous page
+
+    Returns:
+        dict: `items` (session rows with their cues) and `next_cursor`
+        (null on the last page)
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    page = await asyncio.to_thread(session_store.query_sessions, patient, chw, cue, date_from, date_to, limit, cursor)
+    return {"status": "success", **page}
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """
+    One stored session with its dashboard data, saved form and report files
+    """
+    session = await asyncio.to_thread(session_store.get_session, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return {"status": "success", "session": session}
+
+
+@router.get("/forms")
+async def list_forms(patient: str | None = None, date_from: str | None = None, date_to: str | None = None,
+                     limit: int = 50, cursor: str | None = None):
+    """
+    Saved encounter forms (names and visit dates), newest visit first
+
+    Args:
+        patient: Patient name (case-insensitive, exact)
+        date_from: First visit date, YYYY-MM-DD
+        date_to: Last visit date, YYYY-MM-DD
+        limit: Page size (at most 500)
+        cursor: `next_cursor` of the previous page
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    page = await asyncio.to_thread(session_store.query_forms, patient, date_from, date_to, limit, cursor)
+    return {"status": "success", **page}
+
+
+@router.get("/forms/{name}")
+async def get_form(name: str):
+    """
+    One saved encounter form, as posted to /save-form
+    """
+    form = await asyncio.to_thread(session_store.get_form, name)
+    if form is None:
+        raise HTTPException(status_code=404, detail="Form not found.")
+    return {"status": "success", "name": name, "data": form}
@@ -1,40 +1,56 @@
 import os
-import io
 import json
+import asyncio
 from fastapi import (APIRouter, 
                      WebSocket, 
-                     WebSocketDisconnect, 
                      UploadFile, File, Request,
                      HTTPException)
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
-from fastapi.responses import FileResponse
-from app.services.rag_service import get_solution_from_context
-from app.services.pdf_service import generate_pdf_report
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from app.services.rag_service import get_solutions_for_turns, report_turns, solved_problems
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 import sys
+import uuid
 sys.path.append("..")
 
 from datetime import datetime, timedelta, timezone
-from app.services.llm_analysis import analyze_transcript, extract_form_data
-from app.services.audio_analysis import analyze_audio_signal
-from app.services.rag_service import get_solution_from_context
-from app.services.pdf_service import generate_pdf_report
+from app.services.llm_analysis import (analyze_transcript, analyze_transcript_stream,
+                                       analyze_transcript_with_form, analysis_cache_key,
+                                       dashboard_transcript, extract_form_data, form_cache_key)
+from app.services import llm_usage, metrics, tracing
+from app.services.llm_client import ResilientOpenAI
+from app.services.audio_analysis import fallback_audio_stats
+from app.services.audio_jobs import AudioQueueFull, submit_audio_analysis
+from app.services.bulk_export import FORMATS, export_reports, resolve_sessions, session_ref
+from app.services.pdf_service import report_path
+from app.services.report_jobs import ReportQueueFull, submit_report_render
+from app.services.cue_batcher import cue_batcher
+from app.services.cue_filter import cue_filter
+from app.services.cue_pipeline import CuePipeline
+from app.services.result_cache import form_cache, upload_cache
+from app.services.session_store import session_store
+from app.services.streaming_transcription import StreamingTranscriber, get_transcription_backend
+from app.services.uploads import UploadTooLarge, save_upload_stream
+from app.config.settings import settings
 
 # Force load .env file
 load_dotenv()
 
 router = APIRouter()
 
+WS_OPEN = metrics.gauge("ws_connections_open", "Open /ws/audio connections")
+
 # Initialize OpenAI Client
 try:
     api_key = os.getenv("OPENAI_API_KEY")
     if api_key:
         print(f"OpenAI Key found: {api_key[:8]}...")
-        client = OpenAI() 
+        # Retries, deadlines and circuit breaking happen in the wrapper
+        client = ResilientOpenAI(AsyncOpenAI(max_retries=0))
     else:
         print("ERROR: OPENAI_API_KEY not found.")
         client = None
@@ -63,39 +79,49 @@ def get_session_time_data(filename, duration_seconds):
     except Exception:
         return {"date": "N/A", "start_time": "N/A", "end_time": "N/A", "session_id": "Unknown"}
 
-@router.post("/upload-full-audio")
-async def upload_full_audio(file: UploadFile = File(...)):
-    print(f"💾 Receiving full audio file: {file.filename}")
-    
-    # 1. SAVE FILE TO DISK
-    file_location = f"recorded_sessions/{file.filename}"
-    os.makedirs(os.path.dirname(file_location), exist_ok=True)
-    
-    try:
-        with open(file_location, "wb+") as file_object:
-            file_object.write(await file.read())
-    except Exception as e:
-        print(f"❌ File Save Error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to save audio file.")
+def usage_session_id(filename, digest):
+    """Session for token accounting: the dashboard's SESS-xxxxxx id, else the upload digest."""
+    session_id = get_session_time_data(filename, 0)["session_id"]
+    return session_id if session_id != "Unknown" else f"upload-{digest[:12]}"
+
 
-    # 2. PROCESS AUDIO (Signal Processing)
+async def analyze_upload_audio(digest, file_location, use_cache):
+    """Audio stats for an upload: from the result cache, else from the process pool."""
     # Extracts Volume, Pitch, Stress Score, Energy Score, and Duration
+    # Keyed by every setting that changes the stats, so switching one recomputes them
+    stats_stage = (f"audio_stats-{settings.pitch_backend}-vad{int(settings.pitch_vad)}"
+                   f"-{settings.audio_analysis_mode}")
+    audio_stats = upload_cache.get(digest, stats_stage) if use_cache else None
+    if audio_stats is not None:
+        print("♻️ Reusing cached audio analysis.")
+        return audio_stats
+
     print("🔊 Analyzing Audio Signals...")
-    audio_stats = analyze_audio_signal(file_location)
+    try:
+        audio_stats = await submit_audio_analysis(file_location)
+    except AudioQueueFull:
+        raise
+    except Exception as e:
+        print(f"❌ Audio Analysis Error: {e}")
+        return fallback_audio_stats()
 
-    # 3. GENERATE TIME METADATA
-    # Uses filename + duration from audio_stats
-    duration = audio_stats.get("duration_seconds", 0)
-    time_meta = get_session_time_data(file.filename, duration)
+    if use_cache and audio_stats.get("duration_seconds", 0) > 0:
+        upload_cache.put(digest, stats_stage, audio_stats)
+    return audio_stats
+
+
+async def transcribe_upload(digest, file_location, use_cache):
+    """Whisper transcript for an upload: from the result cache, else from the API."""
+    cached_transcript = upload_cache.get(digest, "transcript") if use_cache else None
+    if cached_transcript is not None:
+        print("♻️ Reusing cached transcript.")
+        return cached_transcript["text"]
 
-    # 4. TRANSCRIBE
-    if not client:
-        return {"status": "error", "message": "OpenAI Client not initialized"}
-    
     print("🎙️ Transcribing...")
     try:
         with open(file_location, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
+            transcription = await llm_usage.transcribe(
+                client, "transcription_upload",
                 model="whisper-1", 
                 file=audio_file, 
                 language="en"
@@ -103,13 +129,38 @@ async def upload_full_audio(file: UploadFile = File(...)):
         raw_text = transcription.text
     except Exception as e:
         print(f"❌ Transcription Error: {e}")
-        raw_text = "(Transcription Failed)"
+        return "(Transcription Failed)"
 
-    # 5. LLM ANALYSIS (Diarization, Stats, Names, Cues)
-    print("🧠 Analyzing Conversation...")
-    # We pass audio_stats so the LLM can detect 'Masked Distress' (Low Energy + Positive Text)
-    llm_result = analyze_transcript(client, raw_text, audio_stats)
+    if use_cache:
+        upload_cache.put(digest, "transcript", {"text": raw_text})
+    return raw_text
 
+async def save_session_upload(file):
+    """Stream the upload into recorded_sessions/; returns (digest, file_location)."""
+    # Hashed while copying, renamed into place when complete
+    file_location = f"recorded_sessions/{os.path.basename(file.filename or 'upload.webm')}"
+    
+    try:
+        with tracing.span("upload_save") as attributes:
+            digest, size = await save_upload_stream(
+                file,
+                file_location,
+                max_bytes=settings.upload_max_bytes,
+                chunk_size=settings.upload_chunk_bytes,
+            )
+            attributes["bytes"] = size
+    except UploadTooLarge as e:
+        print(f"❌ File Save Error: {e}")
+        raise HTTPException(status_code=413, detail="Audio file is too large.")
+    except Exception as e:
+        print(f"❌ File Save Error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save audio file.")
+
+    print(f"💾 Saved {size / 1e6:.1f} MB to {file_location}")
+    return digest, file_location
+
+
+def build_session_data(digest, time_meta, audio_stats, llm_result, use_cache, file_location=None):
     # 6. MERGE METADATA
     # Combine the Time data (from file) with the Names (from LLM)
     extracted_names = llm_result.get("extracted_names", {"chw_name": "Unknown", "patient_name": "Unknown"})
@@ -127,112 +178,207 @@ async def upload_full_audio(file: UploadFile = File(...)):
         "stats": llm_result.get("stats"), 
         "conversation": llm_result.get("conversation")
     }
+    if use_cache:
+        upload_cache.put(digest, "final", final_data)
+    # Indexed for /sessions queries (queued; committed by the store's writer thread)
+    session_id = time_meta.get("session_id")
+    session_store.save_session(session_id if session_id not in (None, "Unknown") else f"upload-{digest[:12]}",
+                               final_data, upload_digest=digest, audio_path=file_location)
+    return final_data
+
+
+def _cache_analysis(digest, analysis_stage, raw_text, llm_result, use_cache):
+    if (use_cache and llm_result.get("conversation") and not llm_result.get("incomplete")
+            and raw_text != "(Transcription Failed)"):
+        upload_cache.put(digest, analysis_stage, llm_result)
+
+
+@router.post("/upload-full-audio")
+async def upload_full_audio(file: UploadFile = File(...)):
+    print(f"💾 Receiving full audio file: {file.filename}")
+    
+    # 1. STREAM FILE TO DISK
+    digest, file_location = await save_session_upload(file)
+    llm_usage.current_session.set(usage_session_id(file.filename, digest))
+
+    use_cache = settings.upload_cache_enabled
+
+    if not client:
+        return {"status": "error", "message": "OpenAI Client not initialized"}
+
+    # 2. PROCESS AUDIO (process pool) and 4. TRANSCRIBE, concurrently
+    transcript_task = asyncio.create_task(transcribe_upload(digest, file_location, use_cache))
+    try:
+        audio_stats = await analyze_upload_audio(digest, file_location, use_cache)
+    except AudioQueueFull:
+        transcript_task.cancel()
+        raise HTTPException(
+            status_code=503,
+            detail="Audio analysis queue is full. Please retry shortly.",
+            headers={"Retry-After": str(settings.audio_pool_retry_after_seconds)},
+        )
+    raw_text = await transcript_task
+
+    # 3. GENERATE TIME METADATA
+    # Uses filename + duration from audio_stats
+    duration = audio_stats.get("duration_seconds", 0)
+    time_meta = get_session_time_data(file.filename, duration)
+
+    # 5. LLM ANALYSIS (Diarization, Stats, Names, Cues)
+    # Cached per prompt/model version, so editing the prompt re-runs only this stage
+    analysis_stage = f"analysis-{analysis_cache_key(audio_stats)}"
+    llm_result = upload_cache.get(digest, analysis_stage) if use_cache else None
+    if llm_result is None:
+        print("🧠 Analyzing Conversation...")
+        # We pass audio_stats so the LLM can detect 'Masked Distress' (Low Energy + Positive Text)
+        if settings.combined_form_extraction:
+            # Same request also fills the encounter form, so "Fill Form" is a cache hit later
+            llm_result, form_data = await analyze_transcript_with_form(client, raw_text, audio_stats)
+            if form_data is not None and llm_result.get("conversation"):
+                form_cache.put(form_cache_key(dashboard_transcript(llm_result["conversation"])), "form", form_data)
+        else:
+            llm_result = await analyze_transcript(client, raw_text, audio_stats)
+        _cache_analysis(digest, analysis_stage, raw_text, llm_result, use_cache)
+    else:
+        print("♻️ Reusing cached conversation analysis.")
+
+    final_data = build_session_data(digest, time_meta, audio_stats, llm_result, use_cache, file_location)
 
     print("✅ Processing Complete. Sending response.")
-    return {"status": "success", "data": final_data}
+    return {"status": "success", "data": final_data, "upload_digest": digest}
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/upload-full-audio/stream")
+async def upload_full_audio_stream(file: UploadFile = File(...)):
+    """
+    Server-Sent Events variant of /upload-full-audio.
+
+    Events, in order: `audio_stats`, `metadata` (time data), `transcript`,
+    then `extracted_names` / `summary` / `stats` and one `turn` per
+    conversation turn as the model finishes writing each, and finally
+    `final` with the same body /upload-full-audio returns. Failures arrive
+    as an `error` event.
+    """
+    print(f"💾 Receiving full audio file (streaming response): {file.filename}")
+    digest, file_location = await save_session_upload(file)
+    use_cache = settings.upload_cache_enabled
+    filename = file.filename
+
+    async def events():
+        llm_usage.current_session.set(usage_session_id(filename, digest))
+        if not client:
+            yield _sse("error", {"status": "error", "message": "OpenAI Client not initialized"})
+            return
+
+        transcript_task = asyncio.create_task(transcribe_upload(digest, file_location, use_cache))
+        try:
+            try:
+                audio_stats = await analyze_upload_audio(digest, file_location, use_cache)
+            except AudioQueueFull:
+                yield _sse("error", {"status": "error", "code": 503,
+                                     "message": "Audio analysis queue is full. Please retry shortly."})
+                return
+
+            # Dashboard header and charts can render before the transcript is ready
+            time_meta = get_session_time_data(filename, audio_stats.get("duration_seconds", 0))
+            yield _sse("audio_stats", audio_stats)
+            yield _sse("metadata", time_meta)
+
+            raw_text = await transcript_task
+            yield _sse("transcript", {"text": raw_text})
+
+            analysis_stage = f"analysis-{analysis_cache_key(audio_stats)}"
+            llm_result = upload_cache.get(digest, analysis_stage) if use_cache else None
+            if llm_result is None:
+                print("🧠 Analyzing Conversation (streaming)...")
+                async for event in analyze_transcript_stream(client, raw_text, audio_stats):
+                    if event[0] == "turn":
+                        yield _sse("turn", {"index": event[1], "turn": event[2]})
+                    elif event[0] == "field":
+                        yield _sse(event[1], {event[1]: event[2]})
+                    else:
+                        llm_result = event[1]
+                _cache_analysis(digest, analysis_stage, raw_text, llm_result, use_cache)
+            else:
+                print("♻️ Reusing cached conversation analysis.")
+                for key in ("extracted_names", "summary", "stats"):
+                    if key in llm_result:
+                        yield _sse(key, {key: llm_result[key]})
+                for index, turn in enumerate(llm_result.get("conversation") or []):
+                    yield _sse("turn", {"index": index, "turn": turn})
+
+            final_data = build_session_data(digest, time_meta, audio_stats, llm_result, use_cache, file_location)
+            print("✅ Processing Complete. Stream finished.")
+            yield _sse("final", {"status": "success", "data": final_data, "upload_digest": digest})
+        except Exception as e:
+            # The response has started: report the failure in-band instead of cutting the stream
+            print(f"❌ Streaming Upload Error: {e}")
+            yield _sse("error", {"status": "error", "message": str(e)})
+        finally:
+            transcript_task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def classify_statement(transcript_text, conversation_history):
+    """Real-time cue detection for one utterance; appends it to `conversation_history`."""
+    # Local first stage: greetings, questions and small talk never reach the LLM
+    if settings.cue_filter_enabled and not await asyncio.to_thread(cue_filter.is_candidate, transcript_text):
+        conversation_history.append(transcript_text)
+        if len(conversation_history) > 10: conversation_history.pop(0)
+        return {"detected_cues": []}
+
+    # Simple Context Management for Real-time
+    recent_history = conversation_history[-2:] 
+    if recent_history:
+        context_block = "\n".join([f"- {msg}" for msg in recent_history])
+        final_user_content = f"Context:\n{context_block}\n\nCurrent Statement:\n{transcript_text}"
+    else:
+        final_user_content = transcript_text
+
+    # Shared micro-batcher: statements from concurrent connections go out together
+    analysis_data = await cue_batcher.classify(client, final_user_content)
+
+    conversation_history.append(transcript_text)
+    if len(conversation_history) > 10: conversation_history.pop(0)
+    return analysis_data
+
 
 @router.websocket("/ws/audio")
 async def audio_stream(websocket: WebSocket):
     await websocket.accept()
     print("🔵 Client Connected.")
+    llm_usage.current_session.set(f"live-{uuid.uuid4().hex[:8]}")
+    tracing.start_trace()
+    WS_OPEN.inc()
 
-    # System prompt for real-time (Short & Fast)
-    SYSTEM_PROMPT = """
-You are a Health Triage Analyzer. Analyze the "Current Statement".
-Ignore questions/greetings. Return "detected_cues": [].
-
-Look for cues related to:
-1. Economic Stability Issue
-2. Education Access Issue
-3. Health Care Access Issue
-4. Neighborhood/Environment Issue
-5. Social/Community Context Issue
-
-Output strictly valid JSON:
-{
-  "detected_cues": [
-    {
-      "category": "Economic Stability" | "Education" | "Health Care" | "Environment" | "Social Context",
-      "issue_summary": "3-5 word description",
-      "severity": "Mild" | "Moderate" | "Severe" | "Critical"
-    }
-  ]
-}
-"""
-    conversation_history = [] 
+    # Rolling PCM buffer + VAD: only complete utterances are transcribed
+    try:
+        backend = get_transcription_backend(client)
+    except Exception as e:
+        print(f"❌ Transcription Backend Error: {e}")
+        backend = None
+    transcriber = StreamingTranscriber(backend) if backend else None
 
+    # receive -> transcribe -> classify -> send as separate tasks with bounded queues
+    pipeline = CuePipeline(websocket, transcriber, classify_statement if client else None)
     try:
-        while True:
-            # Receive & Process
-            try:
-                audio_data = await websocket.receive_bytes()
-            except WebSocketDisconnect:
-                print("🔴 Client Disconnected (during receive)")
-                break
-
-            if len(audio_data) < 100: continue
-
-            audio_file = io.BytesIO(audio_data)
-            audio_file.name = "audio.webm" 
-
-            transcript_text = ""
-
-            if client:
-                try:
-                    transcription = client.audio.transcriptions.create(
-                        model="whisper-1", file=audio_file, language="en"
-                    )
-                    transcript_text = transcription.text
-                except Exception:
-                    continue
-
-            if transcript_text.strip() and client:
-                print(f"   🗣️ User said: '{transcript_text}'")
-                
-                # Simple Context Management for Real-time
-                recent_history = conversation_history[-2:] 
-                if recent_history:
-                    context_block = "\n".join([f"- {msg}" for msg in recent_history])
-                    final_user_content = f"Context:\n{context_block}\n\nCurrent Statement:\n{transcript_text}"
-                else:
-                    final_user_content = transcript_text
-
-                try:
-                    response = client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        response_format={"type": "json_object"},
-                        messages=[
-                            {"role": "system", "content": SYSTEM_PROMPT},
-                            {"role": "user", "content": final_user_content}
-                        ]
-                    )
-                    ai_raw_response = response.choices[0].message.content
-                    analysis_data = json.loads(ai_raw_response)
-
-                    conversation_history.append(transcript_text)
-                    if len(conversation_history) > 10: conversation_history.pop(0)
-
-                    cues = analysis_data.get("detected_cues", [])
-                    if cues:
-                        # WRAP SEND IN TRY/EXCEPT TO HANDLE DISCONNECTS
-                        try:
-                            await websocket.send_json({
-                                "type": "health_analysis",
-                                "payload": analysis_data
-                            })
-                        except (WebSocketDisconnect, RuntimeError):
-                            print("⚠️ Client disconnected while sending data.")
-                            break
-
-                except Exception as e:
-                    print(f"❌ LLM Logic Error: {e}")
-
-    except WebSocketDisconnect:
-        print("\n🔴 Client Disconnected")
+        with tracing.span("ws_connection"):
+            await pipeline.run()
     except Exception as e:
         # Ignore normal cleanup errors
         if "accept" not in str(e) and "connected" not in str(e):
              print(f"\n❌ Connection Error: {e}")
+    finally:
+        WS_OPEN.dec()
 
 
 class ReportRequest(BaseModel):
@@ -248,48 +394,83 @@ async def generate_report_endpoint(request: Request):
         return {"status": "error", "message": "No data provided"}
 
     print("📄 Generating Report...")
+    session_id = (data.get("metadata") or {}).get("session_id")
+    llm_usage.current_session.set(session_id)
     
     # 1. Identify Problems to Solve
-    conversation = data.get("conversation", [])
-    solved_problems = []
-
-    for turn in conversation:
-        cues = turn.get("cues", [])
-        text = turn.get("text", "")
-        speaker = turn.get("speaker", "")
-        is_distress = turn.get("is_masked_distress", False)
-        
-        # Logic: If Patient speaks AND (has cues OR is masked distress)
-        if speaker == "Patient" and (len(cues) > 0 or is_distress):
-            
-            print(f"   🔍 RAG Search for: {text[:30]}...")
-            
-            # 2. Get Solution from RAG
-            solution = get_solution_from_context(client, text)
-            
-            # Combine cue list
-            display_cues = cues if cues else []
-            if is_distress: display_cues.append("Masked Distress")
-
-            solved_problems.append({
-                "cues": display_cues,
-                "text": text,
-                "solution": solution
-            })
-
-    # 3. Generate PDF
-    pdf_path = generate_pdf_report(data, solved_problems)
-    
-    print(f"✅ Report generated: {pdf_path}")
+    # Logic: If Patient speaks AND (has cues OR is masked distress)
+    flagged_turns = report_turns(data.get("conversation", []))
+    for turn in flagged_turns:
+        print(f"   🔍 RAG Search for: {turn.get('text', '')[:30]}...")
+
+    # 2. Get Solutions from RAG (concurrently, results in conversation order)
+    solutions = await get_solutions_for_turns(client, [turn.get("text", "") for turn in flagged_turns])
+    problems = solved_problems(flagged_turns, solutions)
+
+    # 3. Generate PDF (in the render pool, straight to bytes)
+    try:
+        pdf_bytes = await submit_report_render(data, problems, session_id)
+    except ReportQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Report queue is full. Please retry shortly.",
+            headers={"Retry-After": str(settings.report_pool_retry_after_seconds)},
+        )
+
+    print(f"✅ Report generated: {len(pdf_bytes) / 1024:.0f} KB")
+    path = report_path(settings.report_store_dir, session_id) if settings.report_store_dir else None
+    if path is not None:
+        session_store.add_report(session_id, path, len(pdf_bytes))
 
     # 4. Return File
-    return FileResponse(
-        path=pdf_path, 
-        filename="Medical_Triage_Report.pdf", 
-        media_type='application/pdf'
+    return Response(
+        content=pdf_bytes,
+        media_type='application/pdf',
+        headers={"Content-Disposition": 'attachment; filename="Medical_Triage_Report.pdf"'},
     )
 
 
+class BulkExportRequest(BaseModel):
+    session_ids: List[str] = []
+    form_files: List[str] = []  # saved form names, e.g. "SESS-123456.json"
+    format: str = "zip"  # "zip" or "pdf" (one merged PDF)
+
+
+@router.post("/reports/bulk")
+async def bulk_export_endpoint(body: BulkExportRequest):
+    """
+    Reports for many sessions, streamed back as one ZIP or one merged PDF.
+
+    Sessions that are not stored are listed in the
+    `X-Missing-Sessions` header (and in the ZIP's manifest.json).
+    """
+    if body.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(FORMATS)}")
+    refs = body.session_ids + [session_ref(name) for name in body.form_files]
+    if not refs:
+        raise HTTPException(status_code=400, detail="No sessions given.")
+
+    sources, missing = await asyncio.to_thread(resolve_sessions, refs)
+    if not sources:
+        raise HTTPException(status_code=404, detail={"message": "No stored sessions found.", "missing": missing})
+
+    print(f"📦 Bulk export: {len(sources)} sessions as {body.format}")
+    headers = {"Content-Disposition": f'attachment; filename="Aurion_Reports_{len(sources)}.{body.format}"'}
+    if missing:
+        headers["X-Missing-Sessions"] = ",".join(missing)[:2000]
+    return StreamingResponse(export_reports(client, sources, body.format, missing),
+                             media_type=FORMATS[body.format], headers=headers)
+
+
+@router.get("/reports/{session_id}")
+async def get_saved_report(session_id: str):
+    """The last report generated for a session (only kept when REPORT_STORE_DIR is set)."""
+    path = report_path(settings.report_store_dir, session_id) if settings.report_store_dir else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No saved report for this session.")
+    return FileResponse(path=path, filename="Medical_Triage_Report.pdf", media_type='application/pdf')
+
+
 class FormData(BaseModel):
     filename: str
     data: Dict[str, Any]
@@ -298,30 +479,35 @@ class FormData(BaseModel):
 async def extract_form_data_endpoint(request: Request):
     body = await request.json()
     transcript = body.get("transcript", "")
+    llm_usage.current_session.set(body.get("session_id"))
     
     if not transcript:
         return {"status": "error", "message": "No transcript provided"}
 
+    # Filled during /upload-full-audio (or a previous click) for this exact transcript?
+    form_key = form_cache_key(transcript)
+    form_data = form_cache.get(form_key, "form")
+    if form_data is not None:
+        print("♻️ Reusing cached form data.")
+        return {"status": "success", "data": form_data}
+
     print("📝 Extracting Form Data...")
-    form_data = extract_form_data(client, transcript)
+    form_data = await extract_form_data(client, transcript)
+    if form_data:
+        form_cache.put(form_key, "form", form_data)
     
     return {"status": "success", "data": form_data}
 
-# 3. ENDPOINT: SAVE FORM (JSON)
+# 3. ENDPOINT: SAVE FORM (session store; `GET /forms/{filename}` reads it back)
 @router.post("/save-form")
 async def save_form_endpoint(payload: FormData):
     print(f"💾 Saving Form: {payload.filename}")
     
-    save_dir = "./forms"
-    os.makedirs(save_dir, exist_ok=True)
-    
-    file_path = os.path.join(save_dir, f"{payload.filename}.json")
-    
     try:
-        with open(file_path, "w", encoding='utf-8') as f:
-            json.dump(payload.data, f, indent=2)
+        # Wait for the commit so a failed write is reported, not acknowledged
+        await asyncio.wrap_future(session_store.save_form(payload.filename, payload.data))
         print("✅ Form Saved.")
-        return {"status": "success", "filepath": file_path}
+        return {"status": "success", "form": payload.filename}
     except Exception as e:
         print(f"❌ Save Error: {e}")
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
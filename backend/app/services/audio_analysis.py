@@ -1,69 +1,296 @@
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+
 import librosa
 import numpy as np
+import soundfile as sf
+
+from app.config.settings import settings
+from app.services.pitch import PITCH_SR, StreamingYin, estimate_f0
+
+# librosa.feature.rms defaults (centered, zero-padded frames)
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+# Points in the dashboard volume chart
+TARGET_POINTS = 100
+
+
+def fallback_audio_stats():
+    # Return fallback data so dashboard doesn't crash
+    return {
+        "volume_series": [10, 20, 15, 30, 20, 10],
+        "max_volume": 0,
+        "min_volume": 0,
+        "stress_score": 1,
+        "energy_score": 10,
+        "duration_seconds": 0
+    }
+
+
+def _build_stats(vol_series, pitch_variance, duration_seconds):
+    # Normalize 0-100 (Add a small epsilon to avoid division by zero)
+    max_val = np.max(vol_series) if len(vol_series) > 0 else 0.001
+    vol_series_normalized = [(v / max_val) * 100 for v in vol_series]
+
+    avg_volume = float(np.mean(vol_series_normalized))
+
+    # 3. CALCULATE ENERGY/STRESS SCORES
+    # Make sensitivity higher so we see results on the dashboard
+
+    # Energy: Volume (60%) + Pitch Dynamic (40%)
+    # Pitch variance usually ranges 10-50Hz for normal speech. We scale it up.
+    raw_energy = (avg_volume * 0.5) + (min(pitch_variance, 100) * 0.5)
+    energy_score = min(100, max(10, raw_energy)) # Floor at 10 so it's visible
+
+    # Stress: High Pitch Variance + High Volume
+    raw_stress = (pitch_variance / 10) + (max_val * 100) # Simple heuristic
+    # Remap to 1-10 scale
+    stress_score = min(10, max(1, raw_stress / 10))
+
+    return {
+        "volume_series": vol_series_normalized,
+        "max_volume": round(float(np.max(vol_series_normalized)), 1),
+        "min_volume": round(float(np.min(vol_series_normalized)), 1),
+        "stress_score": round(stress_score, 1),
+        "energy_score": round(energy_score, 1),
+        "duration_seconds": round(duration_seconds, 1)
+    }
+
+
+def _analyze_full(file_path):
+    # Load audio (y = audio time series, sr = sampling rate)
+    y, sr = librosa.load(file_path, sr=None)
+
+    # 1. Volume Analysis (RMS)
+    rms = librosa.feature.rms(y=y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)[0]
+
+    # Create Time Series (Ensure we always have data)
+    if len(rms) > TARGET_POINTS:
+        chunks = np.array_split(rms, TARGET_POINTS)
+        vol_series = [float(np.mean(c)) for c in chunks]
+    else:
+        vol_series = [float(v) for v in rms]
+
+    # 2. Prosody/Pitch Analysis (F0)
+    # We assume human voice range (C2 to C7). Backend is configurable:
+    # "yin" (16 kHz, vectorized, silence gated) or the original "pyin".
+    f0 = estimate_f0(y, sr, backend=settings.pitch_backend, vad=settings.pitch_vad)
+
+    # Handle silence/NaNs
+    if f0 is not None:
+        valid_pitch = f0[~np.isnan(f0)]
+    else:
+        valid_pitch = []
+
+    pitch_variance = float(np.std(valid_pitch)) if len(valid_pitch) > 0 else 0
+
+    return _build_stats(vol_series, pitch_variance, librosa.get_duration(y=y, sr=sr))
+
+
+# --- STREAMING MODE (bounded memory for long recordings) ---
+
+class _VolumeSeries:
+    """
+    Builds the same series as `np.array_split(rms, TARGET_POINTS)` + mean,
+    one block of RMS frames at a time. Needs the total frame count up front.
+    """
+
+    def __init__(self, total_frames, points=TARGET_POINTS):
+        self.total_frames = total_frames
+        self.points = points
+        self.seen = 0
+        self.raw = []
+        if total_frames > points:
+            q, r = divmod(total_frames, points)
+            self.bounds = np.cumsum([q + 1] * r + [q] * (points - r))
+            self.sums = np.zeros(points)
+            self.counts = np.zeros(points)
+
+    def add(self, values):
+        if self.total_frames <= self.points:
+            self.raw.extend(float(v) for v in values)
+            return
+        positions = np.arange(self.seen, self.seen + len(values))
+        buckets = np.minimum(np.searchsorted(self.bounds, positions, side="right"), self.points - 1)
+        np.add.at(self.sums, buckets, values)
+        np.add.at(self.counts, buckets, 1)
+        self.seen += len(values)
+
+    def series(self):
+        if self.total_frames <= self.points:
+            return self.raw
+        filled = self.counts > 0
+        return [float(s / c) for s, c in zip(self.sums[filled], self.counts[filled])]
+
+
+class _RunningStats:
+    """Running mean/variance (Chan et al. merge of per-block statistics)."""
 
-def analyze_audio_signal(file_path):
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        delta = mean_b - self.mean
+        total = self.n + n_b
+        self.mean += delta * n_b / total
+        self.m2 += m2_b + delta ** 2 * self.n * n_b / total
+        self.n = total
+
+    def std(self):
+        return float(np.sqrt(self.m2 / self.n)) if self.n else 0
+
+
+def _consume_rms_frames(buffer, volume):
+    """RMS of every complete frame in `buffer`; returns the unconsumed tail."""
+    if len(buffer) < FRAME_LENGTH:
+        return buffer
+    frames = np.lib.stride_tricks.sliding_window_view(buffer, FRAME_LENGTH)[::HOP_LENGTH]
+    volume.add(np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1)))
+    return buffer[len(frames) * HOP_LENGTH:]
+
+
+@contextlib.contextmanager
+def _pcm_source(file_path):
+    """
+    Path that soundfile can read block by block. Formats libsndfile can't
+    decode (e.g. browser WebM/Opus) are converted once to a mono float PCM
+    WAV cache with ffmpeg, which is removed afterwards.
+    """
     try:
-        # Load audio (y = audio time series, sr = sampling rate)
-        y, sr = librosa.load(file_path, sr=None)
-        
-        # 1. Volume Analysis (RMS)
-        rms = librosa.feature.rms(y=y)[0]
-        
-        # Create Time Series (Ensure we always have data)
-        target_points = 100
-        if len(rms) > target_points:
-            chunks = np.array_split(rms, target_points)
-            vol_series = [float(np.mean(c)) for c in chunks]
-        else:
-            vol_series = [float(v) for v in rms]
-
-        # Normalize 0-100 (Add a small epsilon to avoid division by zero)
-        max_val = np.max(vol_series) if len(vol_series) > 0 else 0.001
-        vol_series_normalized = [(v / max_val) * 100 for v in vol_series]
-
-        # 2. Prosody/Pitch Analysis (F0)
-        # We assume human voice range (C2 to C7)
-        f0, voiced_flag, voiced_probs = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
-        
-        # Handle silence/NaNs
-        if f0 is not None:
-            valid_pitch = f0[~np.isnan(f0)]
+        sf.info(file_path)
+        pcm_path = None
+    except RuntimeError:
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError(f"ffmpeg is required to stream-decode {file_path}")
+        fd, pcm_path = tempfile.mkstemp(suffix=".pcm.wav", dir=settings.audio_pcm_cache_dir)
+        os.close(fd)
+        try:
+            subprocess.run(
+                ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", file_path,
+                 "-ac", "1", "-c:a", "pcm_f32le", "-rf64", "auto", pcm_path],
+                check=True,
+            )
+        except BaseException:
+            os.unlink(pcm_path)
+            raise
+
+    try:
+        yield pcm_path or file_path
+    finally:
+        if pcm_path is not None:
+            os.unlink(pcm_path)
+
+
+class _StreamingPitch:
+    """
+    F0 spread of a signal fed block by block. The "yin" backend matches the
+    whole-file path: one continuous 16 kHz resampling stream (the same soxr
+    filter `librosa.resample` uses), frames carried across blocks and the
+    VAD gated against the whole file's peak (see `StreamingYin`). "pyin"
+    is run per block.
+    """
+
+    def __init__(self, sr, total_samples):
+        self.sr = sr
+        self.backend = settings.pitch_backend
+        if self.backend == "yin":
+            import soxr
+
+            self.yin = StreamingYin(vad=settings.pitch_vad)
+            self.resampler = soxr.ResampleStream(sr, PITCH_SR, 1, dtype="float32", quality="HQ") \
+                if sr != PITCH_SR else None
+            # librosa.resample fixes the output length to ceil(n * ratio)
+            self.remaining = int(np.ceil(total_samples * PITCH_SR / sr))
         else:
-            valid_pitch = []
-
-        pitch_variance = float(np.std(valid_pitch)) if len(valid_pitch) > 0 else 0
-        avg_volume = float(np.mean(vol_series_normalized))
-
-        # 3. CALCULATE ENERGY/STRESS SCORES
-        # Make sensitivity higher so we see results on the dashboard
-        
-        # Energy: Volume (60%) + Pitch Dynamic (40%)
-        # Pitch variance usually ranges 10-50Hz for normal speech. We scale it up.
-        raw_energy = (avg_volume * 0.5) + (min(pitch_variance, 100) * 0.5)
-        energy_score = min(100, max(10, raw_energy)) # Floor at 10 so it's visible
-
-        # Stress: High Pitch Variance + High Volume
-        raw_stress = (pitch_variance / 10) + (max_val * 100) # Simple heuristic
-        # Remap to 1-10 scale
-        stress_score = min(10, max(1, raw_stress / 10))
-
-        return {
-            "volume_series": vol_series_normalized,
-            "max_volume": round(float(np.max(vol_series_normalized)), 1),
-            "min_volume": round(float(np.min(vol_series_normalized)), 1),
-            "stress_score": round(stress_score, 1),
-            "energy_score": round(energy_score, 1),
-            "duration_seconds": round(librosa.get_duration(y=y, sr=sr), 1)
-        }
+            self.stats = _RunningStats()
+
+    def feed(self, mono, last=False):
+        if self.backend != "yin":
+            if not len(mono):
+                return
+            f0 = estimate_f0(mono, self.sr, backend=self.backend, vad=settings.pitch_vad)
+            if f0 is not None:
+                self.stats.update(f0[~np.isnan(f0)])
+            return
+        y = self.resampler.resample_chunk(mono, last=last) if self.resampler is not None else mono
+        y = y[: self.remaining]
+        if last and len(y) < self.remaining:
+            y = np.pad(y, (0, self.remaining - len(y)))
+        self.remaining -= len(y)
+        self.yin.feed(y)
+
+    def std(self):
+        if self.backend != "yin":
+            return self.stats.std()
+        voiced = self.yin.voiced()
+        return float(np.std(voiced)) if len(voiced) else 0
+
+
+def _analyze_streaming(file_path, block_seconds):
+    with _pcm_source(file_path) as pcm_path:
+        info = sf.info(pcm_path)
+        sr = info.samplerate
+        total_samples = info.frames
+
+        # Centered framing: FRAME_LENGTH // 2 zeros on each side, like librosa
+        volume = _VolumeSeries(1 + total_samples // HOP_LENGTH)
+        pitch = _StreamingPitch(sr, total_samples)
+        pad = np.zeros(FRAME_LENGTH // 2, dtype=np.float32)
+        tail = pad
+
+        block_size = max(HOP_LENGTH, int(block_seconds * sr) // HOP_LENGTH * HOP_LENGTH)
+        for block in sf.blocks(pcm_path, blocksize=block_size, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1)
+
+            # 1. Volume Analysis (RMS), carried across block boundaries
+            tail = _consume_rms_frames(np.concatenate([tail, mono]), volume)
+
+            # 2. Prosody/Pitch Analysis (F0), continuous across blocks
+            pitch.feed(mono)
+
+        pitch.feed(np.zeros(0, dtype=np.float32), last=True)
+        _consume_rms_frames(np.concatenate([tail, pad]), volume)
+
+    return _build_stats(volume.series(), pitch.std(), total_samples / sr)
+
+
+def _use_streaming(file_path, mode):
+    if mode == "streaming":
+        return True
+    if mode == "full":
+        return False
+    # "auto": file size is a cheap proxy for decoded length
+    return os.path.getsize(file_path) >= settings.audio_streaming_min_bytes
+
+
+def analyze_audio_signal(file_path, mode=None):
+    """
+    Volume series, stress/energy scores and duration for a recording.
+
+    `mode` (default `settings.audio_analysis_mode`): "full" decodes the whole
+    file with librosa; "streaming" decodes fixed-size blocks and keeps running
+    statistics (plus ~1 MB of voiced pitch frames per hour) so memory stays
+    flat, with the same results; "auto" streams files of at least
+    `audio_streaming_min_bytes`.
+    """
+    mode = mode or settings.audio_analysis_mode
+    try:
+        if _use_streaming(file_path, mode):
+            return _analyze_streaming(file_path, settings.audio_block_seconds)
+        return _analyze_full(file_path)
 
     except Exception as e:
         print(f"Error in audio analysis: {e}")
-        # Return fallback data so dashboard doesn't crash
-        return {
-            "volume_series": [10, 20, 15, 30, 20, 10], 
-            "max_volume": 0, 
-            "min_volume": 0, 
-            "stress_score": 1, 
-            "energy_score": 10,
-            "duration_seconds": 0
-        }
\ No newline at end of file
+        return fallback_audio_stats()
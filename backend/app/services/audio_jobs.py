@@ -0,0 +1,55 @@
+"""
+Process pool for CPU-bound audio analysis.
+
+`analyze_audio_signal` (librosa/NumPy) runs in worker processes so it never
+blocks the event loop. Workers import librosa and run one tiny analysis when
+they start, so the first real job doesn't pay for lazy imports or JIT.
+Admission is bounded: once `audio_pool_max_pending` jobs are queued or
+running, `submit_audio_analysis` raises `AudioQueueFull` immediately.
+The pool itself is a `ProcessJobs` (see process_jobs.py).
+"""
+from app.config.settings import settings
+from app.services.process_jobs import ProcessJobs
+
+
+class AudioQueueFull(Exception):
+    """The audio analysis queue is at capacity."""
+
+
+def _warm_worker():
+    import numpy as np
+
+    import app.services.audio_analysis  # noqa: F401  (imports librosa, soundfile)
+    from app.services.pitch import estimate_f0
+
+    # Touch librosa's lazily loaded resampler and the YIN path once
+    tone = np.sin(2 * np.pi * 220 * np.arange(8000) / 8000).astype(np.float32)
+    estimate_f0(tone, 8000, backend=settings.pitch_backend, vad=settings.pitch_vad)
+
+
+def _run_job(file_path):
+    from app.services.audio_analysis import analyze_audio_signal
+
+    return analyze_audio_signal(file_path)
+
+
+jobs = ProcessJobs(
+    "audio", "audio analysis jobs", "audio_analysis",
+    initializer=_warm_worker,
+    workers=lambda: settings.audio_pool_workers,
+    max_pending=lambda: settings.audio_pool_max_pending,
+    queue_full=AudioQueueFull,
+)
+start_audio_pool = jobs.start
+shutdown_audio_pool = jobs.shutdown
+queue_depth = jobs.queue_depth
+
+
+async def submit_audio_analysis(file_path):
+    """
+    Run `analyze_audio_signal(file_path)` in the pool and await its result.
+
+    Raises AudioQueueFull when `audio_pool_max_pending` jobs are already
+    queued or running.
+    """
+    return await jobs.run(_run_job, file_path)
@@ -0,0 +1,228 @@
+"""
+Bulk report export: many sessions in one ZIP or one merged PDF.
+
+Sessions are named by `metadata.session_id` (the dashboard's session id, also
+the name of its saved form) or by upload digest, and read from the session
+store, falling back to the upload result cache. Each report is rendered in the report worker pool. At
+most `bulk_export_max_in_flight` sessions are loaded or rendering at a time.
+Finished reports are written out in the requested order, so memory stays
+bounded whatever the batch size. RAG solutions are shared by the whole
+export: a complaint that appears in several sessions is looked up once.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import zipfile
+from collections import deque
+
+from app.config.settings import settings
+from app.services import metrics
+from app.services.pdf_merge import PdfConcatenator
+from app.services.rag_service import FALLBACK_SOLUTION, get_solutions_for_turns, report_turns, solved_problems
+from app.services.report_jobs import ReportQueueFull, submit_report_render
+from app.services.result_cache import upload_cache
+from app.services.session_store import session_store
+
+EXPORTED = metrics.counter("bulk_export_reports_total", "Reports written by bulk exports, by outcome")
+EXPORT_SECONDS = metrics.histogram("bulk_export_seconds", "Duration of bulk exports",
+                                   buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800))
+FORMATS = {"zip": "application/zip", "pdf": "application/pdf"}
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_QUEUE_FULL_BACKOFF_SECONDS = 0.2
+
+
+def session_index():
+    """{session_id: upload digest} of every cached upload with a final result."""
+    index = {}
+    for entry in sorted(upload_cache.entries(), key=lambda e: e["modified"]):
+        if "final" not in entry["stages"]:
+            continue
+        final = upload_cache.get(entry["digest"], "final") or {}
+        session_id = (final.get("metadata") or {}).get("session_id")
+        if session_id and session_id != "Unknown":
+            index[session_id] = entry["digest"]  # newest upload wins
+        index.setdefault(f"upload-{entry['digest'][:12]}", entry["digest"])
+    return index
+
+
+def session_ref(name):
+    """Session id for a saved form file name (`SESS-123456.json` -> `SESS-123456`), else the name itself."""
+    base = os.path.basename(str(name))
+    return base[:-5] if base.endswith(".json") else base
+
+
+def resolve_sessions(refs):
+    """
+    Map session ids / upload digests to loaders.
+
+    Returns ([(name, load)], missing), where `load()` reads that session's
+    dashboard data (synchronously; call it off the event loop).
+    """
+    refs = list(dict.fromkeys(str(ref) for ref in refs))
+    index = None
+    sources, missing = [], []
+    for ref in refs:
+        if not _DIGEST.match(ref) and session_store.has_analysis(ref):
+            sources.append((ref, lambda ref=ref: session_store.get_analysis(ref)))
+            continue
+        if _DIGEST.match(ref):
+            digest = ref if upload_cache.has(ref, "final") else None
+        else:
+            if index is None:
+                index = session_index()
+            digest = index.get(ref)
+        if digest is None:
+            missing.append(ref)
+        else:
+            sources.append((ref, lambda digest=digest: upload_cache.get(digest, "final")))
+    return sources, missing
+
+
+class SharedSolutions:
+    """RAG solutions for one export; each distinct complaint is solved once, whichever session asks first."""
+
+    def __init__(self, client):
+        self.client = client
+        self.requested = 0
+        self._futures = {}
+
+    async def solve(self, texts):
+        loop = asyncio.get_running_loop()
+        new = [text for text in dict.fromkeys(texts) if text not in self._futures]
+        for text in new:
+            self._futures[text] = loop.create_future()
+        if new:
+            self.requested += len(new)
+            solutions = [FALLBACK_SOLUTION] * len(new)
+            try:
+                solutions = await get_solutions_for_turns(self.client, new)
+            except Exception as e:
+                print(f"RAG Error: {e}")
+            finally:
+                # Always settle, so other sessions waiting on these texts never hang
+                for text, solution in zip(new, solutions):
+                    if not self._futures[text].done():
+                        self._futures[text].set_result(solution)
+        return [await self._futures[text] for text in texts]
+
+
+async def _render(data, problems):
+    # Bulk exports yield to interactive /generate-report requests when the pool is busy
+    while True:
+        try:
+            return await submit_report_render(data, problems)
+        except ReportQueueFull:
+            await asyncio.sleep(_QUEUE_FULL_BACKOFF_SECONDS)
+
+
+async def render_session(shared, load):
+    data = await asyncio.to_thread(load)
+    if not data or not data.get("conversation"):
+        raise ValueError("No analysed conversation stored for this session")
+    turns = report_turns(data["conversation"])
+    solutions = await shared.solve([turn.get("text", "") for turn in turns])
+    return await _render(data, solved_problems(turns, solutions))
+
+
+async def rendered_reports(client, sources):
+    """Yield (name, pdf_bytes or exception) in `sources` order, rendering a bounded window ahead."""
+    shared = SharedSolutions(client)
+    pending = deque()
+    sources = iter(sources)
+    window = max(1, settings.bulk_export_max_in_flight)
+    try:
+        while True:
+            while len(pending) < window:
+                source = next(sources, None)
+                if source is None:
+                    break
+                name, load = source
+                pending.append((name, asyncio.create_task(render_session(shared, load))))
+            if not pending:
+                return
+            name, task = pending.popleft()
+            try:
+                yield name, await task
+            except Exception as e:
+                yield name, e
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+class _ZipSink:
+    """Write-only file object for zipfile; buffered bytes are handed out by `drain()`."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_entry(name):
+    return zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+
+
+async def export_reports(client, sources, fmt="zip", missing=()):
+    """
+    Render every session's report and yield the archive as it is written.
+
+    `fmt` is "zip" (one `<session>.pdf` per session plus `manifest.json`;
+    stored, as PDFs are already compressed) or "pdf" (one merged PDF with a
+    bookmark per session). Sessions that fail are listed in the manifest
+    (ZIP) or skipped with a log line (PDF).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    start = time.perf_counter()
+    exported, failed = [], {}
+    sink, archive, merged = None, None, None
+    if fmt == "zip":
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+    else:
+        merged = PdfConcatenator()
+
+    async for name, result in rendered_reports(client, sources):
+        if isinstance(result, Exception):
+            print(f"❌ Export Error ({name}): {result}")
+            failed[name] = str(result)
+            EXPORTED.inc(outcome="error")
+            continue
+        if archive is not None:
+            archive.writestr(_zip_entry(f"{name}.pdf"), result)
+            chunk = sink.drain()
+        else:
+            chunk = merged.add(result, title=name)
+        exported.append(name)
+        EXPORTED.inc(outcome="ok")
+        yield chunk
+
+    if archive is not None:
+        manifest = {"exported": exported, "failed": failed, "missing": list(missing)}
+        archive.writestr(_zip_entry("manifest.json"), json.dumps(manifest, indent=2))
+        archive.close()
+        yield sink.drain()
+    else:
+        yield merged.finish()
+    EXPORT_SECONDS.observe(time.perf_counter() - start)
+    print(f"📦 Exported {len(exported)} reports ({len(failed)} failed, {len(missing)} missing) "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,133 @@
+"""
+Process-wide micro-batching of realtime cue classification.
+
+Every /ws/audio connection used to send its own single-statement
+gpt-4o-mini request. `cue_batcher.classify()` instead parks the statement for
+up to `cue_batch_max_wait_ms` (or until `cue_batch_max_batch` statements are
+waiting, from any connection), sends them as one numbered multi-item JSON
+request and hands each caller back its own `detected_cues` result. A batch
+of one uses the original single-statement prompt. Items missing from a
+batch answer are retried one by one; if the batch request itself fails,
+every caller in it gets that error.
+
+The OpenAI Batch API is not used: its turnaround (up to 24 h) is far outside
+what a live cue can wait.
+"""
+import asyncio
+import json
+import time
+
+from app.config.settings import settings
+from app.services import llm_usage, metrics, prompts
+
+REALTIME_MODEL = prompts.REALTIME_CUES.model
+
+BATCH_SIZE = metrics.histogram(
+    "cue_batch_size", "Statements per realtime cue classification request",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+QUEUE_DELAY = metrics.histogram(
+    "cue_batch_queue_seconds", "Time a statement waited for its batch to be sent",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+FALLBACKS = metrics.counter("cue_batch_fallbacks_total", "Batched statements re-sent individually")
+
+
+async def classify_one(client, user_content, session=None):
+    sessions = None if session is None else [session]
+    response = await llm_usage.chat(client, prompts.REALTIME_CUES, user_content, sessions=sessions)
+    return json.loads(response.choices[0].message.content)
+
+
+async def classify_many(client, user_contents, sessions=None):
+    """
+    One request for several statements; None for any item the model didn't
+    answer. Usage is split evenly across `sessions` (one per statement).
+    """
+    items = "\n\n".join(f"### Item {i}\n{content}" for i, content in enumerate(user_contents, start=1))
+    response = await llm_usage.chat(client, prompts.REALTIME_CUES_BATCH, items, sessions=sessions)
+    data = json.loads(response.choices[0].message.content)
+
+    results = [None] * len(user_contents)
+    for entry in data.get("results", []):
+        try:
+            index = int(entry["id"]) - 1
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < len(results) and isinstance(entry.get("detected_cues"), list):
+            results[index] = {"detected_cues": entry["detected_cues"]}
+    return results
+
+
+class CueBatcher:
+    def __init__(self, max_batch=None, max_wait_ms=None):
+        self.max_batch = max_batch or settings.cue_batch_max_batch
+        self.max_wait = (settings.cue_batch_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000
+        self._pending = []  # (user_content, future, enqueued_at, session)
+        self._timer = None
+        self._tasks = set()
+
+    async def classify(self, client, user_content):
+        """`detected_cues` dict for one statement, possibly sent together with others."""
+        if not settings.cue_batch_enabled or self.max_batch <= 1:
+            BATCH_SIZE.observe(1)
+            return await classify_one(client, user_content)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # The batch runs in another task, so carry the caller's session along for accounting
+        self._pending.append((user_content, future, time.perf_counter(), llm_usage.current_session.get()))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch(client)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch, client)
+        return await future
+
+    def _dispatch(self, client):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+            task = asyncio.create_task(self._run(client, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, client, batch):
+        sent_at = time.perf_counter()
+        for _, _, enqueued_at, _ in batch:
+            QUEUE_DELAY.observe(sent_at - enqueued_at)
+        BATCH_SIZE.observe(len(batch))
+
+        contents = [content for content, _, _, _ in batch]
+        sessions = [session for _, _, _, session in batch]
+        if len(batch) == 1:
+            results = await asyncio.gather(classify_one(client, contents[0], sessions[0]), return_exceptions=True)
+        else:
+            try:
+                results = await classify_many(client, contents, sessions)
+            except Exception as e:
+                # Transport errors and outages would hit every per-item retry too: fail the batch
+                print(f"❌ Cue Batch Error ({len(batch)} items): {e}")
+                results = [e] * len(batch)
+
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                FALLBACKS.inc(len(missing))
+                retried = await asyncio.gather(
+                    *(classify_one(client, contents[i], sessions[i]) for i in missing), return_exceptions=True
+                )
+                for i, result in zip(missing, retried):
+                    results[i] = result
+
+        for (_, future, _, _), result in zip(batch, results):
+            if future.done():  # caller went away
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+cue_batcher = CueBatcher()
@@ -0,0 +1,233 @@
+"""
+Local first-stage filter for realtime cue detection.
+
+Most utterances in a visit are greetings, questions or small talk, which the
+realtime prompt ignores anyway. Before calling gpt-4o-mini, each statement is
+scored against the five SDOH categories on the CPU:
+
+1. Lexicon: weighted phrase patterns per category. Questions and greetings
+   are discounted (a greeting followed by a cue word is not).
+2. Embedding prototypes (optional): cosine similarity to a few example
+   statements per category, using the guide's embedding model.
+
+Only statements scoring at least `cue_filter_threshold` go to the LLM. The
+filter is tuned for recall: a missed cue is worse than an extra call.
+"""
+import re
+import threading
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services import metrics
+
+DECISIONS = metrics.counter("cue_filter_decisions_total", "Realtime statements sent to the LLM or skipped locally")
+FILTER_SECONDS = metrics.histogram(
+    "cue_filter_seconds", "Local cue filter latency per statement",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+# (pattern, weight) per category; patterns match on lowercased text
+LEXICON = {
+    "Economic Stability": [
+        (r"\b(can ?not|can't|cant|couldn't|unable to) (afford|pay)\b", 1.0),
+        (r"\bafford\w*\b", 0.8),
+        (r"\b(rent|mortgage|eviction|evict\w*|foreclos\w*)\b", 0.8),
+        (r"\b(bills?|debt|overdue|past due|late fees?|utilit(y|ies)|shut ?off)\b", 0.7),
+        (r"\b(lost|lose|losing|no) (my |a |the )?(job|work|income|hours)\b", 1.0),
+        (r"\b(unemploy\w*|laid off|fired|paycheck|wages?|broke|money|cash|expensive|cost\w*)\b", 0.6),
+        (r"\b(food stamps|snap|wic|food bank|pantry|hungry|hunger|skip(ping)? meals?|enough (food|to eat))\b", 0.9),
+        (r"\b(homeless\w*|shelter|couch ?surf\w*|sleeping in (my|the) car)\b", 1.0),
+        (r"\b(pay for|get by|make ends meet|never enough|tight)\b", 0.6),
+        (r"\b(staying with (my|a|our) \w+|no place to (live|stay)|nowhere to (live|go|stay))\b", 0.8),
+    ],
+    "Education": [
+        (r"\b(can't|cannot|don't|do not) (read|write|understand)\b", 0.9),
+        (r"\b(school|class(es)?|teacher|homework|diploma|ged|degree|college|literacy)\b", 0.6),
+        (r"\b(dropped out|drop out|expelled|suspended)\b", 0.9),
+        (r"\b(english|language barrier|translator|interpreter)\b", 0.7),
+        (r"\b(confus\w*|don't understand|do not understand) (the )?(forms?|instructions|paperwork|letter)\b", 0.9),
+    ],
+    "Health Care": [
+        (r"\b(no|lost|without|don't have|lack of) (health )?(insurance|coverage|medicaid|medicare|doctor)\b", 1.0),
+        (r"\b(insurance|medicaid|medicare|copay|co-pay|deductible)\b", 0.6),
+        (r"\b(medications?|medicine|meds|prescriptions?|refills?|insulin|inhaler|pharmacy)\b", 0.6),
+        (r"\b(ran out|run out|running out|rationing|skip\w*) (of )?(my )?(meds|medications?|medicine|pills|insulin|doses?)\b", 1.0),
+        (r"\b(appointments?|clinic|hospital|emergency room|er visit|specialist|dentist)\b", 0.5),
+        (r"\b(miss\w*|cancel\w*|couldn't make|can't get) (my |an |the )?(appointments?|visits?|check-?ups?)\b", 1.0),
+        (r"\b(pain|hurt\w*|aches?|sick|symptoms?|diabet\w*|depress\w*|anxi\w*)\b", 0.4),
+        (r"\b(side effects|stopped taking|haven't seen (anyone|a doctor|the doctor))\b", 0.8),
+    ],
+    "Environment": [
+        (r"\b(mold|mould|leak\w*|pests?|roach\w*|rats?|mice|lead paint|no heat|no (air|ac)|broken (heater|furnace))\b", 0.9),
+        (r"\b(unsafe|dangerous|violence|shooting\w*|gangs?|crime|drugs in|break-?ins?)\b", 0.9),
+        (r"\b(neighbou?rhood|apartment|landlord|housing|building|street)\b", 0.4),
+        (r"\b((no|without a) (car|ride|transportation)|bus|transportation|transit|too far|miles away)\b", 0.7),
+        (r"\bhard to get (anywhere|there|around)\b", 0.7),
+        (r"\b(no (clean )?water|water\b.{0,30}\b(brown|dirty|cloudy)|pollution|smoke)\b", 0.8),
+        (r"\b(freezing|won't fix|will not fix|never fixes)\b", 0.8),
+    ],
+    "Social Context": [
+        (r"\b(alone|lonely|loneliness|isolated|no one|nobody|no friends|no family)\b", 0.8),
+        (r"\b(abus\w*|hits? me|hurt me|threaten\w*|afraid of (him|her|them)|domestic)\b", 1.0),
+        (r"\b(divorc\w*|separated|widow\w*|passed away|died|funeral|grief|grieving)\b", 0.7),
+        (r"\b(jail|prison|incarcerat\w*|probation|deport\w*|immigration|undocumented)\b", 0.9),
+        (r"\b(discriminat\w*|racis\w*|treated differently|harass\w*)\b", 0.9),
+        (r"\b(caregiver|taking care of my|care of my (mom|mother|dad|father|kids|children))\b", 0.6),
+        (r"\b(stress\w*|overwhelm\w*|can't cope|can't keep up|burn(ed|t) out)\b", 0.5),
+        (r"\b(feel\w* (down|sad|hopeless|worthless)|worr(y|ied|ying)|scared|afraid)\b", 0.5),
+        (r"\b(haven't left the house|don't see anyone|(not right|trouble|problems) at home)\b", 0.8),
+    ],
+}
+
+_COMPILED = {category: [(re.compile(p), w) for p, w in patterns] for category, patterns in LEXICON.items()}
+
+_GREETING_WORDS = (
+    r"(hi|hello|hey|good (morning|afternoon|evening)|thanks?( you)?|thank you|bye|goodbye|"
+    r"nice to (meet|see) you|how are you|ok(ay)?|yes|yeah|no|sure|alright|mm+|uh+|um+)"
+)
+# Nothing but greetings/acknowledgements ("Okay, thanks!")
+_GREETING_ONLY = re.compile(rf"^\s*({_GREETING_WORDS}\b[\s,.!']*)+$")
+# A greeting and a few more words ("Hi, good to see you Mr. Jones"); only discounted without a cue word
+_GREETING = re.compile(rf"^\s*{_GREETING_WORDS}\b[\s\w,.!']{{0,25}}$")
+_QUESTION_START = re.compile(r"^\s*(what|when|where|who|why|how|do|does|did|are|is|can|could|would|will|have|has)\b")
+
+# Example statements per category for the embedding stage
+PROTOTYPES = {
+    "Economic Stability": [
+        "I can't afford my rent this month",
+        "I lost my job and we are running out of money",
+        "We don't have enough food at home",
+    ],
+    "Education": [
+        "I can't read the instructions on these forms",
+        "I never finished school",
+        "I don't understand English very well",
+    ],
+    "Health Care": [
+        "I don't have health insurance",
+        "I ran out of my medication and can't get a refill",
+        "I missed my doctor's appointment again",
+    ],
+    "Environment": [
+        "There is mold in my apartment and the landlord won't fix it",
+        "My neighborhood isn't safe to walk at night",
+        "I have no ride to get to the clinic",
+    ],
+    "Social Context": [
+        "I feel alone and have nobody to talk to",
+        "My partner threatens me at home",
+        "I'm taking care of my mother by myself and I'm overwhelmed",
+    ],
+}
+NEUTRAL_PROTOTYPES = [
+    "Hello, how are you doing today?",
+    "Thank you, see you next week",
+    "Can you tell me a bit about yourself?",
+    "The weather is nice today",
+]
+
+
+def lexicon_scores(text):
+    """Score in [0, 1] per category: the strongest matching pattern, plus 0.1 per extra match."""
+    lowered = text.lower().replace("’", "'")
+    scores = {}
+    for category, patterns in _COMPILED.items():
+        weights = [w for pattern, w in patterns if pattern.search(lowered)]
+        if weights:
+            scores[category] = min(1.0, max(weights) + 0.1 * (len(weights) - 1))
+    return scores
+
+
+def _discount(text, lexicon):
+    """
+    Greetings and pure questions rarely carry cues; the realtime prompt ignores
+    them. A short answer that starts with one ("Yeah, I lost my job.") is only
+    discounted when no cue word matched (`lexicon` is empty).
+    """
+    stripped = text.strip().lower()
+    if _GREETING_ONLY.match(stripped) or (not lexicon and _GREETING.match(stripped)):
+        return 0.2
+    if stripped.endswith("?") and _QUESTION_START.match(stripped):
+        return 0.6
+    return 1.0
+
+
+class _PrototypeModel:
+    """Nearest-prototype classifier over sentence embeddings (loaded on first use)."""
+
+    def __init__(self, embed):
+        self.embed = embed
+        self.lock = threading.Lock()
+        self.categories = None
+        self.matrix = None
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _load(self):
+        with self.lock:
+            if self.matrix is None:
+                labels, texts = [], []
+                for category, examples in PROTOTYPES.items():
+                    labels += [category] * len(examples)
+                    texts += examples
+                labels += [None] * len(NEUTRAL_PROTOTYPES)
+                texts += NEUTRAL_PROTOTYPES
+                self.matrix = self._normalize(self.embed(texts))
+                self.categories = labels
+
+    def scores(self, text):
+        """Per-category similarity margin over the closest neutral prototype, in [0, 1]."""
+        self._load()
+        sims = self.matrix @ self._normalize(self.embed([text]))[0]
+        neutral = max(s for s, c in zip(sims, self.categories) if c is None)
+        scores = {}
+        for sim, category in zip(sims, self.categories):
+            if category is not None:
+                scores[category] = max(scores.get(category, 0.0), float(sim))
+        # Map "how much closer than small talk" onto [0, 1]
+        return {c: float(np.clip((s - neutral) * 2.5 + 0.5, 0.0, 1.0)) for c, s in scores.items()}
+
+
+def _default_embed(texts):
+    from app.services.guide_retrieval import get_embedding_function
+    return get_embedding_function()(texts)
+
+
+class CueFilter:
+    def __init__(self, threshold=None, embed=None):
+        self.threshold = settings.cue_filter_threshold if threshold is None else threshold
+        self.model = _PrototypeModel(embed) if embed else None
+        self._embed_failed = False
+
+    def score(self, text):
+        """(score, {category: score}) for one statement."""
+        lexicon = lexicon_scores(text)
+        scores = dict(lexicon)
+        if self.model is not None:
+            try:
+                for category, s in self.model.scores(text).items():
+                    scores[category] = max(scores.get(category, 0.0), s)
+                self._embed_failed = False
+            except Exception as e:
+                # Lexicon only for this statement; the next one tries the model again
+                # (the embedding loader backs off between failed loads)
+                if not self._embed_failed:
+                    print(f"⚠️ Cue filter embeddings unavailable, using the lexicon only: {e}")
+                self._embed_failed = True
+        discount = _discount(text, lexicon)
+        scores = {c: s * discount for c, s in scores.items()}
+        return max(scores.values(), default=0.0), scores
+
+    def is_candidate(self, text):
+        """True if the statement should go to the LLM."""
+        with FILTER_SECONDS.time():
+            score, _ = self.score(text)
+        candidate = score >= self.threshold
+        DECISIONS.inc(decision="llm" if candidate else "skipped")
+        return candidate
+
+
+cue_filter = CueFilter(embed=_default_embed if settings.cue_filter_embeddings else None)
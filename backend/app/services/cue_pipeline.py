@@ -0,0 +1,149 @@
+"""
+Per-connection task pipeline for /ws/audio.
+
+    receive -> [audio] -> transcribe -> [transcripts] -> classify -> [cues] -> send
+
+Each stage is its own asyncio task, joined by bounded queues, so incoming
+audio keeps draining while earlier utterances are being transcribed or
+classified. When a stage falls behind:
+
+- audio: the oldest queued blob is dropped (live cues about stale audio are
+  worth less than keeping up);
+- transcripts: everything waiting is coalesced into one classification call
+  (up to `ws_coalesce_max_chars`), and the oldest is dropped if the queue is full;
+- cues: the oldest unsent cue is dropped.
+
+Every cue message carries `seq`, the number of the (last) utterance it came
+from, so the dashboard can order cues and spot gaps.
+"""
+import asyncio
+import time
+
+from fastapi import WebSocketDisconnect
+
+from app.config.settings import settings
+from app.services import metrics
+
+QUEUE_DEPTH = metrics.gauge("ws_queue_depth", "Items waiting between /ws/audio pipeline stages (all connections)")
+DROPPED = metrics.counter("ws_dropped_total", "Items dropped by /ws/audio backpressure, by stage")
+COALESCED = metrics.counter("ws_coalesced_total", "Transcripts merged into another classification call")
+CUE_LATENCY = metrics.histogram("ws_cue_latency_seconds", "Blob received to cue sent on /ws/audio")
+
+
+def put_drop_oldest(queue, item, stage):
+    """Enqueue without blocking; when full, make room by dropping the oldest item."""
+    if queue.full():
+        queue.get_nowait()
+        DROPPED.inc(stage=stage)
+        print(f"⚠️ /ws/audio {stage} queue full, dropped oldest item.")
+    else:
+        QUEUE_DEPTH.inc(stage=stage)
+    queue.put_nowait(item)
+
+
+def _take(stage, item):
+    QUEUE_DEPTH.dec(stage=stage)
+    return item
+
+
+class CuePipeline:
+    """
+    Runs the four stages for one WebSocket until the client disconnects.
+
+    `transcriber` is a StreamingTranscriber (or None to only drain audio);
+    `classify(text, history)` returns the analysis dict for one statement
+    (None skips classification).
+    """
+
+    def __init__(self, websocket, transcriber, classify):
+        self.websocket = websocket
+        self.transcriber = transcriber
+        self.classify = classify
+        self.audio = asyncio.Queue(maxsize=settings.ws_audio_queue_size)
+        self.transcripts = asyncio.Queue(maxsize=settings.ws_transcript_queue_size)
+        self.cues = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self.conversation_history = []
+        self.utterance_seq = 0
+
+    async def receive(self):
+        while True:
+            try:
+                audio_data = await self.websocket.receive_bytes()
+            except WebSocketDisconnect:
+                print("🔴 Client Disconnected (during receive)")
+                return
+
+            if len(audio_data) < 100 or self.transcriber is None: continue
+            put_drop_oldest(self.audio, (audio_data, time.perf_counter()), "audio")
+
+    async def transcribe(self):
+        while True:
+            audio_data, received_at = _take("audio", await self.audio.get())
+            try:
+                texts = await self.transcriber.feed(audio_data)
+            except Exception as e:
+                print(f"❌ Transcription Error: {e}")
+                continue
+
+            for text in texts:
+                self.utterance_seq += 1
+                put_drop_oldest(self.transcripts, (self.utterance_seq, text, received_at), "transcripts")
+
+    async def classify_loop(self):
+        while True:
+            batch = [_take("transcripts", await self.transcripts.get())]
+            # Fell behind: fold everything already waiting into this call
+            while not self.transcripts.empty():
+                if sum(len(text) for _, text, _ in batch) >= settings.ws_coalesce_max_chars:
+                    break
+                batch.append(_take("transcripts", self.transcripts.get_nowait()))
+            if len(batch) > 1:
+                COALESCED.inc(len(batch) - 1)
+
+            seq = batch[-1][0]
+            transcript_text = " ".join(text for _, text, _ in batch)
+            received_at = batch[0][2]
+            print(f"   🗣️ User said: '{transcript_text}'")
+            if self.classify is None: continue
+
+            try:
+                analysis_data = await self.classify(transcript_text, self.conversation_history)
+            except Exception as e:
+                print(f"❌ LLM Logic Error: {e}")
+                continue
+
+            if analysis_data.get("detected_cues", []):
+                put_drop_oldest(self.cues, (seq, analysis_data, received_at), "cues")
+
+    async def send(self):
+        while True:
+            seq, analysis_data, received_at = _take("cues", await self.cues.get())
+            try:
+                await self.websocket.send_json({
+                    "type": "health_analysis",
+                    "seq": seq,
+                    "payload": analysis_data
+                })
+            except (WebSocketDisconnect, RuntimeError):
+                print("⚠️ Client disconnected while sending data.")
+                return
+            CUE_LATENCY.observe(time.perf_counter() - received_at)
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self.receive()),
+            asyncio.create_task(self.transcribe()),
+            asyncio.create_task(self.classify_loop()),
+            asyncio.create_task(self.send()),
+        ]
+        try:
+            # Receive/send only finish when the client goes away
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for stage, queue in (("audio", self.audio), ("transcripts", self.transcripts), ("cues", self.cues)):
+                QUEUE_DEPTH.dec(queue.qsize(), stage=stage)
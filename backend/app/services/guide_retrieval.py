@@ -0,0 +1,211 @@
+"""
+Retrieval over the CHW guide collection built by `chroma_generate.py`.
+
+The persistent client, the collection handle and the embedding function are
+opened once per process (see `init_guide_collection`, called at startup) and
+reused by every request. When Chroma or the embedding model can't be loaded,
+the failure is remembered and retried on a backoff (`chroma_retry_*`), not
+on every request.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+
+import chromadb
+from chromadb.utils import embedding_functions
+
+from app.config.settings import settings
+from app.services import metrics
+
+RETRIEVAL_SECONDS = metrics.histogram(
+    "rag_retrieval_seconds", "Latency of one batched Chroma query over the CHW guide"
+)
+RETRIEVAL_BATCH = metrics.histogram(
+    "rag_retrieval_batch_size", "Query texts per batched Chroma query", buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+
+class _Backoff:
+    """When a failed load may be tried again: the delay doubles per failure, up to `chroma_retry_max_seconds`."""
+
+    def __init__(self):
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+
+    def ready(self):
+        return time.monotonic() >= self.retry_at
+
+    def failed(self, error):
+        self.failures += 1
+        self.error = error
+        delay = min(settings.chroma_retry_max_seconds, settings.chroma_retry_base_seconds * 2 ** (self.failures - 1))
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+    def succeeded(self):
+        self.failures = 0
+        self.retry_at = 0.0
+        self.error = None
+
+
+_client = None
+_collection = None
+_embedding_function = None
+_collection_lock = threading.Lock()
+_embedding_lock = threading.Lock()
+_collection_backoff = _Backoff()
+_embedding_backoff = _Backoff()
+
+
+def get_embedding_function():
+    """
+    Process-wide embedding function (same model the collection was built with).
+    Raises if the model can't be loaded; after a failure, until the backoff
+    expires, without trying again.
+    """
+    global _embedding_function
+    if _embedding_function is not None:
+        return _embedding_function
+
+    with _embedding_lock:
+        if _embedding_function is None:
+            if not _embedding_backoff.ready():
+                raise RuntimeError(f"Embedding model unavailable: {_embedding_backoff.error}")
+            try:
+                embedding_function = embedding_functions.DefaultEmbeddingFunction()
+                # First call loads the ONNX model; do it now instead of on a live request.
+                embedding_function(["warm up"])
+            except Exception as e:
+                delay = _embedding_backoff.failed(e)
+                print(f"❌ Embedding Model Error: {e} (retrying in {delay:.0f}s)")
+                raise
+            _embedding_backoff.succeeded()
+            _embedding_function = embedding_function
+    return _embedding_function
+
+
+def init_guide_collection():
+    """Open the persistent guide collection. Safe to call more than once; None while unavailable."""
+    global _client, _collection
+    if _collection is not None:
+        return _collection
+
+    with _collection_lock:
+        if _collection is not None or not _collection_backoff.ready():
+            return _collection
+        try:
+            embedding_function = get_embedding_function()
+            _client = chromadb.PersistentClient(path=settings.chroma_path)
+            collection = _client.get_collection(
+                name=settings.chroma_collection,
+                embedding_function=embedding_function,
+            )
+            print(f"📚 Guide collection '{settings.chroma_collection}' loaded ({collection.count()} chunks)")
+        except Exception as e:
+            delay = _collection_backoff.failed(e)
+            print(f"❌ Chroma Init Error: {e} (retrying in {delay:.0f}s)")
+            return None
+        _collection_backoff.succeeded()
+        _collection = collection
+    return _collection
+
+
+def get_guide_collection():
+    return _collection
+
+
+_fingerprint = (None, "")  # (chunk count it was computed at, fingerprint)
+
+
+def guide_fingerprint(page_size=5000):
+    """
+    Short hash of the loaded guide's window ids ("" while it isn't loaded).
+    Ids are content hashes (see `chroma_generate.window_id`), so a re-ingest
+    that changes the guide changes the fingerprint. It is recomputed when the
+    chunk count changes; an edit that keeps the count is picked up on restart.
+    """
+    global _fingerprint
+    collection = _collection
+    if collection is None:
+        return ""
+    try:
+        count = collection.count()
+        if _fingerprint[0] != count:
+            ids, offset = [], 0
+            while True:
+                page = collection.get(include=[], limit=page_size, offset=offset)["ids"]
+                ids.extend(page)
+                offset += page_size
+                if len(page) < page_size:
+                    break
+            _fingerprint = (count, hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()[:12])
+    except Exception as e:
+        print(f"❌ Chroma Fingerprint Error: {e}")
+        return ""
+    return _fingerprint[1]
+
+
+def _source_filter(sources):
+    if not sources:
+        return None
+    if len(sources) == 1:
+        return {"source": sources[0]}
+    return {"source": {"$in": list(sources)}}
+
+
+def query_guide(texts, n_results=None, sources=None):
+    """
+    Look up every text in one `collection.query` call.
+
+    `sources` restricts matches to the given documents (the `source` metadata
+    written by `chroma_generate.py`); it defaults to `settings.rag_sources`,
+    and an empty list searches everything.
+
+    Returns one list per input text of `{"text", "chapter", "source", "document",
+    "distance"}` dicts, best match first. Missing collection or query errors yield empty lists
+    so callers can still answer without guide context.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    collection = init_guide_collection()  # retries a failed init once its backoff expires
+    if collection is None:
+        return [[] for _ in texts]
+
+    start = time.perf_counter()
+    try:
+        results = collection.query(
+            query_texts=texts,
+            n_results=n_results or settings.rag_top_k,
+            where=_source_filter(settings.rag_sources if sources is None else sources),
+            include=["documents", "metadatas", "distances"],
+        )
+    except Exception as e:
+        print(f"❌ Chroma Query Error: {e}")
+        return [[] for _ in texts]
+    finally:
+        RETRIEVAL_SECONDS.observe(time.perf_counter() - start)
+        RETRIEVAL_BATCH.observe(len(texts))
+
+    matches = []
+    for documents, metadatas, distances in zip(
+        results["documents"], results["metadatas"], results["distances"]
+    ):
+        matches.append([
+            {
+                "text": document,
+                "chapter": (metadata or {}).get("chapter", ""),
+                "source": (metadata or {}).get("source", ""),
+                "document": (metadata or {}).get("document", ""),
+                "distance": distance,
+            }
+            for document, metadata, distance in zip(documents, metadatas, distances)
+        ])
+    return matches
+
+
+async def aquery_guide(texts, n_results=None, sources=None):
+    """`query_guide` off the event loop (Chroma and the embedder are synchronous)."""
+    return await asyncio.to_thread(query_guide, texts, n_results, sources)
@@ -0,0 +1,107 @@
+"""
+Incremental parser for a JSON object streamed by the model.
+
+`feed(text)` takes the next chunk of output and returns the events that
+became complete with it:
+
+- ("field", key, value): a top-level key whose value is now complete
+  (e.g. "summary", "stats", "extracted_names");
+- ("item", key, index, value): one element of a top-level array listed in
+  `array_keys` (e.g. each turn of "conversation"), as soon as it closes.
+
+Values are only parsed once they are complete, so every event carries valid
+JSON. `result()` parses the whole buffer at the end.
+"""
+import json
+
+
+class StreamingJSONParser:
+    def __init__(self, array_keys=("conversation",)):
+        self.array_keys = set(array_keys)
+        self.buffer = []
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.state = "start"  # start -> key -> colon -> value -> key ... -> done
+        self.key = None
+        self.value_start = None
+        self.value_is_scalar = False
+        self.item_start = None
+        self.item_index = 0
+
+    def _text(self, start, end):
+        return "".join(self.buffer[start:end])
+
+    def _emit_field(self, events, end):
+        raw = self._text(self.value_start, end).strip()
+        events.append(("field", self.key, json.loads(raw)))
+        self.value_start = None
+        self.state = "after_value"
+
+    def feed(self, text):
+        events = []
+        for c in text:
+            i = self.pos
+            self.buffer.append(c)
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.state == "key":
+                        self.key = json.loads(self._text(self.string_start, i + 1))
+                        self.state = "colon"
+                    elif self.depth == 1 and self.state == "value" and self.value_is_scalar:
+                        self._emit_field(events, i + 1)
+                continue
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.state == "key":
+                    self.string_start = i
+                elif self.depth == 1 and self.state == "value" and self.value_start is None:
+                    self.value_start = i
+                    self.value_is_scalar = True
+            elif c in "{[":
+                if self.depth == 1 and self.state == "value" and self.value_start is None:
+                    self.value_start = i
+                    self.value_is_scalar = False
+                    self.item_index = 0
+                elif self.depth == 2 and self.key in self.array_keys and not self.value_is_scalar:
+                    self.item_start = i
+                self.depth += 1
+                if self.depth == 1:
+                    self.state = "key"
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    events.append(("item", self.key, self.item_index, json.loads(self._text(self.item_start, i + 1))))
+                    self.item_start = None
+                    self.item_index += 1
+                elif self.depth == 1 and self.state == "value" and self.value_start is not None:
+                    self._emit_field(events, i + 1)
+                elif self.depth == 0:
+                    if self.state == "value" and self.value_start is not None:
+                        self._emit_field(events, i)  # trailing number/bool/null
+                    self.state = "done"
+            elif self.depth == 1:
+                if c == ":" and self.state == "colon":
+                    self.state = "value"
+                    self.value_start = None
+                elif c == ",":
+                    if self.state == "value" and self.value_start is not None:
+                        self._emit_field(events, i)  # number/bool/null
+                    self.state = "key"
+                elif self.state == "value" and self.value_start is None and not c.isspace():
+                    self.value_start = i
+                    self.value_is_scalar = True
+        return events
+
+    def result(self):
+        return json.loads(self._text(0, self.pos))
@@ -1,115 +1,287 @@
+import asyncio
+import hashlib
 import json
 
-SYSTEM_PROMPT_FULL = """
-You are an advanced Medical Scribe. You will receive a raw transcript of a conversation between a Community Health Worker (CHW) and a Patient, along with biometric audio data.
-
-**YOUR TASKS:**
-
-1. **METADATA EXTRACTION:**
-   - Look for introductions (e.g., "Hi, I'm Sarah", "Good morning Mr. Jones").
-   - Extract the **CHW Name** and **Patient Name**.
-   - If a name is not spoken, return "Unknown".
-
-2. **DIARIZATION (Speaker Identification):**
-   - Split the text into "CHW" and "Patient" turns.
-   - You MUST include EVERY turn.
-
-3. **CHW PERFORMANCE ANALYSIS:**
-   - Count **Open-Ended** vs **Closed-Ended** questions asked by the CHW.
-
-4. **PATIENT CUE TAGGING:**
-   - Tag issues: "Economic Stability", "Education", "Health Care", "Environment", "Social Context".
-   - **Mismatch:** If Audio Energy < 40 but text is positive, flag `is_masked_distress: true`.
-   - **Hesitation:** If text has stutters, flag `is_hesitation: true`.
-
-5. **CLINICAL SUMMARY:**
-   - Provide a 3-4 sentence clinical assessment summary.
-
-**OUTPUT SCHEMA (Strict JSON):**
-{
-  "extracted_names": {
-    "chw_name": "Name or Unknown",
-    "patient_name": "Name or Unknown"
-  },
-  "summary": "Clinical summary...",
-  "stats": {
-    "open_ended_questions": 0,
-    "closed_ended_questions": 0
-  },
-  "conversation": [
-    {
-      "speaker": "CHW",
-      "text": "Hello, I am Sarah.",
-      "cues": [], 
-      "is_masked_distress": false,
-      "is_hesitation": false
+from app.config.settings import settings
+from app.services import llm_usage, prompts
+from app.services.json_stream import StreamingJSONParser
+from app.services.prompts import (SYSTEM_PROMPT_CHUNK, SYSTEM_PROMPT_COMBINED, SYSTEM_PROMPT_FORM,
+                                  SYSTEM_PROMPT_FULL, SYSTEM_PROMPT_REDUCE)
+from app.services.transcript_chunks import chunk_transcript, merge_turns
+
+ANALYSIS_MODEL = prompts.ANALYSIS.model
+
+
+def analysis_cache_key(audio_stats):
+    """Identifies the prompt, model and biometric input behind an `analyze_transcript` result."""
+    energy_score = audio_stats.get('energy_score', 50)
+    combined = SYSTEM_PROMPT_COMBINED if settings.combined_form_extraction else ""
+    long_mode = (f"{SYSTEM_PROMPT_CHUNK}\x1f{SYSTEM_PROMPT_REDUCE}\x1f{settings.long_transcript_chars}"
+                 f"\x1f{settings.long_transcript_chunk_chars}\x1f{settings.long_transcript_overlap_sentences}")
+    fingerprint = f"{ANALYSIS_MODEL}\x1f{SYSTEM_PROMPT_FULL}\x1f{combined}\x1f{long_mode}\x1f{energy_score}"
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+def analysis_fallback():
+    return {
+        "extracted_names": {"chw_name": "Unknown", "patient_name": "Unknown"},
+        "summary": "Error analyzing conversation.",
+        "stats": {"open_ended_questions": 0, "closed_ended_questions": 0},
+        "conversation": []
     }
-  ]
-}
-"""
 
-def analyze_transcript(client, raw_text, audio_stats):
+
+def _biometric_context(audio_stats):
     energy_score = audio_stats.get('energy_score', 50)
     
-    context_string = f"""
+    return f"""
     BIOMETRIC CONTEXT:
     - Patient Audio Energy Score: {energy_score}/100 
     (Note: < 40 indicates lethargy. > 70 indicates anxiety).
     """
 
+
+def _analysis_sections(raw_text, audio_stats):
+    # Per-session biometric context before the transcript
+    return _biometric_context(audio_stats), f"RAW TRANSCRIPT:\n{raw_text}"
+
+
+async def analyze_transcript(client, raw_text, audio_stats):
+    if is_long_transcript(raw_text):
+        return await analyze_long_transcript(client, raw_text, audio_stats)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", 
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT_FULL},
-                {"role": "user", "content": f"{context_string}\n\nRAW TRANSCRIPT:\n{raw_text}"}
-            ]
-        )
+        response = await llm_usage.chat(client, prompts.ANALYSIS, *_analysis_sections(raw_text, audio_stats))
         return json.loads(response.choices[0].message.content)
     except Exception as e:
         print(f"LLM Error: {e}")
-        return {
-            "extracted_names": {"chw_name": "Unknown", "patient_name": "Unknown"},
-            "summary": "Error analyzing conversation.",
-            "stats": {"open_ended_questions": 0, "closed_ended_questions": 0},
-            "conversation": []
-        }
-    
+        return analysis_fallback()
+
+
+async def analyze_transcript_stream(client, raw_text, audio_stats):
+    """
+    Streaming `analyze_transcript`. Yields events as the model writes them:
+    ("field", key, value) for each completed top-level key, ("turn", index,
+    turn) for each completed conversation turn, and finally ("result", dict)
+    with the whole analysis. If the stream fails midway, the result is the
+    fallback dict carrying the fields and turns already sent (so it never
+    contradicts what the client has shown), marked `"incomplete": True`.
+    """
+    if is_long_transcript(raw_text):
+        async for event in iter_long_analysis(client, raw_text, audio_stats):
+            yield event
+        return
+
+    parser = StreamingJSONParser(array_keys=("conversation",))
+    fields, turns = {}, []
+    try:
+        stream = llm_usage.chat_stream(client, prompts.ANALYSIS, *_analysis_sections(raw_text, audio_stats))
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for event in parser.feed(delta):
+                if event[0] == "item":
+                    _, _, index, turn = event
+                    turns.append(turn)
+                    yield ("turn", index, turn)
+                elif event[1] != "conversation":
+                    fields[event[1]] = event[2]
+                    yield event
+        result = parser.result()
+    except Exception as e:
+        print(f"LLM Error: {e}")
+        result = {**analysis_fallback(), **fields, "conversation": turns, "incomplete": True}
+    yield ("result", result)
+
+
+# --- LONG TRANSCRIPTS (map-reduce) ---
+
+def is_long_transcript(raw_text):
+    return settings.long_transcript_chars > 0 and len(raw_text) > settings.long_transcript_chars
+
+
+def _count(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+async def _analyze_part(client, semaphore, context, body, index, total, audio_stats):
+    sections = [_biometric_context(audio_stats), f"PART {index + 1} OF {total}"]
+    if context:
+        sections.append(f"PRECEDING CONTEXT (do not diarize):\n{context}")
+    sections.append(f"CURRENT PART:\n{body}")
+
+    for attempt in range(2):
+        try:
+            async with semaphore:
+                response = await llm_usage.chat(client, prompts.ANALYSIS_PART, *sections)
+            part = json.loads(response.choices[0].message.content)
+            if isinstance(part.get("conversation"), list):
+                return part
+        except Exception as e:
+            print(f"LLM Error (part {index + 1}/{total}, attempt {attempt + 1}): {e}")
+
+    # Keep the words even if this part could not be diarized
+    return {
+        "conversation": [{"speaker": "Unknown", "text": body, "cues": [],
+                          "is_masked_distress": False, "is_hesitation": False}],
+        "notes": "",
+    }
+
+
+async def _summarize_parts(client, notes, audio_stats):
+    numbered = "\n".join(f"{i}. {note}" for i, note in enumerate(notes, start=1) if note)
+    try:
+        response = await llm_usage.chat(client, prompts.ANALYSIS_SUMMARY,
+                                        _biometric_context(audio_stats), f"NOTES BY PART:\n{numbered}")
+        return json.loads(response.choices[0].message.content)["summary"]
+    except Exception as e:
+        print(f"LLM Error (summary): {e}")
+        return " ".join(note for note in notes if note) or "Error analyzing conversation."
+
+
+async def iter_long_analysis(client, raw_text, audio_stats):
+    """
+    Map-reduce analysis with the same events as `analyze_transcript_stream`.
+
+    Map: sentence-aligned parts (with preceding-context overlap) are diarized
+    and tagged in parallel. Reduce: turns are concatenated in order (a turn
+    split across parts is joined), question counts summed, the first known
+    names kept, and one last call writes the summary from the per-part notes.
+    Turns are yielded in order as soon as every earlier part is done.
+    """
+    chunks = chunk_transcript(raw_text, settings.long_transcript_chunk_chars,
+                              settings.long_transcript_overlap_sentences)
+    print(f"🧩 Long transcript ({len(raw_text)} chars): analyzing {len(chunks)} parts in parallel")
+    semaphore = asyncio.Semaphore(settings.long_transcript_max_concurrency)
+    tasks = [
+        asyncio.create_task(_analyze_part(client, semaphore, context, body, i, len(chunks), audio_stats))
+        for i, (context, body) in enumerate(chunks)
+    ]
+
+    names = {"chw_name": "Unknown", "patient_name": "Unknown"}
+    stats = {"open_ended_questions": 0, "closed_ended_questions": 0}
+    conversation, notes, emitted = [], [], 0
+    try:
+        for task in tasks:
+            part = await task
+            merge_turns(conversation, part.get("conversation") or [])
+            # Hold back the last turn: it may continue in the next part
+            for index in range(emitted, len(conversation) - 1):
+                yield ("turn", index, conversation[index])
+            emitted = max(emitted, len(conversation) - 1)
 
-SYSTEM_PROMPT_FORM = """
-You are a Medical Data Assistant. Your goal is to extract structured data from a CHW-Patient conversation to pre-fill an Encounter Form.
-
-**AVAILABLE OPTIONS (Exact String Matching Required):**
-- Topics: "General check in", "Chronic conditions (diabetes, hypertension, asthma, etc.)", "Medication use and adherence", "Nutrition", "Physical activity", "Substance use", "Mental health", "Preventive care (screenings, vaccines)", "Housing instability", "Food insecurity", "Transportation needs", "Employment or financial needs", "Safety concerns", "Insurance or benefits navigation", "Scheduling appointments", "Understanding care plans", "Follow up on missed appointments", "Support after hospital/ER discharge", "Advocacy", "Emotional support", "Crisis support".
-- Referrals: "Primary care", "Specialty care", "Behavioral health", "Emergency services", "Housing services", "Food pantry or SNAP", "Transportation program", "Social services / case management", "Community education classes", "Legal or immigration support".
-- Risks: "Mental health crisis", "Suicidal ideation", "Domestic violence", "Substance misuse", "Child or elder safety concern", "Medical emergency symptoms", "Severe food insecurity", "Homelessness", "Unmet medication needs".
-
-**OUTPUT SCHEMA (JSON):**
-{
-  "patientName": "Extracted Name",
-  "topics": ["Array of strings matching options above"],
-  "referrals": ["Array of strings matching options above"],
-  "risks": ["Array of strings matching options above"],
-  "stageOfChange": ["Patient is not thinking about making changes.", "Patient is thinking about making changes.", "Patient plans to make changes soon.", "Patient is already making changes.", "Patient has been maintaining changes.", "Patient tried but slipped back to old habits."],
-  "patientGoals": "Summary of goals mentioned",
-  "confidence": "1" to "5" (String),
-  "chwNotes": "Summary of the interaction",
-  "followUpPlan": "Action items mentioned"
-}
-"""
-
-def extract_form_data(client, raw_text):
+            part_names = part.get("extracted_names") or {}
+            for key in names:
+                if names[key] == "Unknown" and part_names.get(key):
+                    names[key] = part_names[key]
+            part_stats = part.get("stats") or {}
+            for key in stats:
+                stats[key] += _count(part_stats.get(key, 0))
+            notes.append(part.get("notes") or "")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    for index in range(emitted, len(conversation)):
+        yield ("turn", index, conversation[index])
+    yield ("field", "extracted_names", names)
+    yield ("field", "stats", stats)
+
+    summary = await _summarize_parts(client, notes, audio_stats)
+    yield ("field", "summary", summary)
+    yield ("result", {"extracted_names": names, "summary": summary, "stats": stats, "conversation": conversation})
+
+
+async def analyze_long_transcript(client, raw_text, audio_stats):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", # 4o is better for complex extraction
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT_FORM},
-                {"role": "user", "content": f"TRANSCRIPT:\n{raw_text}"}
-            ]
-        )
+        async for event in iter_long_analysis(client, raw_text, audio_stats):
+            if event[0] == "result":
+                return event[1]
+    except Exception as e:
+        print(f"LLM Error: {e}")
+    return analysis_fallback()
+
+
+# --- ENCOUNTER FORM ---
+
+FORM_MODEL = prompts.FORM.model
+
+
+async def extract_form_data(client, raw_text):
+    try:
+        response = await llm_usage.chat(client, prompts.FORM, f"TRANSCRIPT:\n{raw_text}")
         return json.loads(response.choices[0].message.content)
     except Exception as e:
         print(f"Form Extraction Error: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+
+# --- COMBINED ANALYSIS + ENCOUNTER FORM (one request) ---
+
+FORM_LIST_FIELDS = ("topics", "referrals", "risks", "stageOfChange")
+FORM_TEXT_FIELDS = ("patientName", "patientGoals", "confidence", "chwNotes", "followUpPlan")
+
+
+def dashboard_transcript(conversation):
+    """The transcript exactly as the dashboard sends it to /extract-form-data."""
+    return "\n".join(f"{turn.get('speaker')}: {turn.get('text')}" for turn in conversation or [])
+
+
+def form_cache_key(transcript):
+    """SHA-256 of the form prompt, model and transcript; the digest used by `form_cache`."""
+    fingerprint = f"{FORM_MODEL}\x1f{SYSTEM_PROMPT_FORM}\x1f{transcript}"
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def is_valid_analysis(data):
+    return (
+        isinstance(data, dict)
+        and isinstance(data.get("conversation"), list)
+        and all(isinstance(t, dict) and "speaker" in t and "text" in t for t in data["conversation"])
+        and isinstance(data.get("summary"), str)
+        and isinstance(data.get("stats"), dict)
+        and isinstance(data.get("extracted_names"), dict)
+    )
+
+
+def is_valid_form(data):
+    return (
+        isinstance(data, dict)
+        and all(isinstance(data.get(k), list) and all(isinstance(v, str) for v in data[k]) for k in FORM_LIST_FIELDS)
+        and all(isinstance(data.get(k), (str, int)) for k in FORM_TEXT_FIELDS)
+    )
+
+
+async def analyze_transcript_with_form(client, raw_text, audio_stats):
+    """
+    (analysis, form) from a single GPT-4o request.
+
+    If the analysis part fails validation it is redone with `analyze_transcript`;
+    an invalid form part comes back as None (extract it separately when needed).
+    Long transcripts always use the map-reduce analysis and return no form.
+    """
+    if is_long_transcript(raw_text):
+        return await analyze_long_transcript(client, raw_text, audio_stats), None
+
+    analysis, form = None, None
+    try:
+        response = await llm_usage.chat(client, prompts.ANALYSIS_WITH_FORM, *_analysis_sections(raw_text, audio_stats))
+        combined = json.loads(response.choices[0].message.content)
+        analysis = combined.get("analysis")
+        form = combined.get("encounter_form")
+    except Exception as e:
+        print(f"Combined Analysis Error: {e}")
+
+    if not is_valid_analysis(analysis):
+        print("⚠️ Combined analysis failed validation; falling back to a separate analysis call.")
+        analysis = await analyze_transcript(client, raw_text, audio_stats)
+    if not is_valid_form(form):
+        print("⚠️ Combined encounter form failed validation; it will be extracted separately.")
+        form = None
+    return analysis, form
@@ -0,0 +1,351 @@
+"""
+Resilient wrapper around the AsyncOpenAI client.
+
+`ResilientOpenAI(client)` has the same surface the backend uses
+(`chat.completions.create`, `audio.transcriptions.create`). Each call also
+takes a `call_site` (the name used by `llm_usage`) and gets:
+
+- a per-attempt timeout, plus an overall deadline that includes retries.
+  Realtime call sites (/ws/audio) get the short `llm_realtime_*` budget;
+- retries on 429, 5xx, connection errors and timeouts, with full-jitter
+  exponential backoff (honouring `Retry-After` on 429);
+- on realtime chat calls, a hedged duplicate request when the first has not
+  answered within `llm_hedge_after_seconds`. The first success wins and the
+  other request is cancelled;
+- a circuit breaker per model. It opens when at least
+  `llm_breaker_failure_threshold` of the last `llm_breaker_window` attempts
+  failed (5xx, connection error, timeout) and they make up at least
+  `llm_breaker_failure_ratio` of them. While it is open, calls fail fast
+  with `LLMUnavailable`, so callers use their fallback payloads. After
+  `llm_breaker_reset_seconds`, one trial request decides whether it closes.
+  429s are retried but never open it: the API is up, only our quota is spent;
+- a process-wide budget: at most `llm_max_concurrency` requests in flight
+  and `llm_max_requests_per_second` started.
+
+Per-call overrides (`timeout_seconds`, `deadline_seconds`, `max_retries`,
+`retry_base_seconds`, `hedge_after_seconds`) are taken out of the kwargs
+before they reach OpenAI. Build the underlying client with `max_retries=0`
+so retries are not done twice.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import openai
+
+from app.config.settings import settings
+from app.services import metrics
+
+REALTIME_CALL_SITES = {"realtime_cues", "realtime_cues_batch", "transcription_stream"}
+# Chat calls whose duplicate is cheap enough to hedge (transcriptions share an open file)
+HEDGED_CALL_SITES = {"realtime_cues", "realtime_cues_batch"}
+
+ATTEMPT_LATENCY = metrics.histogram("llm_attempt_seconds", "Latency of each OpenAI attempt by call site and outcome")
+BUDGET_WAIT = metrics.histogram(
+    "llm_budget_wait_seconds", "Time a request waited for the process-wide concurrency/rate budget",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+RETRIES = metrics.counter("llm_retries_total", "OpenAI attempts retried, by call site and reason")
+HEDGES = metrics.counter("llm_hedges_total", "Hedged duplicate requests sent, by call site and winner")
+BREAKER_REJECTED = metrics.counter("llm_breaker_rejected_total", "Calls failed fast by an open circuit breaker")
+BREAKER_OPEN = metrics.gauge("llm_breaker_open", "1 while a model's circuit breaker is open")
+IN_FLIGHT = metrics.gauge("llm_in_flight", "OpenAI requests currently in flight")
+
+_OVERRIDES = ("timeout_seconds", "deadline_seconds", "max_retries", "retry_base_seconds", "hedge_after_seconds")
+
+
+class LLMUnavailable(Exception):
+    """The circuit breaker for this model is open; use the fallback."""
+
+
+def is_outage(error):
+    """Errors that say the model is unhealthy (and count towards its circuit breaker)."""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return is_retryable(error)
+
+
+def is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_reason(error):
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+        return "timeout"
+    if isinstance(error, openai.APIStatusError):
+        return str(error.status_code)
+    return "connection"
+
+
+def _retry_after(error):
+    """Seconds requested by a 429's Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=None, reset_seconds=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.llm_breaker_failure_threshold
+        self.failure_ratio = settings.llm_breaker_failure_ratio
+        self.reset_seconds = settings.llm_breaker_reset_seconds if reset_seconds is None else reset_seconds
+        self.outcomes = deque(maxlen=max(self.failure_threshold, settings.llm_breaker_window))  # True = success
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_in_flight:
+            return False
+        self.trial_in_flight = True  # half-open: one request decides
+        return True
+
+    def success(self):
+        self.outcomes.append(True)
+        self.trial_in_flight = False
+        if self.opened_at is not None:
+            print(f"🟢 LLM circuit closed ({self.name})")
+            self.opened_at = None
+            self.outcomes.clear()
+            BREAKER_OPEN.set(0, model=self.name)
+
+    def failure(self):
+        self.outcomes.append(False)
+        self.trial_in_flight = False
+        failures = self.outcomes.count(False)
+        if self.opened_at is not None:
+            self.opened_at = time.monotonic()  # the trial failed: stay open
+        elif failures >= self.failure_threshold and failures / len(self.outcomes) >= self.failure_ratio:
+            print(f"🔴 LLM circuit open ({self.name}): {failures} of the last {len(self.outcomes)} attempts failed")
+            self.opened_at = time.monotonic()
+            BREAKER_OPEN.set(1, model=self.name)
+
+
+class RequestBudget:
+    """Process-wide cap on concurrent requests and on request starts per second."""
+
+    def __init__(self, max_concurrency=None, per_second=None):
+        self.semaphore = asyncio.Semaphore(max_concurrency or settings.llm_max_concurrency)
+        self.per_second = settings.llm_max_requests_per_second if per_second is None else per_second
+        self._next_start = 0.0
+
+    async def acquire(self):
+        start = time.perf_counter()
+        await self.semaphore.acquire()
+        try:
+            if self.per_second > 0:
+                now = time.monotonic()
+                slot = max(now, self._next_start)
+                self._next_start = slot + 1.0 / self.per_second
+                if slot > now:
+                    await asyncio.sleep(slot - now)
+        except BaseException:
+            self.semaphore.release()  # cancelled while waiting for a start slot
+            raise
+        BUDGET_WAIT.observe(time.perf_counter() - start)
+        IN_FLIGHT.inc()
+
+    def release(self):
+        IN_FLIGHT.dec()
+        self.semaphore.release()
+
+
+_shared_budget = None
+
+
+def shared_budget():
+    """The process-wide `RequestBudget` (created on first use, from the current settings)."""
+    global _shared_budget
+    if _shared_budget is None:
+        _shared_budget = RequestBudget()
+    return _shared_budget
+
+
+class GuardedStream:
+    """
+    A streamed response that gives its budget slot back once exhausted,
+    failed or closed. Each chunk must arrive within `idle_timeout`.
+    """
+
+    def __init__(self, stream, release, idle_timeout):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._release = release
+        self._released = False
+        self.idle_timeout = idle_timeout
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._released:
+            raise StopAsyncIteration
+        try:
+            return await asyncio.wait_for(self._iterator.__anext__(), self.idle_timeout)
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        if self._released:
+            return
+        self._released = True
+        self._release()
+        close = getattr(self._stream, "aclose", None) or getattr(self._stream, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+    def __del__(self):
+        if not self._released:
+            self._released = True
+            self._release()
+
+
+class ResilientOpenAI:
+    def __init__(self, client, budget=None):
+        self.client = client
+        self.budget = budget or shared_budget()
+        self.breakers = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat))
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create_transcription))
+
+    def breaker(self, model):
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(model)
+        return self.breakers[model]
+
+    def _policy(self, call_site, overrides):
+        realtime = call_site in REALTIME_CALL_SITES
+        policy = {
+            "timeout_seconds": settings.llm_realtime_timeout_seconds if realtime else settings.llm_timeout_seconds,
+            "deadline_seconds": settings.llm_realtime_deadline_seconds if realtime else settings.llm_deadline_seconds,
+            "max_retries": settings.llm_max_retries,
+            "retry_base_seconds": settings.llm_retry_base_seconds,
+            "hedge_after_seconds": settings.llm_hedge_after_seconds if call_site in HEDGED_CALL_SITES else 0,
+        }
+        policy.update({key: value for key, value in overrides.items() if value is not None})
+        return policy
+
+    async def _create_chat(self, call_site="unknown", **kwargs):
+        overrides = {key: kwargs.pop(key, None) for key in _OVERRIDES}
+        policy = self._policy(call_site, overrides)
+        if kwargs.get("stream"):
+            policy["hedge_after_seconds"] = 0
+        return await self._call(self.client.chat.completions.create, call_site, kwargs.get("model", ""), kwargs, policy)
+
+    async def _create_transcription(self, call_site="unknown", **kwargs):
+        overrides = {key: kwargs.pop(key, None) for key in _OVERRIDES}
+        policy = self._policy(call_site, overrides)
+        policy["hedge_after_seconds"] = 0
+        return await self._call(self.client.audio.transcriptions.create, call_site, kwargs.get("model", ""), kwargs, policy)
+
+    async def _call(self, create, call_site, model, kwargs, policy):
+        breaker = self.breaker(model)
+        deadline = time.monotonic() + policy["deadline_seconds"]
+        for attempt in range(policy["max_retries"] + 1):
+            if not breaker.allow():
+                BREAKER_REJECTED.inc(model=model)
+                raise LLMUnavailable(f"{model} circuit open; failing fast")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{call_site} deadline exceeded")
+            try:
+                timeout = min(policy["timeout_seconds"], remaining)
+                if policy["hedge_after_seconds"] > 0:
+                    result = await asyncio.wait_for(
+                        self._hedged(create, call_site, kwargs, timeout, policy["hedge_after_seconds"]), timeout
+                    )
+                else:
+                    result = await self._attempt(create, call_site, kwargs, timeout)
+            except Exception as e:
+                retryable = is_retryable(e)
+                if is_outage(e):
+                    breaker.failure()
+                else:
+                    breaker.trial_in_flight = False
+                # Full jitter, but never sooner than a 429's Retry-After
+                delay = random.uniform(0, min(settings.llm_retry_max_seconds,
+                                              policy["retry_base_seconds"] * (2 ** attempt)))
+                delay = max(delay, _retry_after(e) or 0)
+                if not retryable or attempt == policy["max_retries"] or time.monotonic() + delay >= deadline:
+                    raise
+                RETRIES.inc(call_site=call_site, reason=_retry_reason(e))
+                print(f"⚠️ LLM {call_site} attempt {attempt + 1} failed ({_retry_reason(e)}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.trial_in_flight = False  # cancelled mid-trial: let the next request probe
+                raise
+            breaker.success()
+            return result
+
+    async def _attempt(self, create, call_site, kwargs, timeout):
+        audio_file = kwargs.get("file")
+        if hasattr(audio_file, "seek"):
+            audio_file.seek(0)  # a retry re-sends the whole file
+
+        await self.budget.acquire()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await asyncio.wait_for(create(**kwargs), timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            ATTEMPT_LATENCY.observe(time.perf_counter() - start, call_site=call_site, outcome=outcome)
+            if outcome != "ok" or not kwargs.get("stream"):
+                self.budget.release()
+        if kwargs.get("stream"):
+            # A stream holds its budget slot until it is consumed or closed
+            return GuardedStream(result, self.budget.release, timeout)
+        return result
+
+    async def _hedged(self, create, call_site, kwargs, timeout, hedge_after):
+        primary = asyncio.create_task(self._attempt(create, call_site, kwargs, timeout))
+        names = {primary: "primary"}
+        pending = {primary}
+        winner = None
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                winner = primary
+                return primary.result()
+
+            hedge = asyncio.create_task(self._attempt(create, call_site, kwargs, timeout))
+            names[hedge] = "hedge"
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if winner is None and task.exception() is None:
+                        winner = task
+                if winner is not None:
+                    HEDGES.inc(call_site=call_site, winner=names[winner])
+                    return winner.result()
+                error = next(iter(done)).exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            # A loser that also succeeded may hold a stream (and its budget slot)
+            for task in names:
+                if task is not winner and task.done() and not task.cancelled() and task.exception() is None:
+                    close = getattr(task.result(), "aclose", None)
+                    if close is not None:
+                        await close()
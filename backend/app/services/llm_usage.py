@@ -0,0 +1,223 @@
+"""
+Token, cost and latency accounting for every OpenAI call.
+
+Call sites go through `chat()`, `chat_stream()` or `transcribe()` instead of
+calling the client directly (they pass `call_site` on to `ResilientOpenAI`). Each call records its latency and the prompt,
+completion and cached prompt tokens reported in the response's `usage`.
+Records are kept under the call site's name and under the session in
+`current_session`. Request handlers set that once; every task they spawn
+inherits it. Requests shared by several sessions (batched cue
+classification) pass `sessions=` and split the usage evenly.
+
+Totals are exported as metrics (`llm_*`) and summarized per call site and
+per session by `report()` for `/metrics/llm`.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.config.settings import settings
+from app.services import metrics
+from app.services.prompts import TRANSCRIPTION_MODEL
+from app.services.tracing import current_session, record_span, span
+
+# USD per 1M tokens: (input, cached input, output). List prices; update when they change.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+WHISPER_PRICE_PER_MINUTE = 0.006
+
+CALLS = metrics.counter("llm_calls_total", "OpenAI requests by call site and outcome")
+TOKENS = metrics.counter("llm_tokens_total", "OpenAI tokens by call site and kind (prompt, completion, cached)")
+COST = metrics.counter("llm_cost_usd_total", "Estimated OpenAI spend by call site")
+LATENCY = metrics.histogram("llm_call_seconds", "OpenAI request latency by call site")
+
+_FIELDS = ("calls", "errors", "prompt_tokens", "completion_tokens", "cached_tokens", "audio_seconds", "cost_usd", "seconds")
+
+_lock = threading.Lock()
+_call_sites = {}
+_sessions = OrderedDict()  # least recently used first
+
+
+def _totals():
+    return dict.fromkeys(_FIELDS, 0)
+
+
+def _add(totals, delta, share=1.0):
+    for key in _FIELDS:
+        totals[key] += delta[key] * share
+
+
+def parse_usage(usage):
+    """(prompt, completion, cached, audio_seconds) from a chat or transcription `usage`."""
+    if usage is None:
+        return 0, 0, 0, 0.0
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    audio_seconds = getattr(usage, "seconds", 0) or 0.0  # whisper-1 bills by duration
+    return prompt, completion, cached, audio_seconds
+
+
+def estimate_cost(model, prompt, completion, cached, audio_seconds=0.0):
+    if model == TRANSCRIPTION_MODEL:
+        return audio_seconds / 60 * WHISPER_PRICE_PER_MINUTE
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        return 0.0
+    input_price, cached_price, output_price = price
+    return ((prompt - cached) * input_price + cached * cached_price + completion * output_price) / 1_000_000
+
+
+def record(call_site, model, usage=None, seconds=0.0, error=False, sessions=None, audio_seconds=0.0, version=None):
+    """Account one OpenAI request to its call site and to `sessions` (default: the current session)."""
+    prompt, completion, cached, reported_seconds = parse_usage(usage)
+    audio_seconds = reported_seconds or audio_seconds
+    cost = estimate_cost(model, prompt, completion, cached, audio_seconds)
+
+    CALLS.inc(call_site=call_site, outcome="error" if error else "ok")
+    LATENCY.observe(seconds, call_site=call_site)
+    for kind, count in (("prompt", prompt), ("completion", completion), ("cached", cached)):
+        if count:
+            TOKENS.inc(count, call_site=call_site, kind=kind)
+    if cost:
+        COST.inc(cost, call_site=call_site)
+
+    delta = {
+        "calls": 1, "errors": int(error), "prompt_tokens": prompt, "completion_tokens": completion,
+        "cached_tokens": cached, "audio_seconds": audio_seconds, "cost_usd": cost, "seconds": seconds,
+    }
+    if sessions is None:
+        sessions = [current_session.get()]
+    with _lock:
+        site = _call_sites.get(call_site)
+        if site is None:
+            site = _call_sites[call_site] = {"totals": _totals(), "latencies": deque(maxlen=1024)}
+        site["model"], site["version"] = model, version
+        _add(site["totals"], delta)
+        site["latencies"].append(seconds)
+
+        share = 1.0 / len(sessions) if sessions else 0.0
+        for session in sessions:
+            if session is None:
+                continue
+            entry = _sessions.pop(session, None) or {}
+            _sessions[session] = entry
+            _add(entry.setdefault(call_site, _totals()), delta, share)
+        while len(_sessions) > settings.llm_usage_max_sessions:
+            _sessions.popitem(last=False)
+
+
+async def chat(client, prompt, *sections, sessions=None, **overrides):
+    """`client.chat.completions.create` for a registry `Prompt`, timed and accounted."""
+    start = time.perf_counter()
+    try:
+        with span("llm", call_site=prompt.call_site, model=prompt.model):
+            response = await client.chat.completions.create(call_site=prompt.call_site,
+                                                            **prompt.request(*sections, **overrides))
+    except Exception:
+        record(prompt.call_site, prompt.model, seconds=time.perf_counter() - start, error=True,
+               sessions=sessions, version=prompt.version)
+        raise
+    record(prompt.call_site, prompt.model, getattr(response, "usage", None), time.perf_counter() - start,
+           sessions=sessions, version=prompt.version)
+    return response
+
+
+async def chat_stream(client, prompt, *sections, **overrides):
+    """Streamed `chat()`. Yields the chunks; usage arrives on the last one (`include_usage`)."""
+    start = time.perf_counter()
+    usage, error, stream = None, False, None
+    try:
+        stream = await client.chat.completions.create(call_site=prompt.call_site, **prompt.request(
+            *sections, stream=True, stream_options={"include_usage": True}, **overrides
+        ))
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            yield chunk
+    except Exception:
+        error = True
+        raise
+    finally:
+        if hasattr(stream, "aclose"):
+            await stream.aclose()
+        seconds = time.perf_counter() - start
+        record(prompt.call_site, prompt.model, usage, seconds, error=error, version=prompt.version)
+        record_span("llm", seconds, "error" if error else "ok", call_site=prompt.call_site, model=prompt.model,
+                    stream=True)
+
+
+async def transcribe(client, call_site, audio_seconds=0.0, **kwargs):
+    """`client.audio.transcriptions.create`, timed and accounted (by audio duration)."""
+    model = kwargs.get("model", TRANSCRIPTION_MODEL)
+    start = time.perf_counter()
+    try:
+        with span("whisper", call_site=call_site, model=model):
+            response = await client.audio.transcriptions.create(call_site=call_site, **kwargs)
+    except Exception:
+        record(call_site, model, seconds=time.perf_counter() - start, error=True)
+        raise
+    record(call_site, model, getattr(response, "usage", None), time.perf_counter() - start,
+           audio_seconds=audio_seconds)
+    return response
+
+
+def _summary(totals):
+    out = {key: round(value, 6) if key in ("cost_usd", "seconds", "audio_seconds") else round(value, 2)
+           for key, value in totals.items()}
+    prompt = totals["prompt_tokens"]
+    out["cached_ratio"] = round(totals["cached_tokens"] / prompt, 3) if prompt else 0.0
+    return out
+
+
+def session_report(session_id):
+    """Per-call-site usage of one session, or None if it is unknown (or aged out)."""
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry is None:
+            return None
+        call_sites = {name: dict(totals) for name, totals in entry.items()}
+    totals = _totals()
+    for site in call_sites.values():
+        _add(totals, site)
+    return {
+        "session_id": session_id,
+        "totals": _summary(totals),
+        "call_sites": {name: _summary(site) for name, site in call_sites.items()},
+    }
+
+
+def report(sessions=20):
+    """Usage, cost and latency per call site, plus the `sessions` most recent sessions."""
+    with _lock:
+        call_sites = {name: (dict(site["totals"]), list(site["latencies"]), site["model"], site["version"])
+                      for name, site in _call_sites.items()}
+        recent = list(_sessions)[-sessions:] if sessions > 0 else []
+
+    totals = _totals()
+    by_call_site = {}
+    for name, (site_totals, latencies, model, version) in call_sites.items():
+        _add(totals, site_totals)
+        by_call_site[name] = {
+            "model": model,
+            "prompt_version": version,
+            **_summary(site_totals),
+            "p50_seconds": round(metrics.percentile(latencies, 50), 4),
+            "p95_seconds": round(metrics.percentile(latencies, 95), 4),
+            "p99_seconds": round(metrics.percentile(latencies, 99), 4),
+        }
+
+    return {
+        "totals": _summary(totals),
+        "call_sites": by_call_site,
+        "sessions": [entry for entry in map(session_report, reversed(recent)) if entry],
+    }
+
+
+def reset():
+    with _lock:
+        _call_sites.clear()
+        _sessions.clear()
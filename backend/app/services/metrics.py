@@ -0,0 +1,211 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and latency histograms keyed by name plus an optional set of
+labels (e.g. `call_site="rag"`). Everything lives in module-level state for the
+lifetime of the worker; `snapshot()` returns a JSON-friendly view and
+`prometheus_text()` the Prometheus text exposition format (served on /metrics).
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds. Covers in-memory lookups up to long GPT-4o generations.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_dict(key):
+    return dict(key)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._series = {}
+
+    def series(self):
+        with _lock:
+            return list(self._series.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(_label_key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self._series[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._series.get(_label_key(labels), 0)
+
+
+class _HistogramSeries:
+    def __init__(self, buckets, reservoir_size):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=reservoir_size)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS, reservoir_size=1024):
+        super().__init__(name, description)
+        self.buckets = tuple(buckets)
+        self.reservoir_size = reservoir_size
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(self.buckets, self.reservoir_size)
+            series.count += 1
+            series.sum += value
+            series.recent.append(value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series.bucket_counts[i] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def _get_or_create(cls, name, description, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, description, **kwargs)
+        return metric
+
+
+def counter(name, description=""):
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name, description=""):
+    return _get_or_create(Gauge, name, description)
+
+
+def histogram(name, description="", buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, description, buckets=buckets)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a small list (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def snapshot():
+    """JSON-friendly view of every metric. Histograms report recent percentiles."""
+    out = {}
+    with _lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        entries = []
+        for key, value in metric.series():
+            entry = {"labels": _label_dict(key)}
+            if metric.kind == "histogram":
+                recent = list(value.recent)
+                entry.update({
+                    "count": value.count,
+                    "sum": round(value.sum, 6),
+                    "avg": round(value.sum / value.count, 6) if value.count else 0.0,
+                    "p50": round(percentile(recent, 50), 6),
+                    "p95": round(percentile(recent, 95), 6),
+                    "p99": round(percentile(recent, 99), 6),
+                })
+            else:
+                entry["value"] = value
+            entries.append(entry)
+        out[metric.name] = {"type": metric.kind, "description": metric.description, "series": entries}
+    return out
+
+
+def _escape(value, quotes=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def prometheus_text():
+    """Every metric in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    for metric in metrics:
+        if metric.description:
+            lines.append(f"# HELP {metric.name} {_escape(metric.description, quotes=False)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.series()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(key)} {_number(value)}")
+                continue
+            with _lock:
+                bucket_counts, count, total = list(value.bucket_counts), value.count, value.sum
+            # bucket_counts are already cumulative (observe() counts every bucket >= value)
+            for bound, bucket_count in zip(metric.buckets, bucket_counts):
+                lines.append(f"{metric.name}_bucket{_labels(key, [('le', _number(float(bound)))])} {bucket_count}")
+            lines.append(f"{metric.name}_bucket{_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{metric.name}_sum{_labels(key)} {_number(float(total))}")
+            lines.append(f"{metric.name}_count{_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
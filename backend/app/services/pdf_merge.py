@@ -0,0 +1,186 @@
+"""
+Streaming concatenation of the single-report PDFs written by FPDF.
+
+`PdfConcatenator.add()` takes one finished report and returns its objects,
+renumbered, as bytes ready to send. `finish()` returns the page tree,
+catalog, bookmarks (one per report) and cross-reference table. Only
+object offsets and page numbers are kept between calls, so merging
+1,000 reports holds no more than one report in memory.
+
+Supports classic cross-reference tables and a flat page tree, which is
+what FPDF (1.x and 2.x) writes; anything else raises ValueError.
+"""
+import re
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+_OBJECT = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b(.*?)endobj\s*$", re.S)
+_STREAM = re.compile(rb"\bstream\r?\n")
+_REF = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+_INHERITED = (b"/MediaBox", b"/CropBox", b"/Resources", b"/Rotate")
+
+PAGE_TREE, CATALOG = 1, 2
+
+
+def _xref(pdf):
+    """({object number: offset}, trailer dict bytes, xref offset) of a PDF."""
+    match = _STARTXREF.search(pdf[-64:])
+    if match is None:
+        raise ValueError("No startxref found")
+    xref_at = int(match.group(1))
+    if not pdf.startswith(b"xref", xref_at):
+        raise ValueError("Cross-reference streams are not supported")
+    trailer_at = pdf.index(b"trailer", xref_at)
+    lines = pdf[xref_at + 4:trailer_at].split()
+    offsets, i = {}, 0
+    while i < len(lines):
+        start, count = int(lines[i]), int(lines[i + 1])
+        i += 2
+        for number in range(start, start + count):
+            offset, kind = int(lines[i]), lines[i + 2]
+            if kind == b"n":
+                offsets[number] = offset
+            i += 3
+    return offsets, pdf[trailer_at:pdf.rindex(b"startxref")], xref_at
+
+
+def _ref(head, key):
+    match = re.search(re.escape(key) + rb"\s+(\d+)\s+\d+\s+R", head)
+    if match is None:
+        raise ValueError(f"No {key.decode()} reference")
+    return int(match.group(1))
+
+
+def _value(head, key):
+    """Raw value of a dictionary entry (reference, array, nested dict or token), or None."""
+    match = re.search(re.escape(key) + rb"(?![\w])\s*", head)
+    if match is None:
+        return None
+    start = match.end()
+    if head.startswith(b"<<", start):
+        depth, i = 0, start
+        while i < len(head):
+            if head.startswith(b"<<", i):
+                depth, i = depth + 1, i + 2
+            elif head.startswith(b">>", i):
+                depth, i = depth - 1, i + 2
+                if depth == 0:
+                    return head[start:i]
+            else:
+                i += 1
+        raise ValueError(f"Unbalanced {key.decode()} dictionary")
+    if head.startswith(b"[", start):
+        return head[start:head.index(b"]", start) + 1]
+    ref = _REF.match(head, start)
+    if ref is not None:
+        return ref.group(0)
+    return re.match(rb"[^\s/<>\[\]]+", head[start:]).group(0)
+
+
+def _pdf_string(text):
+    text = str(text).encode("latin-1", "replace")
+    return b"(" + text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PdfConcatenator:
+    def __init__(self):
+        self.offset = 0
+        self.pages = []
+        self._offsets = {}  # new object number -> byte offset
+        self._next_number = CATALOG + 1
+        self._bookmarks = []  # (title, first page object)
+
+    def _emit(self, parts, number, body):
+        self._offsets[number] = self.offset
+        chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        parts.append(chunk)
+        self.offset += len(chunk)
+
+    def _start(self):
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self.offset = len(header)
+        return [header]
+
+    def add(self, pdf, title=None):
+        """Append one PDF's pages. Returns the bytes to write next."""
+        pdf = bytes(pdf)
+        offsets, trailer, xref_at = _xref(pdf)
+        bodies = {}
+        boundaries = sorted(offsets.values()) + [xref_at]
+        ends = dict(zip(boundaries, boundaries[1:]))
+        for number, offset in offsets.items():
+            match = _OBJECT.match(pdf, offset, ends[offset])
+            if match is None or int(match.group(1)) != number:
+                raise ValueError(f"Object {number} not found at its xref offset")
+            bodies[number] = match.group(3).strip()
+
+        catalog = _ref(trailer, b"/Root")
+        root = _ref(bodies[catalog], b"/Pages")
+        root_head = bodies[root]
+        kids = [int(n) for n, _ in _REF.findall(_value(root_head, b"/Kids") or b"")]
+        dropped = {catalog, root}
+        if b"/Info" in trailer:
+            dropped.add(_ref(trailer, b"/Info"))
+
+        numbers = {root: PAGE_TREE}
+        for number in sorted(bodies):
+            if number not in dropped:
+                numbers[number] = self._next_number
+                self._next_number += 1
+
+        def renumber(head):
+            return _REF.sub(lambda m: b"%d 0 R" % numbers[int(m.group(1))], head)
+
+        inherited = [(key, _value(root_head, key)) for key in _INHERITED]
+        parts = [] if self.offset else self._start()
+        for number in sorted(bodies):
+            if number in dropped:
+                continue
+            body = bodies[number]
+            stream = _STREAM.search(body)
+            head, tail = (body[:stream.start()], body[stream.start():]) if stream else (body, b"")
+            if number in kids:
+                if b"/Type /Pages" in head or b"/Type/Pages" in head:
+                    raise ValueError("Nested page trees are not supported")
+                end = head.rindex(b">>")
+                head = head[:end] + b"".join(
+                    b"\n" + key + b" " + value for key, value in inherited
+                    if value is not None and _value(head, key) is None
+                ) + head[end:]
+            self._emit(parts, numbers[number], renumber(head) + tail)
+
+        pages = [numbers[kid] for kid in kids]
+        if pages and title is not None:
+            self._bookmarks.append((title, pages[0]))
+        self.pages.extend(pages)
+        return b"".join(parts)
+
+    def finish(self):
+        """Page tree, catalog, bookmarks and cross-reference table."""
+        parts = [] if self.offset else self._start()
+        catalog = b"<</Type /Catalog\n/Pages %d 0 R" % PAGE_TREE
+        if self._bookmarks:
+            outlines = self._next_number
+            first = outlines + 1
+            last = first + len(self._bookmarks) - 1
+            for i, (title, page) in enumerate(self._bookmarks):
+                number = first + i
+                item = b"<</Title " + _pdf_string(title) + b"\n/Parent %d 0 R\n/Dest [%d 0 R /Fit]" % (outlines, page)
+                if number > first:
+                    item += b"\n/Prev %d 0 R" % (number - 1)
+                if number < last:
+                    item += b"\n/Next %d 0 R" % (number + 1)
+                self._emit(parts, number, item + b">>")
+            self._emit(parts, outlines, b"<</Type /Outlines\n/First %d 0 R\n/Last %d 0 R\n/Count %d>>"
+                       % (first, last, len(self._bookmarks)))
+            self._next_number = last + 1
+            catalog += b"\n/Outlines %d 0 R\n/PageMode /UseOutlines" % outlines
+        kids = b" ".join(b"%d 0 R" % page for page in self.pages)
+        self._emit(parts, PAGE_TREE, b"<</Type /Pages\n/Kids [" + kids + b"]\n/Count %d>>" % len(self.pages))
+        self._emit(parts, CATALOG, catalog + b">>")
+
+        size = self._next_number
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % size]
+        xref.extend(b"%010d 00000 n \n" % self._offsets[number] for number in range(1, size))
+        xref.append(b"trailer\n<</Size %d\n/Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (size, CATALOG, self.offset))
+        parts.extend(xref)
+        return b"".join(parts)
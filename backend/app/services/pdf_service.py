@@ -1,71 +1,123 @@
-from fpdf import FPDF
+"""
+PDF triage report rendering.
+
+`render_pdf_report` builds the report in memory and returns the PDF bytes;
+`/generate-report` runs it in the render worker pool (`report_jobs`).
+Fonts and colours are named styles in `STYLES`. `MedicalReport.style()`
+only switches when the style actually changes, and core font metrics
+are loaded once per process by `warm_renderer()`.
+"""
 import datetime
 import os
+import re
+
+import fpdf
+from fpdf import FPDF
+
+# fpdf 1.x returns the document as a latin-1 str, fpdf2 as a bytearray
+_FPDF1 = getattr(fpdf, "FPDF_VERSION", "2").startswith("1.")
+
+# name: (family, style, size, text colour)
+STYLES = {
+    "header": ('Arial', 'B', 16, (53, 215, 243)),
+    "footer": ('Arial', 'I', 8, (128,)),
+    "title": ('Arial', 'B', 12, (0,)),
+    "body": ('Arial', '', 10, (50,)),
+    "generated": ('Arial', '', 9, (100,)),
+    "label": ('Arial', 'B', 10, (0,)),
+    "value": ('Arial', '', 10, (0,)),
+    "excellent": ('Arial', 'B', 10, (0, 150, 0)),  # Green
+    "good": ('Arial', 'B', 10, (200, 150, 0)),  # Dark Orange
+    "poor": ('Arial', 'B', 10, (200, 0, 0)),  # Red
+    "issue": ('Arial', 'B', 10, (168, 85, 247)),
+    "statement": ('Arial', 'I', 10, (80,)),
+    "speaker": ('Arial', 'B', 9, (0,)),
+    "utterance": ('Arial', '', 9, (50,)),
+}
+
+_SESSION_ID = re.compile(r"[\w.-]{1,128}")
+
+
+def clean(text):
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
 
 class MedicalReport(FPDF):
+    _style = None
+
+    def _apply(self, name):
+        family, style, size, color = STYLES[name]
+        self.set_font(family, style, size)
+        self.set_text_color(*color)
+
+    def style(self, name):
+        """Switch font and text colour to a named style (no-op if it is already current)."""
+        if name != self._style:
+            self._apply(name)
+            self._style = name
+
+    # header() and footer() run inside page breaks; FPDF restores the
+    # previous font and colours afterwards, so they bypass style() tracking
     def header(self):
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(53, 215, 243) 
+        self._apply("header")
         self.cell(0, 10, 'AURION // MEDICAL TRIAGE REPORT', 0, 1, 'C')
         self.ln(5)
 
     def footer(self):
         self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(128)
+        self._apply("footer")
         self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
 
     def chapter_title(self, title):
-        self.set_font('Arial', 'B', 12)
+        self.style("title")
         self.set_fill_color(240, 240, 240) 
-        self.set_text_color(0)
         self.cell(0, 10, f'  {title}', 0, 1, 'L', 1)
         self.ln(4)
 
     def chapter_body(self, body):
-        self.set_font('Arial', '', 10)
-        self.set_text_color(50)
+        self.style("body")
         self.multi_cell(0, 6, body)
         self.ln()
 
-def generate_pdf_report(data, solved_problems):
+    def to_bytes(self):
+        if _FPDF1:
+            return self.output(dest='S').encode('latin-1')
+        return bytes(self.output())
+
+
+def render_pdf_report(data, solved_problems):
+    """The triage report for an analysed session, as PDF bytes."""
     pdf = MedicalReport()
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.add_page()
     
     # --- 1. SESSION METADATA ---
     meta = data.get('metadata', {})
-    
-    def clean(text):
-        return str(text).encode('latin-1', 'replace').decode('latin-1')
 
-    pdf.set_font('Arial', '', 9)
-    pdf.set_text_color(100)
+    pdf.style("generated")
     pdf.cell(0, 6, f"Report Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}", 0, 1, 'R')
     pdf.ln(2)
 
-    pdf.set_text_color(0)
-    
     # Row A
-    pdf.set_font('Arial', 'B', 10)
+    pdf.style("label")
     pdf.cell(25, 6, "Session Date:", 0, 0)
-    pdf.set_font('Arial', '', 10)
+    pdf.style("value")
     pdf.cell(65, 6, clean(meta.get('date', 'N/A')), 0, 0)
     
-    pdf.set_font('Arial', 'B', 10)
+    pdf.style("label")
     pdf.cell(25, 6, "Time (HST):", 0, 0)
-    pdf.set_font('Arial', '', 10)
+    pdf.style("value")
     pdf.cell(0, 6, f"{clean(meta.get('start_time', '?'))} - {clean(meta.get('end_time', '?'))}", 0, 1)
 
     # Row B
-    pdf.set_font('Arial', 'B', 10)
+    pdf.style("label")
     pdf.cell(25, 6, "Patient:", 0, 0)
-    pdf.set_font('Arial', '', 10)
+    pdf.style("value")
     pdf.cell(65, 6, clean(meta.get('patient_name', 'Unknown')), 0, 0)
 
-    pdf.set_font('Arial', 'B', 10)
+    pdf.style("label")
     pdf.cell(25, 6, "CHW Name:", 0, 0)
-    pdf.set_font('Arial', '', 10)
+    pdf.style("value")
     pdf.cell(0, 6, clean(meta.get('chw_name', 'Unknown')), 0, 1)
 
     pdf.ln(5)
@@ -98,7 +150,7 @@ def generate_pdf_report(data, solved_problems):
     closed_q = q_stats.get('closed_ended_questions', 0)
     total_q = open_q + closed_q
 
-    pdf.set_font('Arial', '', 10)
+    pdf.style("value")
     
     if total_q == 0:
         pdf.cell(0, 6, "No questions detected from the CHW in this session.", 0, 1)
@@ -115,17 +167,15 @@ def generate_pdf_report(data, solved_problems):
         # Automated Feedback Logic
         if ratio >= 30:
             feedback = "EXCELLENT. High use of open-ended questions promotes patient narrative."
-            pdf.set_text_color(0, 150, 0) # Green
+            pdf.style("excellent")
         elif ratio >= 15:
             feedback = "GOOD. Balanced mix, but consider asking more open inquiries to uncover root causes."
-            pdf.set_text_color(200, 150, 0) # Dark Orange
+            pdf.style("good")
         else:
             feedback = "NEEDS IMPROVEMENT. High reliance on Yes/No questions limits information gathering."
-            pdf.set_text_color(200, 0, 0) # Red
+            pdf.style("poor")
         
-        pdf.set_font('Arial', 'B', 10)
         pdf.multi_cell(0, 6, f"Quality Assessment: {feedback}")
-        pdf.set_text_color(0) # Reset color
 
     pdf.ln(5)
 
@@ -136,17 +186,14 @@ def generate_pdf_report(data, solved_problems):
         pdf.chapter_body("No specific health cues requiring intervention were detected in this session.")
     else:
         for item in solved_problems:
-            pdf.set_font('Arial', 'B', 10)
-            pdf.set_text_color(168, 85, 247) 
+            pdf.style("issue")
             cues_str = ", ".join(item.get('cues', []))
             pdf.cell(0, 6, clean(f"ISSUE CATEGORY: {cues_str}"), 0, 1)
             
-            pdf.set_font('Arial', 'I', 10)
-            pdf.set_text_color(80) 
+            pdf.style("statement")
             pdf.multi_cell(0, 6, clean(f"Patient Statement: \"{item.get('text', '')}\""))
             
-            pdf.set_font('Arial', '', 10)
-            pdf.set_text_color(0) 
+            pdf.style("value")
             pdf.multi_cell(0, 6, clean(f"Recommended Action: {item.get('solution', '')}"))
             pdf.ln(3)
             
@@ -171,19 +218,38 @@ def generate_pdf_report(data, solved_problems):
             speaker = clean(turn.get('speaker', 'Unknown'))
             text = clean(turn.get('text', ''))
             
-            pdf.set_font('Arial', 'B', 9)
-            pdf.set_text_color(0)
+            pdf.style("speaker")
             pdf.write(5, f"{speaker}: ")
             
-            pdf.set_font('Arial', '', 9)
-            pdf.set_text_color(50)
+            pdf.style("utterance")
             pdf.write(5, text)
             pdf.ln(6)
 
-    filename = f"report_{int(datetime.datetime.now().timestamp())}.pdf"
-    output_dir = "generated_reports"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    filepath = os.path.join(output_dir, filename)
-    pdf.output(filepath)
-    return filepath
\ No newline at end of file
+    return pdf.to_bytes()
+
+
+def report_path(store_dir, session_id):
+    """Where a session's report is kept, or None if the session id is unusable as a filename."""
+    if not session_id or not _SESSION_ID.fullmatch(str(session_id)):
+        return None
+    return os.path.join(store_dir, f"{session_id}.pdf")
+
+
+def save_report(store_dir, session_id, pdf_bytes):
+    """Keep the latest report of a session (atomic replace). Returns the path, or None."""
+    path = report_path(store_dir, session_id)
+    if path is None:
+        return None
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+    return path
+
+
+def warm_renderer():
+    """Render a one-page report so FPDF loads the core font metrics of every style."""
+    render_pdf_report({"conversation": [{"speaker": "CHW", "text": "Hello."}],
+                       "stats": {"open_ended_questions": 1}},
+                      [{"cues": ["Health Care"], "text": "Hi.", "solution": "None."}])
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Fast fundamental-frequency (F0) estimation for prosody statistics.
+
+`yin` is a vectorized YIN estimator: the signal is framed with NumPy stride
+tricks, the difference function of a whole block of frames is computed with
+one FFT, and the first dip of the cumulative mean normalized difference below
+`threshold` gives the period. Frames that fail the energy gate (silence) are
+skipped entirely. Unvoiced frames come back as NaN, like `librosa.pyin`.
+
+`StreamingYin` gives the same voiced F0 values as `yin` on the whole signal
+while the signal arrives in blocks (see `audio_analysis` streaming mode).
+"""
+import numpy as np
+
+PITCH_SR = 16000
+
+# Human voice range used by the analysis (C2 to C7)
+FMIN = 65.41
+FMAX = 2093.0
+
+
+def _frames(y, frame_length, hop_length):
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+
+def voice_activity_mask(frames, threshold_db=-40.0, floor=1e-4):
+    """
+    Energy gate: True for frames whose RMS is within `threshold_db` of the
+    loudest frame and above an absolute `floor` (digital silence).
+    """
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    if rms.size == 0:
+        return np.zeros(0, dtype=bool)
+    peak = rms.max()
+    if peak <= floor:
+        return np.zeros(len(rms), dtype=bool)
+    return (rms >= floor) & (20 * np.log10(np.maximum(rms, 1e-12) / peak) >= threshold_db)
+
+
+def _cmnd(frames, max_lag):
+    """Cumulative mean normalized difference d'(tau) for tau in [0, max_lag]."""
+    frame_length = frames.shape[1]
+    window = frame_length - max_lag
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + window)))
+
+    x = frames.astype(np.float64)
+    energy = np.cumsum(x ** 2, axis=1)
+    energy = np.concatenate([np.zeros((len(x), 1)), energy], axis=1)
+
+    # r(tau) = sum_{j<W} x_j x_{j+tau}, for every frame at once
+    spectrum = np.fft.rfft(x, n=n_fft, axis=1)
+    head = np.fft.rfft(x[:, :window], n=n_fft, axis=1)
+    r = np.fft.irfft(np.conj(head) * spectrum, n=n_fft, axis=1)[:, : max_lag + 1]
+
+    lags = np.arange(max_lag + 1)
+    e0 = energy[:, window][:, None]
+    e_tau = energy[:, lags + window] - energy[:, lags]
+    diff = np.maximum(e0 + e_tau - 2 * r, 0.0)
+
+    cmnd = np.ones_like(diff)
+    running = np.cumsum(diff[:, 1:], axis=1)
+    cmnd[:, 1:] = diff[:, 1:] * lags[1:] / np.maximum(running, 1e-12)
+    return cmnd
+
+
+def _pick_periods(cmnd, min_lag, max_lag, threshold):
+    """First trough of d' below `threshold` in [min_lag, max_lag], refined by parabolic interpolation."""
+    c = cmnd[:, min_lag - 1 : max_lag + 2]
+    mid = c[:, 1:-1]
+    trough = (mid < c[:, :-2]) & (mid <= c[:, 2:]) & (mid < threshold)
+
+    has_trough = trough.any(axis=1)
+    first = np.argmax(trough, axis=1)
+    rows = np.arange(len(c))
+
+    left = c[rows, first]
+    centre = c[rows, first + 1]
+    right = c[rows, first + 2]
+    denom = left - 2 * centre + right
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (left - right) / np.where(denom == 0, 1, denom), 0.0)
+
+    period = (first + min_lag + np.clip(shift, -1, 1)).astype(np.float64)
+    period[~has_trough] = np.nan
+    return period
+
+
+def _lags(sr, fmin, fmax, frame_length):
+    """(min_lag, max_lag, frame_length), the frame grown to hold two periods of `fmin` if needed."""
+    min_lag = max(2, int(np.floor(sr / fmax)))
+    max_lag = int(np.ceil(sr / fmin))
+    if frame_length <= max_lag + 1:
+        frame_length = 1 << int(np.ceil(np.log2(2 * max_lag + 2)))
+    return min_lag, max_lag, frame_length
+
+
+def _yin_frames(frames, active, sr, fmin, fmax, min_lag, max_lag, threshold, block_frames):
+    f0 = np.full(len(frames), np.nan)
+    indices = np.flatnonzero(active)
+    for start in range(0, len(indices), block_frames):
+        block = indices[start : start + block_frames]
+        cmnd = _cmnd(frames[block], max_lag)
+        f0[block] = sr / _pick_periods(cmnd, min_lag, max_lag, threshold)
+    f0[(f0 < fmin) | (f0 > fmax)] = np.nan
+    return f0
+
+
+def yin(y, sr=PITCH_SR, fmin=FMIN, fmax=FMAX, frame_length=1024, hop_length=256,
+        threshold=0.15, vad=True, vad_threshold_db=-40.0, block_frames=512):
+    """
+    F0 per frame in Hz (NaN where unvoiced or gated out by the energy VAD).
+
+    Frames are processed `block_frames` at a time so memory stays bounded on
+    long recordings.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    min_lag, max_lag, frame_length = _lags(sr, fmin, fmax, frame_length)
+
+    frames = _frames(y, frame_length, hop_length)
+    active = voice_activity_mask(frames, vad_threshold_db) if vad else np.ones(len(frames), dtype=bool)
+    return _yin_frames(frames, active, sr, fmin, fmax, min_lag, max_lag, threshold, block_frames)
+
+
+class StreamingYin:
+    """
+    `yin` over a signal fed in blocks, with the same frames and gate.
+
+    The last `frame_length - hop_length` samples are carried into the next
+    block, so frames crossing a block boundary are analyzed. The VAD gate is
+    relative to the loudest frame of the whole signal: frames are analyzed if
+    they pass the gate against the loudest frame so far (a superset), and
+    `voiced()` re-applies it against the final peak. Only voiced frames are
+    kept (RMS and F0, 16 bytes per voiced frame).
+    """
+
+    def __init__(self, sr=PITCH_SR, fmin=FMIN, fmax=FMAX, frame_length=1024, hop_length=256,
+                 threshold=0.15, vad=True, vad_threshold_db=-40.0, floor=1e-4, block_frames=512):
+        self.sr = sr
+        self.fmin = fmin
+        self.fmax = fmax
+        self.min_lag, self.max_lag, self.frame_length = _lags(sr, fmin, fmax, frame_length)
+        self.hop_length = hop_length
+        self.threshold = threshold
+        self.vad = vad
+        self.vad_threshold_db = vad_threshold_db
+        self.floor = floor
+        self.block_frames = block_frames
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.frames_seen = 0
+        self.peak = 0.0
+        self.rms = []
+        self.f0 = []
+
+    def _gate(self, rms, peak):
+        if not self.vad:
+            return np.ones(len(rms), dtype=bool)
+        if peak <= self.floor:
+            return np.zeros(len(rms), dtype=bool)
+        return (rms >= self.floor) & (20 * np.log10(np.maximum(rms, 1e-12) / peak) >= self.vad_threshold_db)
+
+    def _analyze(self, frames):
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        self.peak = max(self.peak, float(rms.max()))
+        f0 = _yin_frames(frames, self._gate(rms, self.peak), self.sr, self.fmin, self.fmax,
+                         self.min_lag, self.max_lag, self.threshold, self.block_frames)
+        voiced = ~np.isnan(f0)
+        self.rms.append(rms[voiced])
+        self.f0.append(f0[voiced])
+        self.frames_seen += len(frames)
+
+    def feed(self, y):
+        self.buffer = np.concatenate([self.buffer, np.asarray(y, dtype=np.float32)])
+        if len(self.buffer) < self.frame_length:
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(self.buffer, self.frame_length)[::self.hop_length]
+        self._analyze(frames)
+        self.buffer = self.buffer[len(frames) * self.hop_length:]
+
+    def voiced(self):
+        """F0 of every voiced frame, as `yin(whole signal)` without the NaNs."""
+        if self.frames_seen == 0 and len(self.buffer):
+            # Shorter than one frame: `yin` zero-pads it to one
+            self._analyze(_frames(self.buffer, self.frame_length, self.hop_length))
+        rms = np.concatenate(self.rms) if self.rms else np.zeros(0)
+        f0 = np.concatenate(self.f0) if self.f0 else np.zeros(0)
+        return f0[self._gate(rms, self.peak)]
+
+
+def estimate_f0(y, sr, backend="yin", vad=True):
+    """
+    Voiced-frame F0 track with the selected backend.
+
+    "yin": downsample to 16 kHz, vectorized YIN with optional energy gating.
+    "pyin": `librosa.pyin` at the native sample rate (the original, slow path).
+    """
+    import librosa
+
+    if backend == "pyin":
+        f0, _, _ = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), sr=sr)
+        return f0
+    if backend != "yin":
+        raise ValueError(f"Unknown pitch backend: {backend!r}")
+
+    if sr != PITCH_SR:
+        y = librosa.resample(y, orig_sr=sr, target_sr=PITCH_SR)
+    return yin(y, sr=PITCH_SR, vad=vad)
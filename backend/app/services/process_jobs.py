@@ -0,0 +1,124 @@
+"""
+Bounded process pools for CPU-bound jobs.
+
+`ProcessJobs` wraps a spawn-context `ProcessPoolExecutor` with the pieces
+`audio_jobs` and `report_jobs` share: workers are warmed by an initializer
+and nudged up at startup, admission is bounded (once `max_pending()` jobs
+are queued or running, `run` raises the pool's queue-full exception), each
+job is timed as a tracing span, and a pool whose worker died is replaced
+on the next job.
+
+Metrics are registered per pool under `<name>_jobs_pending`,
+`<name>_job_queue_seconds`, `<name>_job_run_seconds` and
+`<name>_jobs_rejected_total`.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services import metrics
+from app.services.tracing import span
+
+
+def _noop():
+    return None
+
+
+def _timed(fn, submitted_at, *args):
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+class ProcessJobs:
+    """
+    One worker pool. `workers` and `max_pending` are zero-argument callables
+    so settings changed at runtime (benchmarks do this) apply to the next
+    start or submit.
+    """
+
+    def __init__(self, name, what, stage, initializer, workers, max_pending, queue_full, result_attributes=None):
+        self.name = name
+        self.stage = stage
+        self.initializer = initializer
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_full = queue_full
+        self.result_attributes = result_attributes  # result -> extra span attributes
+
+        self.queue_depth_gauge = metrics.gauge(f"{name}_jobs_pending", f"{what} queued or running")
+        self.queue_wait = metrics.histogram(f"{name}_job_queue_seconds", f"Time {what} waited for a worker")
+        self.run_time = metrics.histogram(f"{name}_job_run_seconds", f"Time {what} spent inside a worker")
+        self.rejected = metrics.counter(f"{name}_jobs_rejected_total", f"{what} refused because the queue was full")
+
+        self._executor = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()  # done callbacks run on the executor's thread
+
+    def start(self):
+        """Create the worker pool (called at startup). Safe to call more than once."""
+        if self._executor is None:
+            workers = self.workers()
+            # "spawn": forking a server that already runs threads (Chroma, ONNX) is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+            )
+            # Workers start on demand; nudge them up now so they are warm before traffic
+            for _ in range(workers):
+                self._executor.submit(_noop)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def queue_depth(self):
+        return self._pending
+
+    def _track(self, future):
+        """Count `future` as pending until the worker is done with it, even if the awaiting request is cancelled."""
+        with self._pending_lock:
+            self._pending += 1
+            self.queue_depth_gauge.set(self._pending)
+        future.add_done_callback(self._job_done)
+
+    def _job_done(self, future):
+        with self._pending_lock:
+            self._pending -= 1
+            self.queue_depth_gauge.set(self._pending)
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` in a worker and await its result. `fn` must be a
+        module-level function so it can be pickled.
+
+        Raises the pool's queue-full exception when `max_pending()` jobs are
+        already queued or running.
+        """
+        if self._pending >= self.max_pending():
+            self.rejected.inc()
+            raise self.queue_full(f"{self._pending} {self.name} jobs pending")
+
+        executor = self.start()
+        try:
+            with span(self.stage) as attributes:
+                future = executor.submit(_timed, fn, time.time(), *args)
+                self._track(future)
+                result, waited, ran = await asyncio.wrap_future(future)
+                attributes.update(queue_ms=round(max(0.0, waited) * 1000, 1), run_ms=round(ran * 1000, 1))
+                if self.result_attributes:
+                    attributes.update(self.result_attributes(result))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for the next job
+            self.shutdown()
+            raise
+
+        self.queue_wait.observe(max(0.0, waited))
+        self.run_time.observe(ran)
+        return result
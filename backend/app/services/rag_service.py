@@ -1,26 +1,143 @@
-import os
-from openai import OpenAI
+import asyncio
 
+from app.config.settings import settings
+from app.services import llm_usage, prompts
+from app.services.guide_retrieval import aquery_guide, guide_fingerprint
+from app.services.solution_cache import solution_cache
+from app.services.tracing import span
 
-SYSTEM_PROMPT_RAG = """
-You are a Medical Assistant generating a report for a Community Health Worker.
-Your Goal is to Provide an optimal best-practice recommendation to solve the patient's complaint. The Community Health Worker can not help the patient beyond basic advice. You must provide disclaimers about the suggestions being generated by an AI model. Your output must not contain any markdowns. 
-"""
+FALLBACK_SOLUTION = "Error retrieving solution."
 
-def get_solution_from_context(client, patient_text):
+
+def report_turns(conversation):
+    """Patient turns that need a guided solution: cues detected or masked distress."""
+    return [
+        turn for turn in conversation or []
+        if turn.get("speaker", "") == "Patient" and (turn.get("cues") or turn.get("is_masked_distress", False))
+    ]
+
+
+def solved_problems(turns, solutions):
+    """The report's "Detected Issues & Guided Solutions" entries for `report_turns` and their solutions."""
+    problems = []
+    for turn, solution in zip(turns, solutions):
+        display_cues = list(turn.get("cues") or [])
+        if turn.get("is_masked_distress", False):
+            display_cues.append("Masked Distress")
+        problems.append({"cues": display_cues, "text": turn.get("text", ""), "solution": solution})
+    return problems
+
+
+def format_guide_context(chunks):
+    if not chunks:
+        return "(No relevant guide excerpts found.)"
+    return "\n\n".join(f"[Chapter {chunk['chapter']}] {chunk['text']}" for chunk in chunks)
+
+
+async def _request_solution(client, patient_text, context_chunks=None):
+    # 2. Generate Answer with LLM
+    # We use the Context found by Chroma to ask GPT-4 for the specific answer
+    # Deadline and retries are enforced by the resilient client
+    response = await llm_usage.chat(
+        client, prompts.REPORT_SOLUTION,
+        f"CHW GUIDE EXCERPTS:\n{format_guide_context(context_chunks)}",
+        f"PATIENT COMPLAINT:\n{patient_text}",
+        timeout_seconds=settings.rag_timeout_seconds,
+        max_retries=settings.rag_max_retries,
+        retry_base_seconds=settings.rag_retry_backoff_seconds,
+    )
+
+    return response.choices[0].message.content
+
+
+def solution_scope():
+    """Cached solutions are only reused for the same solution prompt and guide contents."""
+    return f"{prompts.REPORT_SOLUTION.version}:{guide_fingerprint()}"
+
+
+async def _cached_solutions(patient_texts):
+    if not settings.solution_cache_enabled:
+        return [None for _ in patient_texts]
+
+    # Lookups may embed the text and read the guide's fingerprint, both synchronous
+    def lookup():
+        scope = solution_scope()
+        return [solution_cache.get(text, scope)[0] for text in patient_texts]
+
+    return await asyncio.to_thread(lookup)
+
+
+async def _store_solution(patient_text, solution):
+    if not settings.solution_cache_enabled or solution == FALLBACK_SOLUTION:
+        return
     try:
-        # 2. Generate Answer with LLM
-        # We use the Context found by Chroma to ask GPT-4 for the specific answer
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT_RAG},
-                {"role": "user", "content": f"PATIENT COMPLAINT:\n{patient_text}"}
-            ]
-        )
-        
-        return response.choices[0].message.content
+        await asyncio.to_thread(lambda: solution_cache.put(patient_text, solution, solution_scope()))
+    except Exception as e:
+        print(f"Solution Cache Error: {e}")
+
+
+async def get_solution_from_context(client, patient_text, context_chunks=None):
+    try:
+        cached = (await _cached_solutions([patient_text]))[0]
+        if cached is not None:
+            return cached
+        if context_chunks is None:
+            # 1. Retrieve guide context with Chroma
+            context_chunks = (await aquery_guide([patient_text]))[0]
+        solution = await _request_solution(client, patient_text, context_chunks)
+        await _store_solution(patient_text, solution)
+        return solution
 
     except Exception as e:
         print(f"RAG Error: {e}")
-        return "Error retrieving solution."
\ No newline at end of file
+        return FALLBACK_SOLUTION
+
+
+async def get_solutions_for_turns(client, patient_texts):
+    """
+    Resolve solutions for many flagged turns concurrently.
+
+    Turns already answered for the same (or a near-identical) complaint are
+    served from the semantic cache. Guide context for the remaining turns is
+    fetched in a single batched Chroma query. At most `rag_max_concurrency`
+    requests are in flight, each attempt is bounded by `rag_timeout_seconds`
+    and retried up to `rag_max_retries` times with jittered backoff (by the
+    resilient client). Results come back in the same order as
+    `patient_texts`; a turn that keeps failing gets the fallback text.
+    """
+    patient_texts = list(patient_texts)
+    if not patient_texts:
+        return []
+    with span("rag", turns=len(patient_texts)) as attributes:
+        return await _solve_turns(client, patient_texts, attributes)
+
+
+async def _solve_turns(client, patient_texts, attributes):
+    solutions = await _cached_solutions(patient_texts)
+    missing = [i for i, solution in enumerate(solutions) if solution is None]
+    attributes["cached"] = len(patient_texts) - len(missing)
+    if not missing:
+        return solutions
+    if client is None:
+        return [solution or FALLBACK_SOLUTION for solution in solutions]
+
+    # 1. Retrieve guide context for all uncached turns at once
+    contexts = await aquery_guide([patient_texts[i] for i in missing])
+
+    semaphore = asyncio.Semaphore(max(1, settings.rag_max_concurrency))
+
+    async def solve(patient_text, context_chunks):
+        async with semaphore:
+            try:
+                solution = await _request_solution(client, patient_text, context_chunks)
+            except Exception as e:
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+                print(f"RAG Error: {reason}")
+                return FALLBACK_SOLUTION
+            await _store_solution(patient_text, solution)
+            return solution
+
+    resolved = await asyncio.gather(*(solve(patient_texts[i], context) for i, context in zip(missing, contexts)))
+    for i, solution in zip(missing, resolved):
+        solutions[i] = solution
+    return solutions
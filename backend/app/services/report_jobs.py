@@ -0,0 +1,63 @@
+"""
+Process pool for PDF report rendering.
+
+`render_pdf_report` (FPDF, pure Python) runs in worker processes so a long
+transcript never blocks the event loop. Each worker renders one tiny
+report when it starts, so font metrics are loaded once per worker. The
+rendered bytes come back to the handler, which returns them directly.
+When `report_store_dir` is set, the worker also keeps the latest report
+of each session as `<report_store_dir>/<session_id>.pdf`.
+Admission is bounded like the audio pool: once `report_pool_max_pending`
+renders are queued or running, `submit_report_render` raises
+`ReportQueueFull` immediately.
+"""
+from app.config.settings import settings
+from app.services import metrics
+from app.services.process_jobs import ProcessJobs
+
+PDF_BYTES = metrics.histogram("report_pdf_bytes", "Size of rendered PDF reports",
+                              buckets=(10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000))
+
+
+class ReportQueueFull(Exception):
+    """The PDF render queue is at capacity."""
+
+
+def _warm_worker():
+    from app.services.pdf_service import warm_renderer
+
+    warm_renderer()
+
+
+def _run_job(data, solved_problems, session_id, store_dir):
+    from app.services.pdf_service import render_pdf_report, save_report
+
+    pdf_bytes = render_pdf_report(data, solved_problems)
+    if store_dir:
+        save_report(store_dir, session_id, pdf_bytes)
+    return pdf_bytes
+
+
+jobs = ProcessJobs(
+    "report", "PDF renders", "pdf_render",
+    initializer=_warm_worker,
+    workers=lambda: settings.report_pool_workers,
+    max_pending=lambda: settings.report_pool_max_pending,
+    queue_full=ReportQueueFull,
+    result_attributes=lambda pdf_bytes: {"bytes": len(pdf_bytes)},
+)
+start_report_pool = jobs.start
+shutdown_report_pool = jobs.shutdown
+queue_depth = jobs.queue_depth
+
+
+async def submit_report_render(data, solved_problems, session_id=None):
+    """
+    Render the PDF report in the pool and return its bytes.
+
+    Raises ReportQueueFull when `report_pool_max_pending` renders are already
+    queued or running.
+    """
+    pdf_bytes = await jobs.run(_run_job, data, solved_problems, session_id, settings.report_store_dir)
+    PDF_BYTES.observe(len(pdf_bytes))
+    return pdf_bytes
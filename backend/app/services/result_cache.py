@@ -0,0 +1,112 @@
+"""
+Content-addressed cache for /upload-full-audio.
+
+Each upload is keyed by the SHA-256 of its bytes. Stage results (audio stats,
+transcript, LLM analysis, final response) are stored as JSON files under
+`<upload_cache_dir>/<digest>/`, so a retried upload skips every stage that
+already finished and a prompt change only re-runs the LLM analysis.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from app.config.settings import settings
+from app.services import metrics
+
+STAGE_LOOKUPS = metrics.counter("upload_cache_lookups_total", "Upload result cache lookups by stage and result")
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+_STAGE = re.compile(r"^[\w.-]+$")
+
+
+class ResultCache:
+    def __init__(self, root):
+        self.root = root
+
+    def _entry_dir(self, digest):
+        if not _DIGEST.match(digest or ""):
+            raise ValueError(f"Invalid digest: {digest!r}")
+        return os.path.join(self.root, digest)
+
+    def _stage_path(self, digest, stage):
+        if not _STAGE.match(stage):
+            raise ValueError(f"Invalid stage name: {stage!r}")
+        return os.path.join(self._entry_dir(digest), f"{stage}.json")
+
+    def get(self, digest, stage):
+        """Stored value for a stage, or None."""
+        path = self._stage_path(digest, stage)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            STAGE_LOOKUPS.inc(stage=stage.split("-")[0], result="miss")
+            return None
+        except Exception as e:
+            print(f"Upload Cache Read Error ({stage}): {e}")
+            return None
+        STAGE_LOOKUPS.inc(stage=stage.split("-")[0], result="hit")
+        return value
+
+    def has(self, digest, stage):
+        return os.path.exists(self._stage_path(digest, stage))
+
+    def put(self, digest, stage, value):
+        path = self._stage_path(digest, stage)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temp file per writer: concurrent uploads of the same file write the same stages
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{stage}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Upload Cache Write Error ({stage}): {e}")
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+    def entries(self):
+        """Summary of every cached upload, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        out = []
+        for digest in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, digest)
+            if not _DIGEST.match(digest) or not os.path.isdir(entry_dir):
+                continue
+            files = os.listdir(entry_dir)
+            out.append({
+                "digest": digest,
+                "stages": sorted(f[:-5] for f in files if f.endswith(".json")),
+                "bytes": sum(os.path.getsize(os.path.join(entry_dir, f)) for f in files),
+                "modified": os.path.getmtime(entry_dir),
+            })
+        return sorted(out, key=lambda e: e["modified"], reverse=True)
+
+    def evict(self, digest):
+        """Remove one upload's cached stages. Returns False if it wasn't cached."""
+        entry_dir = self._entry_dir(digest)
+        if not os.path.isdir(entry_dir):
+            return False
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return True
+
+    def clear(self, older_than_seconds=None):
+        """Remove every cached upload (or only those older than the given age)."""
+        cutoff = time.time() - older_than_seconds if older_than_seconds else None
+        removed = 0
+        for entry in self.entries():
+            if cutoff is None or entry["modified"] < cutoff:
+                removed += self.evict(entry["digest"])
+        return removed
+
+
+upload_cache = ResultCache(settings.upload_cache_dir)
+
+# Encounter forms, keyed by `form_cache_key(transcript)` instead of audio bytes
+form_cache = ResultCache(settings.form_cache_dir)
@@ -0,0 +1,429 @@
+"""
+SQLite store for sessions, their analyses, encounter forms and saved reports.
+
+One database file (`session_db_path`) in WAL mode, so list/query requests
+read while the writer commits. Writes are queued and applied by a single
+writer thread. Everything queued when it wakes up is committed in one
+transaction (up to `session_store_batch_size` operations), so a burst of
+uploads or a migration costs one fsync per batch instead of one per row.
+Each operation runs under its own savepoint, so a bad write is rolled back
+alone instead of taking the batch with it. Callers never wait for a write;
+each returns a future that resolves (or carries the error) once the batch
+commits, and `flush()` waits for everything queued so far.
+
+Tables:
+    sessions      one row per visit: date, times, patient, CHW, summary,
+                  upload digest, audio path
+    analyses      the dashboard data (`/upload-full-audio` `data`) as JSON,
+                  kept apart so listing sessions never reads it
+    session_cues  SDOH cues per session (with the session date, so a cue +
+                  date range query is one index range scan)
+    forms         `/save-form` encounter forms by name (the session id)
+    reports       saved report PDFs (REPORT_STORE_DIR) per session
+
+Lists are ordered newest first and paginated with a keyset cursor
+(`<date>|<session_id>`), so page 1,000 costs the same as page 1.
+"""
+import concurrent.futures
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from app.config.settings import settings
+from app.services import metrics
+
+WRITE_BATCH = metrics.histogram("session_store_write_batch", "Operations committed per session store transaction",
+                                buckets=(1, 2, 5, 10, 50, 100, 250, 500, 1000))
+WRITE_SECONDS = metrics.histogram("session_store_commit_seconds", "Session store transaction time")
+WRITE_ERRORS = metrics.counter("session_store_write_errors_total", "Session store writes rolled back, by operation")
+QUERY_SECONDS = metrics.histogram("session_store_query_seconds", "Session store list/query time")
+
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id    TEXT PRIMARY KEY,
+    date          TEXT NOT NULL DEFAULT '',
+    start_time    TEXT,
+    end_time      TEXT,
+    patient_name  TEXT COLLATE NOCASE,
+    chw_name      TEXT COLLATE NOCASE,
+    summary       TEXT,
+    upload_digest TEXT,
+    audio_path    TEXT,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions (date, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_patient ON sessions (patient_name, date, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_chw ON sessions (chw_name, date, session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_digest ON sessions (upload_digest);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    session_id TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS session_cues (
+    session_id TEXT NOT NULL,
+    cue        TEXT NOT NULL COLLATE NOCASE,
+    date       TEXT NOT NULL DEFAULT '',
+    turns      INTEGER NOT NULL,
+    PRIMARY KEY (session_id, cue)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cues_cue ON session_cues (cue, date, session_id);
+
+CREATE TABLE IF NOT EXISTS forms (
+    name         TEXT PRIMARY KEY,
+    session_id   TEXT,
+    patient_name TEXT COLLATE NOCASE,
+    date         TEXT NOT NULL DEFAULT '',
+    data         TEXT NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_forms_patient ON forms (patient_name, date, name);
+CREATE INDEX IF NOT EXISTS idx_forms_date ON forms (date, name);
+CREATE INDEX IF NOT EXISTS idx_forms_session ON forms (session_id);
+
+CREATE TABLE IF NOT EXISTS reports (
+    session_id TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    bytes      INTEGER,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, path)
+);
+"""
+
+SESSION_COLUMNS = ("session_id", "date", "start_time", "end_time", "patient_name", "chw_name", "summary",
+                   "upload_digest", "audio_path")
+
+_STOP = object()
+
+
+def _date(value):
+    """`YYYY-MM-DD`, or '' for unknown dates ("N/A")."""
+    value = str(value or "")
+    return value[:10] if len(value) >= 10 and value[4] == "-" and value[7] == "-" else ""
+
+
+def session_cues(conversation):
+    """{cue: patient turns flagged with it}; masked distress counts as a cue."""
+    counts = {}
+    for turn in conversation or []:
+        if turn.get("speaker") != "Patient":
+            continue
+        cues = list(turn.get("cues") or [])
+        if turn.get("is_masked_distress"):
+            cues.append("Masked Distress")
+        for cue in cues:
+            counts[cue] = counts.get(cue, 0) + 1
+    return counts
+
+
+# --- write operations (run on the writer thread) ---
+
+def _write_session(conn, session_id, data, upload_digest, audio_path, now):
+    meta = (data or {}).get("metadata") or {}
+    row = {
+        "session_id": session_id,
+        "date": _date(meta.get("date")),
+        "start_time": meta.get("start_time"),
+        "end_time": meta.get("end_time"),
+        "patient_name": meta.get("patient_name"),
+        "chw_name": meta.get("chw_name"),
+        "summary": (data or {}).get("summary"),
+        "upload_digest": upload_digest,
+        "audio_path": audio_path,
+    }
+    # Only overwrite columns we know, so a later audio-only import keeps the analysis fields
+    known = [column for column in SESSION_COLUMNS[1:] if row[column] not in (None, "")]
+    conn.execute(
+        f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}, updated_at)"
+        f" VALUES ({', '.join('?' * len(SESSION_COLUMNS))}, ?)"
+        f" ON CONFLICT(session_id) DO UPDATE SET "
+        + ", ".join([f"{column} = excluded.{column}" for column in known] + ["updated_at = excluded.updated_at"]),
+        [row[column] for column in SESSION_COLUMNS] + [now],
+    )
+    if data and data.get("conversation") is not None:
+        conn.execute(
+            "INSERT INTO analyses (session_id, data, updated_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (session_id, json.dumps(data), now),
+        )
+        conn.execute("DELETE FROM session_cues WHERE session_id = ?", (session_id,))
+        conn.executemany(
+            "INSERT INTO session_cues (session_id, cue, date, turns) VALUES (?, ?, ?, ?)",
+            [(session_id, cue, row["date"], turns) for cue, turns in session_cues(data["conversation"]).items()],
+        )
+
+
+def _write_form(conn, name, data, now):
+    conn.execute(
+        "INSERT INTO forms (name, session_id, patient_name, date, data, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+        " ON CONFLICT(name) DO UPDATE SET session_id = excluded.session_id, patient_name = excluded.patient_name,"
+        " date = excluded.date, data = excluded.data, updated_at = excluded.updated_at",
+        (name, name if name.startswith(("SESS-", "upload-")) else None, data.get("patientName") or None,
+         _date(data.get("dateOfVisit")), json.dumps(data), now),
+    )
+
+
+def _write_report(conn, session_id, path, size, now):
+    conn.execute(
+        "INSERT INTO reports (session_id, path, bytes, created_at) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT(session_id, path) DO UPDATE SET bytes = excluded.bytes, created_at = excluded.created_at",
+        (session_id, path, size, now),
+    )
+
+
+class SessionStore:
+    def __init__(self, path, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._writer = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # --- lifecycle ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps the db consistent
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def open(self):
+        """Create the schema and start the writer thread. Safe to call more than once."""
+        with self._lock:
+            if self._writer is not None:
+                return self
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+            conn.close()
+            self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+            self._writer.start()
+        return self
+
+    def close(self):
+        """Commit everything queued and stop the writer."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # Group commit: take whatever else is already waiting
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            operations = [item for item in batch if isinstance(item, tuple)]
+            stop = any(item is _STOP for item in batch)
+            if operations:
+                start = time.perf_counter()
+                errors = self._apply(conn, operations)
+                WRITE_SECONDS.observe(time.perf_counter() - start)
+                WRITE_BATCH.observe(len(operations))
+                for (write, args, future), error in zip(operations, errors):
+                    if error is None:
+                        future.set_result(None)
+                        continue
+                    op = write.__name__.replace("_write_", "")
+                    WRITE_ERRORS.inc(op=op)
+                    print(f"❌ Session Store Write Error ({op} {args[0]!r}): {error}")
+                    future.set_exception(error)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+        conn.close()
+
+    @staticmethod
+    def _apply(conn, operations):
+        """
+        Run a batch in one transaction, each operation under its own savepoint,
+        so a failing write is rolled back alone. Returns one error (or None) per
+        operation; if the commit itself fails, every operation gets that error.
+        """
+        errors = [None] * len(operations)
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                for i, (write, args, _) in enumerate(operations):
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        write(conn, *args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO op")
+                        errors[i] = e
+                    conn.execute("RELEASE op")
+        except Exception as e:
+            errors = [error or e for error in errors]
+        return errors
+
+    def _enqueue(self, write, *args):
+        if self._writer is None:
+            self.open()
+        future = concurrent.futures.Future()
+        self._queue.put((write, args + (time.time(),), future))
+        return future
+
+    def flush(self, timeout=None):
+        """Block until every write queued so far is committed."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # --- writes (queued; never block the caller; each returns a future set once committed) ---
+
+    def save_session(self, session_id, data=None, upload_digest=None, audio_path=None):
+        """Record a visit and, if `data` has a conversation, its analysis and cues."""
+        return self._enqueue(_write_session, session_id, data, upload_digest, audio_path)
+
+    def save_form(self, name, data):
+        return self._enqueue(_write_form, name, data)
+
+    def add_report(self, session_id, path, size=None):
+        return self._enqueue(_write_report, session_id, path, size)
+
+    # --- reads ---
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._writer is None:
+                self.open()
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _page(self, sql, params, key, limit):
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        start = time.perf_counter()
+        rows = [dict(row) for row in self._reader().execute(sql + " LIMIT ?", params + [limit + 1])]
+        QUERY_SECONDS.observe(time.perf_counter() - start)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['date']}|{rows[-1][key]}"
+        return {"items": rows, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _keyset(alias, key, cursor, where, params):
+        if cursor:
+            date, _, last = cursor.partition("|")
+            where.append(f"({alias}.date < ? OR ({alias}.date = ? AND {alias}.{key} < ?))")
+            params += [date, date, last]
+
+    def query_sessions(self, patient=None, chw=None, cue=None, date_from=None, date_to=None, limit=50, cursor=None):
+        """One page of sessions matching every given filter, newest first."""
+        where, params = [], []
+        if cue:
+            # Drive the query from the cue index; sessions joined by primary key
+            source, alias = "session_cues c JOIN sessions s ON s.session_id = c.session_id", "c"
+            where.append("c.cue = ?")
+            params.append(cue)
+        else:
+            source, alias = "sessions s", "s"
+        if patient:
+            where.append("s.patient_name = ?")
+            params.append(patient)
+        if chw:
+            where.append("s.chw_name = ?")
+            params.append(chw)
+        if date_from:
+            where.append(f"{alias}.date >= ?")
+            params.append(_date(date_from))
+        if date_to:
+            where.append(f"{alias}.date <= ?")
+            params.append(_date(date_to))
+        self._keyset(alias, "session_id", cursor, where, params)
+        sql = (
+            "SELECT s.session_id, s.date, s.start_time, s.end_time, s.patient_name, s.chw_name, s.summary,"
+            " s.upload_digest, s.audio_path,"
+            " (SELECT group_concat(cue, '|') FROM session_cues x WHERE x.session_id = s.session_id) AS cues"
+            f" FROM {source}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY {alias}.date DESC, {alias}.session_id DESC"
+        )
+        page = self._page(sql, params, "session_id", limit)
+        for row in page["items"]:
+            row["cues"] = row["cues"].split("|") if row["cues"] else []
+        return page
+
+    def get_session(self, session_id):
+        """The session row with its analysis `data`, form and saved reports, or None."""
+        conn = self._reader()
+        row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = dict(row)
+        analysis = conn.execute("SELECT data FROM analyses WHERE session_id = ?", (session_id,)).fetchone()
+        session["data"] = json.loads(analysis["data"]) if analysis else None
+        form = conn.execute("SELECT data FROM forms WHERE session_id = ? OR name = ? LIMIT 1",
+                            (session_id, session_id)).fetchone()
+        session["form"] = json.loads(form["data"]) if form else None
+        session["reports"] = [dict(r) for r in conn.execute(
+            "SELECT path, bytes, created_at FROM reports WHERE session_id = ? ORDER BY created_at DESC",
+            (session_id,))]
+        return session
+
+    def get_analysis(self, session_id):
+        """Just the stored dashboard data of a session, or None."""
+        row = self._reader().execute("SELECT data FROM analyses WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def has_analysis(self, session_id):
+        return self._reader().execute("SELECT 1 FROM analyses WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+    def query_forms(self, patient=None, date_from=None, date_to=None, limit=50, cursor=None):
+        """One page of saved forms (without their data), newest visit first."""
+        where, params = [], []
+        if patient:
+            where.append("f.patient_name = ?")
+            params.append(patient)
+        if date_from:
+            where.append("f.date >= ?")
+            params.append(_date(date_from))
+        if date_to:
+            where.append("f.date <= ?")
+            params.append(_date(date_to))
+        self._keyset("f", "name", cursor, where, params)
+        sql = (
+            "SELECT f.name, f.session_id, f.patient_name, f.date, f.updated_at FROM forms f"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY f.date DESC, f.name DESC"
+        )
+        return self._page(sql, params, "name", limit)
+
+    def get_form(self, name):
+        row = self._reader().execute("SELECT data FROM forms WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def counts(self):
+        conn = self._reader()
+        return {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                for table in ("sessions", "analyses", "forms", "reports")}
+
+
+session_store = SessionStore(settings.session_db_path, batch_size=settings.session_store_batch_size)
@@ -0,0 +1,228 @@
+"""
+Semantic cache for GPT-4o RAG solutions.
+
+Lookups first try an exact match on the normalized complaint text, then the
+most similar cached complaint by embedding (cosine) above
+`solution_cache_similarity` that is negated the same way ("can't afford"
+never reuses "can afford"). Entries live in a scope - the caller passes the
+prompt version and guide fingerprint - so a new prompt or guide starts with
+an empty cache instead of serving answers built from the old one. Entries expire after `solution_cache_ttl_seconds`
+and the least recently used ones are evicted beyond `solution_cache_max_entries`.
+The cache is written to `solution_cache_path` and reloaded on startup.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services import metrics
+
+CACHE_LOOKUPS = metrics.counter("solution_cache_lookups_total", "RAG solution cache lookups by result")
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# Negations as they look after normalize_text (apostrophes dropped)
+NEGATIONS = frozenset({
+    "no", "not", "never", "none", "nothing", "nobody", "nowhere", "neither", "nor", "without", "cannot",
+    "cant", "dont", "doesnt", "didnt", "wont", "wouldnt", "isnt", "arent", "wasnt", "werent", "havent",
+    "hasnt", "hadnt", "couldnt", "shouldnt", "aint",
+})
+
+
+def normalize_text(text):
+    """Lowercase, drop apostrophes and punctuation, collapse whitespace."""
+    text = _PUNCTUATION.sub(" ", str(text).lower().replace("'", "").replace("\u2019", ""))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def negation_count(normalized):
+    """Negation words in a normalized text; two complaints only match semantically if these agree."""
+    return sum(1 for word in normalized.split() if word in NEGATIONS)
+
+
+class SemanticCache:
+    def __init__(self, path=None, max_entries=1000, ttl_seconds=7 * 24 * 3600,
+                 similarity=0.92, embed=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        # embed(list[str]) -> list of vectors; None disables the similarity lookup
+        self.embed = embed
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (scope, key) -> {"value", "created", "embedding"}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # one save at a time, so an older snapshot never lands last
+        self._dirty = 0
+
+    # --- lookup ---
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds and now - entry["created"] > self.ttl_seconds
+
+    def _embedding(self, key):
+        if self.embed is None:
+            return None
+        try:
+            vector = np.asarray(self.embed([key])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"Solution Cache Embedding Error: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, text, scope=""):
+        """Returns (value, kind) with kind "exact"/"semantic", or (None, None)."""
+        key = (scope, normalize_text(text))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return self._record_hit(entry, "exact")
+
+        vector = self._embedding(key[1])
+        if vector is None:
+            return self._record_miss()
+
+        negations = negation_count(key[1])
+        with self._lock:
+            keys, matrix = [], []
+            for cached_key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[cached_key]
+                elif cached_key[0] == scope and entry["embedding"] is not None:
+                    keys.append(cached_key)
+                    matrix.append(entry["embedding"])
+            if not keys:
+                return self._record_miss()
+
+            scores = np.stack(matrix) @ vector
+            # Best match above the threshold that is negated the same way
+            for best in np.argsort(-scores):
+                if scores[best] < self.similarity:
+                    break
+                if negation_count(keys[best][1]) == negations:
+                    self._entries.move_to_end(keys[best])
+                    return self._record_hit(self._entries[keys[best]], "semantic")
+            return self._record_miss()
+
+    def _record_hit(self, entry, kind):
+        self.hits += 1
+        CACHE_LOOKUPS.inc(result=f"hit_{kind}")
+        return entry["value"], kind
+
+    def _record_miss(self):
+        self.misses += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        return None, None
+
+    # --- update ---
+
+    def put(self, text, value, scope=""):
+        key = (scope, normalize_text(text))
+        vector = self._embedding(key[1])
+        with self._lock:
+            self._entries[key] = {"value": value, "created": time.time(), "embedding": vector}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty += 1
+            should_save = self.path and self._dirty >= settings.solution_cache_save_every
+        if should_save:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    # --- persistence ---
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                rows = [
+                    {
+                        "scope": scope,
+                        "key": key,
+                        "value": entry["value"],
+                        "created": entry["created"],
+                        "embedding": entry["embedding"].tolist() if entry["embedding"] is not None else None,
+                    }
+                    for (scope, key), entry in self._entries.items()
+                ]
+                self._dirty = 0
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # Unique temp file: another process (export_reports.py) may save the same cache
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".solution-cache-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(rows, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except Exception as e:
+            print(f"Solution Cache Load Error: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                embedding = row.get("embedding")
+                entry = {
+                    "value": row["value"],
+                    "created": row["created"],
+                    "embedding": np.asarray(embedding, dtype=np.float32) if embedding is not None else None,
+                }
+                if not self._expired(entry, now):
+                    self._entries[(row.get("scope", ""), row["key"])] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        print(f"💾 Solution cache loaded ({len(self._entries)} entries)")
+
+
+def _embed(texts):
+    from app.services.guide_retrieval import get_embedding_function
+    return get_embedding_function()(texts)
+
+
+solution_cache = SemanticCache(
+    path=settings.solution_cache_path,
+    max_entries=settings.solution_cache_max_entries,
+    ttl_seconds=settings.solution_cache_ttl_seconds,
+    similarity=settings.solution_cache_similarity,
+    embed=_embed if settings.solution_cache_semantic else None,
+)
@@ -0,0 +1,331 @@
+"""
+Streaming transcription for /ws/audio.
+
+The browser sends a self-contained WebM/Opus blob every ~3 s. Instead of
+sending each blob to Whisper on its own (no acoustic context, words cut at
+blob boundaries), blobs are decoded to 16 kHz mono PCM and appended to a
+rolling buffer per connection. An energy VAD finds utterance boundaries and
+only complete utterances are transcribed. A short tail of audio is carried
+into the next utterance and the previous transcript is passed as the prompt,
+so words at a boundary are not lost; words repeated by the overlap are
+trimmed from the new text.
+
+Backends share `async transcribe(pcm, sr, prompt="") -> str` and, for blob
+mode, `async transcribe_blob(data, prompt="") -> str` (the encoded blob as
+sent): "openai" (whisper-1 via the AsyncOpenAI client) or "faster-whisper"
+(local, CPU, optional dependency - handy offline). Without ffmpeg, WebM
+blobs can't be decoded, so a connection falls back to blob mode.
+"""
+import asyncio
+import io
+import re
+import shutil
+import time
+
+import numpy as np
+import soundfile as sf
+
+from app.config.settings import settings
+from app.services import llm_usage, metrics
+
+FRAME_MS = 30
+
+TRANSCRIPTION_CALLS = metrics.counter("stream_transcription_calls_total", "Streaming transcription calls by backend")
+TRANSCRIPTION_SECONDS = metrics.histogram("stream_transcription_seconds", "Latency of one streaming transcription call")
+UTTERANCE_SECONDS = metrics.histogram(
+    "stream_utterance_seconds", "Length of audio sent per transcription call",
+    buckets=(0.5, 1, 2, 3, 5, 8, 12, 15, 20, 30),
+)
+
+
+# --- DECODING ---
+
+class FFmpegMissing(RuntimeError):
+    pass
+
+
+_ffmpeg_warned = False
+
+
+async def decode_audio(data, sr=None):
+    """Mono float32 PCM at `sr` Hz from an encoded blob (WAV/FLAC/OGG natively, anything else via ffmpeg)."""
+    sr = sr or settings.stream_sample_rate
+    try:
+        pcm, native_sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        pcm = pcm.mean(axis=1)
+        if native_sr != sr:
+            import librosa
+            pcm = librosa.resample(pcm, orig_sr=native_sr, target_sr=sr)
+        return pcm.astype(np.float32)
+    except (RuntimeError, sf.LibsndfileError):
+        pass
+
+    if shutil.which("ffmpeg") is None:
+        raise FFmpegMissing("ffmpeg is required to decode streamed WebM/Opus audio")
+
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-v", "error", "-i", "pipe:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(sr), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await process.communicate(data)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode blob: {err.decode(errors='ignore').strip()}")
+    return np.frombuffer(out, dtype=np.float32).copy()
+
+
+# --- SEGMENTATION ---
+
+class UtteranceSegmenter:
+    """
+    Rolling PCM buffer with an energy VAD.
+
+    `feed(pcm)` returns the utterances completed by this audio: speech
+    followed by `min_silence_ms` of silence, or `max_utterance_seconds` of
+    continuous speech (cut at the quietest frame of the last second). The
+    last `overlap_seconds` before each cut start the next utterance.
+    """
+
+    def __init__(self, sr=None, threshold_db=None, min_silence_ms=None, min_speech_ms=None,
+                 max_utterance_seconds=None, overlap_seconds=None):
+        self.sr = sr or settings.stream_sample_rate
+        self.frame = self.sr * FRAME_MS // 1000
+        self.threshold_db = settings.stream_vad_threshold_db if threshold_db is None else threshold_db
+        self.min_silence_frames = (min_silence_ms or settings.stream_min_silence_ms) // FRAME_MS
+        self.min_speech_frames = (min_speech_ms or settings.stream_min_speech_ms) // FRAME_MS
+        self.max_frames = int((max_utterance_seconds or settings.stream_max_utterance_seconds) * 1000) // FRAME_MS
+        overlap = settings.stream_overlap_seconds if overlap_seconds is None else overlap_seconds
+        self.overlap = int(overlap * self.sr)
+        self._reset(np.zeros(0, dtype=np.float32))
+
+    def _reset(self, carry):
+        self.buffer = carry
+        self.scanned = len(carry) // self.frame * self.frame  # carried audio is never re-classified
+        self.in_speech = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.levels = []  # dB per scanned frame since speech started
+
+    def _cut(self, end):
+        """Emit buffer[:end] and keep the overlap before `end` as the start of the next utterance."""
+        utterance = self.buffer[:end]
+        self._reset(self.buffer[max(0, end - self.overlap):].copy())
+        return utterance
+
+    def feed(self, pcm):
+        self.buffer = np.concatenate([self.buffer, np.asarray(pcm, dtype=np.float32)])
+        utterances = []
+
+        while len(self.buffer) - self.scanned >= self.frame:
+            start = self.scanned
+            self.scanned += self.frame
+            rms = float(np.sqrt(np.mean(self.buffer[start:self.scanned].astype(np.float64) ** 2)))
+            level = 20 * np.log10(max(rms, 1e-10))
+            speech = level >= self.threshold_db
+
+            if not self.in_speech:
+                if speech:
+                    self.in_speech = True
+                    self.speech_frames = 1
+                    self.levels = [level]
+                else:
+                    # Leading silence: keep only a short pre-roll
+                    keep = max(self.overlap, self.frame)
+                    if self.scanned > keep:
+                        drop = (self.scanned - keep) // self.frame * self.frame
+                        self.buffer = self.buffer[drop:]
+                        self.scanned -= drop
+                continue
+
+            self.levels.append(level)
+            if speech:
+                self.speech_frames += 1
+                self.silence_frames = 0
+            else:
+                self.silence_frames += 1
+
+            if self.silence_frames >= self.min_silence_frames:
+                if self.speech_frames >= self.min_speech_frames:
+                    utterances.append(self._cut(self.scanned))
+                else:
+                    self._reset(self.buffer[max(0, self.scanned - self.overlap):].copy())
+            elif len(self.levels) >= self.max_frames:
+                window = min(len(self.levels), 1000 // FRAME_MS)
+                quietest = len(self.levels) - window + int(np.argmin(self.levels[-window:]))
+                end = self.scanned - (len(self.levels) - quietest - 1) * self.frame
+                utterances.append(self._cut(end))
+                # The audio after the cut is still mid-speech
+                self.in_speech = True
+                self.speech_frames = self.min_speech_frames
+                self.levels = []
+
+        return utterances
+
+    def flush(self):
+        """Whatever speech is buffered (end of stream)."""
+        if self.in_speech and self.speech_frames >= self.min_speech_frames:
+            utterance = self.buffer[: self.scanned - self.silence_frames * self.frame]
+        else:
+            utterance = None
+        self._reset(np.zeros(0, dtype=np.float32))
+        return [utterance] if utterance is not None and len(utterance) else []
+
+
+def _words(text):
+    return [re.sub(r"[^\w']", "", w).lower() for w in text.split()]
+
+
+def merge_overlap(previous, text, max_words=8):
+    """Drop words at the start of `text` that repeat the end of `previous` (audio overlap)."""
+    prev_words = _words(previous)
+    new_words = text.split()
+    new_norm = _words(text)
+    for n in range(min(max_words, len(prev_words), len(new_norm)), 0, -1):
+        if prev_words[-n:] == new_norm[:n]:
+            return " ".join(new_words[n:])
+    return text
+
+
+# --- BACKENDS ---
+
+class OpenAIWhisperBackend:
+    name = "openai"
+
+    def __init__(self, client, model="whisper-1"):
+        self.client = client
+        self.model = model
+
+    async def transcribe(self, pcm, sr, prompt=""):
+        audio_file = io.BytesIO()
+        sf.write(audio_file, pcm, sr, format="WAV", subtype="PCM_16")
+        audio_file.seek(0)
+        audio_file.name = "utterance.wav"
+
+        kwargs = {"model": self.model, "file": audio_file, "language": "en"}
+        if prompt:
+            kwargs["prompt"] = prompt
+        transcription = await llm_usage.transcribe(self.client, "transcription_stream",
+                                                   audio_seconds=len(pcm) / sr, **kwargs)
+        return transcription.text
+
+    async def transcribe_blob(self, data, prompt=""):
+        audio_file = io.BytesIO(data)
+        audio_file.name = "audio.webm"
+
+        kwargs = {"model": self.model, "file": audio_file, "language": "en"}
+        if prompt:
+            kwargs["prompt"] = prompt
+        transcription = await llm_usage.transcribe(self.client, "transcription_stream", **kwargs)
+        return transcription.text
+
+
+_local_models = {}
+
+
+class FasterWhisperBackend:
+    """Local CPU transcription with faster-whisper (`pip install faster-whisper`)."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size=None, device="cpu", compute_type="int8"):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError("STREAM_TRANSCRIPTION_BACKEND=faster-whisper needs `pip install faster-whisper`") from e
+
+        model_size = model_size or settings.faster_whisper_model
+        key = (model_size, device, compute_type)
+        if key not in _local_models:
+            # Loading takes seconds; share one model across connections
+            _local_models[key] = WhisperModel(model_size, device=device, compute_type=compute_type)
+        self.model = _local_models[key]
+
+    def _transcribe(self, pcm, prompt):
+        segments, _ = self.model.transcribe(pcm, language="en", beam_size=1, initial_prompt=prompt or None)
+        return " ".join(segment.text.strip() for segment in segments)
+
+    async def transcribe(self, pcm, sr, prompt=""):
+        if sr != 16000:
+            import librosa
+            pcm = librosa.resample(pcm, orig_sr=sr, target_sr=16000)
+        return await asyncio.to_thread(self._transcribe, pcm, prompt)
+
+    async def transcribe_blob(self, data, prompt=""):
+        # faster-whisper decodes the container itself (PyAV)
+        return await asyncio.to_thread(self._transcribe, io.BytesIO(data), prompt)
+
+
+def get_transcription_backend(client):
+    """Backend selected by `stream_transcription_backend`, or None if it can't run."""
+    name = settings.stream_transcription_backend
+    if name == "openai":
+        return OpenAIWhisperBackend(client) if client else None
+    if name == "faster-whisper":
+        return FasterWhisperBackend()
+    raise ValueError(f"Unknown transcription backend: {name!r}")
+
+
+# --- PER-CONNECTION TRANSCRIBER ---
+
+class StreamingTranscriber:
+    """
+    Blob in, finished transcripts out, for one WebSocket connection.
+
+    With `segmentation="blob"` every blob is sent to the backend as is (the
+    previous behaviour, kept for comparison and used when ffmpeg is missing).
+    """
+
+    def __init__(self, backend, segmentation=None, context_chars=200):
+        self.backend = backend
+        self.segmentation = segmentation or settings.stream_segmentation
+        self.segmenter = UtteranceSegmenter()
+        self.sr = self.segmenter.sr
+        self.context_chars = context_chars
+        self.context = ""
+
+    async def feed(self, data):
+        """Transcripts of the utterances completed by this blob (often none)."""
+        global _ffmpeg_warned
+        if self.segmentation == "blob":
+            return await self._transcribe_blob(data)
+        try:
+            pcm = await decode_audio(data, self.sr)
+        except FFmpegMissing as e:
+            if not _ffmpeg_warned:
+                _ffmpeg_warned = True
+                print(f"⚠️ {e}; transcribing whole blobs instead of utterances")
+            self.segmentation = "blob"
+            return await self._transcribe_blob(data)
+        return await self._transcribe(self.segmenter.feed(pcm))
+
+    async def flush(self):
+        return await self._transcribe(self.segmenter.flush())
+
+    async def _transcribe_blob(self, data):
+        TRANSCRIPTION_CALLS.inc(backend=self.backend.name)
+        start = time.perf_counter()
+        text = await self.backend.transcribe_blob(data, prompt=self.context[-self.context_chars:])
+        TRANSCRIPTION_SECONDS.observe(time.perf_counter() - start)
+        return self._append(text)
+
+    def _append(self, text):
+        if text.strip():
+            self.context = f"{self.context} {text.strip()}".strip()[-2000:]
+            return [text.strip()]
+        return []
+
+    async def _transcribe(self, utterances):
+        texts = []
+        for pcm in utterances:
+            UTTERANCE_SECONDS.observe(len(pcm) / self.sr)
+            TRANSCRIPTION_CALLS.inc(backend=self.backend.name)
+            start = time.perf_counter()
+            text = await self.backend.transcribe(pcm, self.sr, prompt=self.context[-self.context_chars:])
+            TRANSCRIPTION_SECONDS.observe(time.perf_counter() - start)
+
+            if self.segmenter.overlap and self.context:
+                text = merge_overlap(self.context, text)
+            texts.extend(self._append(text))
+        return texts
@@ -0,0 +1,149 @@
+"""
+Per-request trace spans.
+
+Every HTTP request (see `trace_requests`, installed as middleware) and every
+/ws/audio connection starts a trace. Work inside it is wrapped in
+`span(stage, **attributes)`; spans nest through a context variable, so tasks
+spawned by the handler land in the same trace. Each finished span:
+
+    - is observed in the `stage_seconds{stage=...}` histogram
+    - is kept in a ring buffer (`trace_buffer_size`) served by /metrics/traces
+    - is printed as one JSON line when `trace_log_enabled` is set
+
+Spans carry the session id from `current_session` (handlers set it once per
+request; `llm_usage` accounts tokens to the same session). A trace remembers the first session id one of its spans
+saw, so the request's root span carries it too.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config.settings import settings
+from app.services import metrics
+
+STAGE_SECONDS = metrics.histogram(
+    "stage_seconds", "Latency of each pipeline stage (upload_save, audio_analysis, whisper, llm, rag, pdf_render, ...)"
+)
+HTTP_SECONDS = metrics.histogram("http_request_seconds", "HTTP request latency by route, method and status")
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+
+current_session = ContextVar("llm_session", default=None)
+_trace = ContextVar("trace", default=None)
+_span = ContextVar("span", default=None)
+
+_lock = threading.Lock()
+_recent = deque(maxlen=max(1, settings.trace_buffer_size))
+
+
+class Trace:
+    def __init__(self, trace_id=None, session_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.session_id = session_id
+
+
+def start_trace(trace_id=None, session_id=None):
+    """Begin a new trace in the current context. Returns its id."""
+    trace = Trace(trace_id, session_id)
+    _trace.set(trace)
+    _span.set(None)
+    return trace.trace_id
+
+
+def current_trace_id():
+    trace = _trace.get()
+    return trace.trace_id if trace else None
+
+
+def _current():
+    trace = _trace.get()
+    if trace is None:
+        trace = Trace()
+        _trace.set(trace)
+    return trace
+
+
+def _finish(trace, span_id, parent_id, stage, started, seconds, status, attributes):
+    session_id = current_session.get()
+    if session_id is not None and trace.session_id is None:
+        trace.session_id = session_id
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    record = {
+        "trace_id": trace.trace_id,
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "stage": stage,
+        "session_id": session_id or trace.session_id,
+        "start": round(started, 6),
+        "duration_ms": round(seconds * 1000, 3),
+        "status": status,
+        **attributes,
+    }
+    with _lock:
+        _recent.append(record)
+    if settings.trace_log_enabled:
+        print(json.dumps(record, default=str))
+
+
+@contextmanager
+def span(stage, **attributes):
+    """Time a block as one stage of the current trace (a new trace if there is none)."""
+    trace = _current()
+    span_id = uuid.uuid4().hex[:8]
+    parent_id = _span.get()
+    token = _span.set(span_id)
+    started = time.time()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        _span.reset(token)
+        _finish(trace, span_id, parent_id, stage, started, time.perf_counter() - start, status, attributes)
+
+
+def record_span(stage, seconds, status="ok", **attributes):
+    """A span timed by the caller, for work that can't sit in one `with` block (async generators)."""
+    _finish(_current(), uuid.uuid4().hex[:8], _span.get(), stage, time.time() - seconds, seconds, status, attributes)
+
+
+async def trace_requests(request, call_next):
+    """HTTP middleware: one trace per request, returned as `X-Trace-Id`."""
+    trace_id = start_trace(request.headers.get("x-request-id"))
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        with span("http", method=request.method, path=request.url.path) as attributes:
+            response = await call_next(request)
+            status = response.status_code
+            attributes["status_code"] = status
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                             route=getattr(route, "path", "unmatched"), status=status)
+    response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
+def recent_spans(session_id=None, trace_id=None, limit=100):
+    """Newest finished spans first, optionally for one session or trace."""
+    with _lock:
+        spans = list(_recent)
+    out = []
+    for record in reversed(spans):
+        if session_id is not None and record["session_id"] != session_id:
+            continue
+        if trace_id is not None and record["trace_id"] != trace_id:
+            continue
+        out.append(record)
+        if len(out) >= limit:
+            break
+    return out
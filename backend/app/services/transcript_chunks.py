@@ -0,0 +1,55 @@
+"""
+Splitting long transcripts for map-reduce analysis, and merging the results.
+
+Chunks end on sentence boundaries. Each chunk also carries the last few
+sentences before it as read-only context, so the model can tell who is
+speaking at the start of a chunk without diarizing those sentences twice.
+"""
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text.strip()) if s.strip()]
+
+
+def chunk_transcript(text, max_chars, overlap_sentences=2):
+    """
+    [(context, body)] covering `text` in order. `body` holds whole sentences
+    up to about `max_chars`; `context` is the `overlap_sentences` sentences
+    before it ("" for the first chunk).
+    """
+    sentences = split_sentences(text)
+    chunks = []
+    start = 0
+    while start < len(sentences):
+        end = start
+        size = 0
+        # Always take at least one sentence, even if it alone exceeds max_chars
+        while end < len(sentences) and (end == start or size + len(sentences[end]) + 1 <= max_chars):
+            size += len(sentences[end]) + 1
+            end += 1
+        context = " ".join(sentences[max(0, start - overlap_sentences):start])
+        chunks.append((context, " ".join(sentences[start:end])))
+        start = end
+    return chunks
+
+
+def merge_turns(merged, turns):
+    """
+    Append `turns` to `merged`, joining a turn that was split across the
+    chunk boundary (same speaker on both sides) into one.
+    """
+    turns = list(turns)
+    if merged and turns and merged[-1].get("speaker") == turns[0].get("speaker"):
+        last, first = merged[-1], turns.pop(0)
+        merged[-1] = {
+            **last,
+            "text": f"{last.get('text', '')} {first.get('text', '')}".strip(),
+            "cues": list(dict.fromkeys((last.get("cues") or []) + (first.get("cues") or []))),
+            "is_masked_distress": bool(last.get("is_masked_distress") or first.get("is_masked_distress")),
+            "is_hesitation": bool(last.get("is_hesitation") or first.get("is_hesitation")),
+        }
+    merged.extend(turns)
+    return merged
@@ -0,0 +1,58 @@
+"""
+Streaming upload persistence.
+
+Copies an `UploadFile` to disk in fixed-size chunks, hashing on the way, so
+memory use per upload is bounded by the chunk size however long the recording
+is. Data lands in a hidden temp file next to the destination and is renamed
+into place only once complete, so readers never see a partial file. Disk
+writes and the final fsync run in a worker thread, off the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded the configured size cap."""
+
+
+def _sync(out):
+    out.flush()
+    os.fsync(out.fileno())
+
+
+async def save_upload_stream(upload, destination, max_bytes=None, chunk_size=1024 * 1024):
+    """
+    Stream `upload` into `destination` atomically.
+
+    Returns (sha256 hex digest, size in bytes). Raises UploadTooLarge once more
+    than `max_bytes` have been received; nothing is left on disk in that case.
+    """
+    directory = os.path.dirname(destination) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+            await asyncio.to_thread(_sync, out)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return hasher.hexdigest(), size
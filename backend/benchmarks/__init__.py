@@ -0,0 +1 @@
+"""Benchmarks and load tests (run from the backend directory with `python -m benchmarks.<name>`)"""
@@ -0,0 +1,131 @@
+"""
+Benchmark: full vs streaming `analyze_audio_signal` on long recordings.
+
+Writes synthetic recordings of increasing length (block by block, so the
+benchmark itself stays small), analyzes each in a fresh process per mode and
+reports runtime, peak RSS and the largest difference between the two output
+dicts. Streaming peak RSS should stay flat as the recording grows.
+
+`--check` instead compares the two modes in-process on a short synthetic
+recording with a quiet first part (so a per-block VAD gate would differ),
+for several block sizes that cut frames at odd places, with the VAD on and
+off, and exits with status 1 if any statistic or the raw F0 spread differs
+by more than `--tolerance`.
+
+Usage (from backend/):
+    python -m benchmarks.bench_audio_streaming --minutes 5 20 60
+    python -m benchmarks.bench_audio_streaming --check
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.bench_pitch import synthetic_voice
+from benchmarks.bench_upload_memory import current_rss_mb, peak_rss_mb, reset_peak_rss
+
+
+def write_recording(path, minutes, sr=48000):
+    block, _, _ = synthetic_voice(60, sr=sr)
+    with sf.SoundFile(path, "w", samplerate=sr, channels=1, subtype="PCM_16") as f:
+        for i in range(int(minutes)):
+            f.write(block * (0.5 + 0.5 * np.sin(i)))
+
+
+def _worker(path, mode, queue, warmup_path):
+    from app.services.audio_analysis import analyze_audio_signal
+
+    # Pay librosa's lazy imports before the baseline so only the analysis counts
+    analyze_audio_signal(warmup_path, mode=mode)
+    reset_peak_rss()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    stats = analyze_audio_signal(path, mode=mode)
+    queue.put((stats, time.perf_counter() - start, peak_rss_mb() - baseline))
+
+
+def run_mode(path, mode, warmup_path):
+    queue = mp.Queue()
+    process = mp.Process(target=_worker, args=(path, mode, queue, warmup_path))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def max_difference(a, b):
+    diffs = {k: abs(float(a[k]) - float(b[k])) for k in a if k != "volume_series"}
+    diffs["volume_series"] = max(
+        (abs(x - y) for x, y in zip(a["volume_series"], b["volume_series"])), default=0.0
+    )
+    return diffs
+
+
+def check(tolerance, seconds=90, sr=48000):
+    from app.config.settings import settings
+    from app.services import audio_analysis
+    from app.services.pitch import estimate_f0
+
+    y, _, _ = synthetic_voice(seconds, sr=sr)
+    y[: sr * 20] *= 0.02  # quiet opening: its own blocks' peak is far below the file's
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.wav")
+        sf.write(path, y, sr, subtype="FLOAT")
+        for vad in (True, False):
+            settings.pitch_vad = vad
+            f0 = estimate_f0(y, sr, backend=settings.pitch_backend, vad=vad)
+            full_std = float(np.std(f0[~np.isnan(f0)]))
+            full = audio_analysis._analyze_full(path)
+            for block_seconds in (3.3, 7.01, 30):
+                pitch = audio_analysis._StreamingPitch(sr, len(y))
+                step = int(block_seconds * sr)
+                for start in range(0, len(y), step):
+                    pitch.feed(y[start:start + step])
+                pitch.feed(np.zeros(0, dtype=np.float32), last=True)
+                diffs = max_difference(full, audio_analysis._analyze_streaming(path, block_seconds))
+                diffs["pitch_std_hz"] = abs(full_std - pitch.std())
+                worst = max(diffs, key=diffs.get)
+                ok = diffs[worst] <= tolerance
+                failures += not ok
+                print(f"vad={vad!s:<5} block {block_seconds:5g}s | pitch std {full_std:.4f} Hz"
+                      f" | max diff {diffs[worst]:.2e} ({worst}) {'ok' if ok else 'FAIL'}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[5, 20, 60])
+    parser.add_argument("--skip-full", action="store_true", help="only run the streaming mode")
+    parser.add_argument("--check", action="store_true", help="verify streaming matches the whole-file analysis")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check(args.tolerance) else 0)
+
+    mp.set_start_method("spawn", force=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        warmup_path = os.path.join(tmp, "warmup.wav")
+        write_recording(warmup_path, 1)
+
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"visit_{minutes:g}min.wav")
+            write_recording(path, minutes)
+
+            streamed, s_time, s_peak = run_mode(path, "streaming", warmup_path)
+            line = f"{minutes:5g} min | streaming {s_time:7.2f}s peak +{s_peak:7.1f} MB"
+            if not args.skip_full:
+                full, f_time, f_peak = run_mode(path, "full", warmup_path)
+                worst = max(max_difference(full, streamed).values())
+                line += f" | full {f_time:7.2f}s peak +{f_peak:7.1f} MB | max output diff {worst:.4f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
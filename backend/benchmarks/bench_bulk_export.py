@@ -0,0 +1,165 @@
+"""
+Benchmark: bulk report export vs one /generate-report per session.
+
+Writes --sessions synthetic visits into a temporary upload cache. Each visit
+has --turns turns; every flagged patient complaint is drawn from
+--complaints distinct texts, so many visits repeat the same complaint.
+Three ways of producing every report are compared:
+
+    one-by-one  what a supervisor does today: per session, RAG for its
+                flagged turns, then render on the event loop
+    bulk zip    `export_reports` (shared RAG, report pool, streamed ZIP)
+    bulk pdf    the same, streamed as one merged PDF
+
+Prints wall time, reports/s, OpenAI solution requests and the peak RSS
+growth of this process while the export runs. Run it with several
+--sessions values to see that bulk memory does not grow with the batch.
+The solution cache is disabled so only in-export de-duplication counts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bulk_export --sessions 50 500 --turns 60 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+
+from app.config.settings import settings
+from app.services import bulk_export, rag_service, report_jobs, result_cache
+from app.services.pdf_service import render_pdf_report
+from benchmarks.fakes import FakeAsyncOpenAI
+
+COMPLAINT = ("I can't afford my {thing} this month and I have been skipping doses to make it last, "
+             "which worries me because my {body} has been acting up again.")
+THINGS = ["insulin", "inhaler", "blood pressure pills", "rent", "bus pass", "groceries", "phone bill", "co-pay"]
+BODIES = ["sugar", "breathing", "heart", "back", "sleep"]
+
+
+def visit(i, turns, complaints, rng):
+    conversation = []
+    for t in range(turns):
+        if t % 2 == 0:
+            conversation.append({"speaker": "CHW", "text": "How have things been since we last spoke?", "cues": []})
+        elif rng.random() < 0.3:
+            k = rng.randrange(complaints)
+            text = COMPLAINT.format(thing=THINGS[k % len(THINGS)], body=BODIES[k % len(BODIES)]) + f" ({k})"
+            conversation.append({"speaker": "Patient", "text": text, "cues": ["Economic Stability"]})
+        else:
+            conversation.append({"speaker": "Patient", "text": "Things are mostly okay, thank you.", "cues": []})
+    return {
+        "metadata": {"session_id": f"SESS-{i:06d}", "date": "2026-01-05", "start_time": "09:00",
+                     "end_time": "09:30", "patient_name": "Mr. Jones", "chw_name": "Sarah"},
+        "audio_stats": {}, "summary": "Follow-up visit.", "stats": {"open_ended_questions": turns // 2,
+                                                                      "closed_ended_questions": 0},
+        "conversation": conversation,
+    }
+
+
+def fill_cache(sessions, turns, complaints):
+    rng = random.Random(7)
+    ids = []
+    for i in range(sessions):
+        digest = f"{i:064x}"
+        result_cache.upload_cache.put(digest, "final", visit(i, turns, complaints, rng))
+        ids.append(f"SESS-{i:06d}")
+    return ids
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakRss:
+    def __init__(self):
+        self.base = rss_bytes()
+        self.peak = self.base
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+async def one_by_one(client, ids, out_dir):
+    index = bulk_export.session_index()
+    for session_id in ids:
+        data = result_cache.upload_cache.get(index[session_id], "final")
+        turns = rag_service.report_turns(data["conversation"])
+        solutions = await rag_service.get_solutions_for_turns(client, [t["text"] for t in turns])
+        pdf_bytes = render_pdf_report(data, rag_service.solved_problems(turns, solutions))
+        with open(os.path.join(out_dir, f"{session_id}.pdf"), "wb") as f:
+            f.write(pdf_bytes)
+
+
+async def bulk(client, ids, fmt, out_dir):
+    sources, missing = bulk_export.resolve_sessions(ids)
+    assert not missing, missing
+    with open(os.path.join(out_dir, f"export.{fmt}"), "wb") as f:
+        async for chunk in bulk_export.export_reports(client, sources, fmt):
+            f.write(chunk)
+    return os.path.getsize(f.name)
+
+
+async def run(args):
+    settings.solution_cache_enabled = False
+    settings.report_pool_workers = args.workers
+    settings.bulk_export_max_in_flight = args.in_flight
+    # No guide collection needed: every complaint gets empty context
+    async def no_context(texts, *_, **__):
+        return [[] for _ in texts]
+    rag_service.aquery_guide = no_context
+    report_jobs.start_report_pool()
+    await report_jobs.submit_report_render(visit(0, 2, 1, random.Random(0)), [])
+
+    try:
+        for sessions in args.sessions:
+            with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as out_dir:
+                result_cache.upload_cache.root = cache_dir
+                ids = fill_cache(sessions, args.turns, args.complaints)
+                print(f"== {sessions} sessions x {args.turns} turns, {args.complaints} distinct complaints")
+                modes = [("bulk zip", lambda c: bulk(c, ids, "zip", out_dir)),
+                         ("bulk pdf", lambda c: bulk(c, ids, "pdf", out_dir))]
+                if sessions <= args.max_one_by_one:
+                    modes.insert(0, ("one-by-one", lambda c: one_by_one(c, ids, out_dir)))
+                for label, job in modes:
+                    client = FakeAsyncOpenAI(latency=args.latency, chat_payload=lambda _: "Refer to the program.")
+                    start = time.perf_counter()
+                    with PeakRss() as rss:
+                        size = await job(client)
+                    elapsed = time.perf_counter() - start
+                    size_note = f" | {size / 1e6:6.1f} MB out" if size else ""
+                    print(f"  {label:<11} {elapsed:7.2f}s {sessions / elapsed:7.1f} reports/s"
+                          f" | {client.calls['chat']:5d} solution requests"
+                          f" | peak RSS +{(rss.peak - rss.base) / 1e6:6.1f} MB{size_note}")
+    finally:
+        report_jobs.shutdown_report_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--complaints", type=int, default=40, help="distinct flagged complaints")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake OpenAI latency per solution")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--max-one-by-one", type=int, default=100, help="skip the slow baseline above this size")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
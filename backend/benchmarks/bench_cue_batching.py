@@ -0,0 +1,130 @@
+"""
+Benchmark: realtime cue classification with and without micro-batching.
+
+`--sessions` simulated /ws/audio connections each classify `--statements`
+utterances at random intervals through `classify_statement` (local filter,
+then the shared batcher). OpenAI is a fake whose latency grows a little with
+the number of items in the request. Reports chat requests sent, batch sizes,
+queueing delay added by the batcher and end-to-end latency per statement.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cue_batching --sessions 50 --max-wait-ms 20 --max-batch 8
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakeAsyncOpenAI
+
+STATEMENTS = [
+    "I can't afford my insulin this month.",
+    "We're behind on rent and the landlord is talking about eviction.",
+    "I have no ride to the clinic, it's two buses each way.",
+    "I feel so alone since my husband passed away.",
+    "I ran out of my blood pressure meds last week.",
+]
+CUE = {"category": "Economic Stability", "issue_summary": "Cannot afford medication", "severity": "Severe"}
+
+
+def respond(kwargs):
+    """Answer single and batched requests the way the real prompt asks for."""
+    user = kwargs["messages"][-1]["content"]
+    items = re.findall(r"^### Item (\d+)$", user, flags=re.MULTILINE)
+    if items:
+        return {"results": [{"id": int(i), "detected_cues": [CUE]} for i in items]}
+    return {"detected_cues": [CUE]}
+
+
+class ScaledFake(FakeAsyncOpenAI):
+    """Fake whose chat latency grows with the number of batched items (longer output)."""
+
+    def __init__(self, latency, per_item):
+        super().__init__(latency=latency, chat_payload=respond)
+        completions = self.chat.completions
+        original = completions.create
+
+        async def create(**kwargs):
+            items = len(re.findall(r"^### Item \d+$", kwargs["messages"][-1]["content"], flags=re.MULTILINE))
+            await asyncio.sleep(per_item * max(0, items - 1))
+            return await original(**kwargs)
+
+        completions.create = create
+
+
+async def session(classify, statements, spread, latencies):
+    history = []
+    for _ in range(statements):
+        await asyncio.sleep(random.uniform(0, spread))
+        start = time.perf_counter()
+        await classify(random.choice(STATEMENTS), history)
+        latencies.append(time.perf_counter() - start)
+
+
+def _series(snapshot, name):
+    series = snapshot.get(name, {}).get("series", [])
+    return series[0] if series else {}
+
+
+async def run_mode(label, args, enabled):
+    from app.config.settings import settings
+    from app.routes import stream
+    from app.services import metrics
+    from app.services.cue_batcher import cue_batcher
+
+    settings.cue_batch_enabled = enabled
+    cue_batcher.max_batch = args.max_batch
+    cue_batcher.max_wait = args.max_wait_ms / 1000
+    # Fresh histograms per mode
+    metrics.histogram("cue_batch_size")._series.clear()
+    metrics.histogram("cue_batch_queue_seconds")._series.clear()
+
+    fake = ScaledFake(args.latency, args.per_item_latency)
+    stream.client = fake
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        session(stream.classify_statement, args.statements, args.spread, latencies)
+        for _ in range(args.sessions)
+    ))
+    wall = time.perf_counter() - start
+
+    snap = metrics.snapshot()
+    size = _series(snap, "cue_batch_size")
+    delay = _series(snap, "cue_batch_queue_seconds")
+    ms = np.array(latencies) * 1000
+    print(
+        f"{label:<10} | {len(latencies)} statements -> {fake.calls['chat']} chat requests"
+        f" (avg batch {size.get('avg', 1):4.1f}, p95 {size.get('p95', 1):g})"
+        f" | queueing delay p50 {delay.get('p50', 0) * 1000:5.1f} ms p95 {delay.get('p95', 0) * 1000:5.1f} ms"
+        f" | latency p50 {np.percentile(ms, 50):6.1f} ms p95 {np.percentile(ms, 95):6.1f} ms | wall {wall:5.2f}s"
+    )
+
+
+async def run(args):
+    from app.config.settings import settings
+
+    settings.cue_filter_enabled = False  # every statement goes to the (fake) model
+    random.seed(0)
+    await run_mode("unbatched", args, enabled=False)
+    random.seed(0)
+    await run_mode("batched", args, enabled=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--statements", type=int, default=10, help="statements per session")
+    parser.add_argument("--spread", type=float, default=1.0, help="max seconds between statements")
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per fake chat request")
+    parser.add_argument("--per-item-latency", type=float, default=0.02, help="extra seconds per batched item")
+    parser.add_argument("--max-wait-ms", type=float, default=20.0)
+    parser.add_argument("--max-batch", type=int, default=8)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+End-to-end benchmark: replay a synthetic corpus of recorded sessions through
+a real backend process talking to the local mock OpenAI server.
+
+Starts `benchmarks.mock_openai` (--latency/--jitter per request) and, for
+each --concurrency level, a fresh `uvicorn app.main:app` with empty caches
+and session store, pointed at the mock through OPENAI_BASE_URL. No API key
+or network is needed. The corpus is --sessions WAV recordings of synthetic
+speech (`session_<ms>.wav`, so each gets its own SESS id) with a generated
+CHW/patient transcript per recording. Endpoints are replayed in the order
+a CHW uses them, at most --concurrency requests at a time:
+
+    upload       POST /upload-full-audio with each recording
+    ws           /ws/audio: --ws-blobs 3 s WAV blobs per session, each sent
+                 once the reply to the previous one arrived
+                 (STREAM_SEGMENTATION=blob, one reply per blob); latency is
+                 per blob
+    report       POST /generate-report with each upload's dashboard data
+    form         POST /extract-form-data with the dashboard transcript
+                 (served from the form filled during the upload, as in the app)
+
+Before timing, one extra recording is uploaded and reported on, so worker
+pool start-up is not counted. For each endpoint: requests, errors, throughput, p50/p95/p99 latency and
+the peak RSS of the backend (main process, and with its worker pools).
+Server-side stage latencies from /metrics/summary are included. Results
+go to --output as JSON (default: benchmarks/results/e2e-<commit>.json).
+`--compare` checks them against an earlier file and exits with status 1 if
+a p95 rose or a throughput fell by more than --tolerance (changes under
+--min-delta-ms are ignored).
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e --sessions 20 --concurrency 1 4 --latency 0.3
+    python -m benchmarks.bench_e2e --compare benchmarks/results/e2e-<old commit>.json
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import soundfile as sf
+import websockets
+
+from app.services.metrics import percentile
+from benchmarks.bench_pitch import synthetic_voice
+from benchmarks.load_concurrent_sessions import _free_port
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SR = 16000
+BLOB_SECONDS = 3
+
+CHW_LINES = [
+    "How have you been since our last visit?",
+    "Were you able to pick up your medications this month?",
+    "How are things going at home?",
+    "Do you have a way to get to your appointments?",
+    "What would you like to work on before next time?",
+]
+PATIENT_LINES = [
+    "I can't afford my insulin this month so I have been skipping doses.",
+    "The rent went up again and I am behind on the electric bill.",
+    "I missed the clinic because there was no bus and no ride.",
+    "There is mold in the bathroom and the neighborhood is not safe at night.",
+    "I feel alone most days since my family moved away.",
+    "My insurance stopped covering the refill and the pharmacy sent me home.",
+    "Things are okay, I have been walking a little more.",
+    "I am fine, really, just tired.",
+]
+
+
+# --- corpus ---
+
+def make_corpus(sessions, audio_seconds, turns, out_dir):
+    """[{"name", "audio", "blobs", "digest", "transcript"}], one per recording."""
+    rng = random.Random(7)
+    base_ms = 1767225600000
+    corpus = []
+    for i in range(sessions):
+        y, sr, _ = synthetic_voice(audio_seconds, sr=SR, seed=i)
+        buf = io.BytesIO()
+        sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+        audio = buf.getvalue()
+        blobs = []
+        for start in range(0, len(y), BLOB_SECONDS * sr):
+            blob = io.BytesIO()
+            sf.write(blob, y[start:start + BLOB_SECONDS * sr], sr, format="WAV", subtype="PCM_16")
+            blobs.append(blob.getvalue())
+        lines = []
+        for t in range(turns):
+            lines.append(rng.choice(CHW_LINES) if t % 2 == 0 else rng.choice(PATIENT_LINES))
+        name = f"session_{base_ms + i * 3_600_000}.wav"
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(audio)
+        corpus.append({"name": name, "audio": audio, "blobs": blobs,
+                       "digest": hashlib.sha256(audio).hexdigest(), "transcript": " ".join(lines)})
+    return corpus
+
+
+# --- processes ---
+
+def tree_rss(pid):
+    """(RSS of pid, RSS of pid and all its descendants) in bytes."""
+    def rss(p):
+        try:
+            with open(f"/proc/{p}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return 0
+
+    def children(p):
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                return [int(c) for c in f.read().split()]
+        except OSError:
+            return []
+
+    main, total, stack = rss(pid), 0, [pid]
+    while stack:
+        p = stack.pop()
+        total += rss(p)
+        stack.extend(children(p))
+    return main, total
+
+
+class PeakRss:
+    """Peak RSS of a process (and of its process tree) while the block runs."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak_main, self.peak_tree = tree_rss(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.02):
+            main, tree = tree_rss(self.pid)
+            self.peak_main, self.peak_tree = max(self.peak_main, main), max(self.peak_tree, tree)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def wait_until_up(url, process, log_path, timeout=180):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    with open(log_path, "r", errors="replace") as f:
+        tail = f.read()[-3000:]
+    raise SystemExit(f"{url} did not come up:\n{tail}")
+
+
+def spawn(args, cwd, env, log_path):
+    log = open(log_path, "wb")
+    return subprocess.Popen(args, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def start_backend(mock_port, work_dir):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "OPENAI_API_KEY": "mock",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{mock_port}/v1",
+        "CHROMA_PATH": os.path.join(BACKEND_DIR, "chw_sentence_db"),
+        "UPLOAD_CACHE_DIR": os.path.join(work_dir, "cache", "uploads"),
+        "FORM_CACHE_DIR": os.path.join(work_dir, "cache", "forms"),
+        "SOLUTION_CACHE_PATH": os.path.join(work_dir, "cache", "solution_cache.json"),
+        "SESSION_DB_PATH": os.path.join(work_dir, "sessions.db"),
+        "REPORT_STORE_DIR": "",
+        "STREAM_TRANSCRIPTION_BACKEND": "openai",
+        "STREAM_SEGMENTATION": "blob",
+    }
+    log_path = os.path.join(work_dir, "backend.log")
+    process = spawn([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                     "--log-level", "warning"], work_dir, env, log_path)
+    wait_until_up(f"http://127.0.0.1:{port}/health", process, log_path)
+    return process, port
+
+
+# --- replay ---
+
+async def replay(items, call, concurrency):
+    """Run `call(item)` for every item, `concurrency` at a time. Returns (latencies, errors, results, seconds)."""
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    latencies, results, errors = [], {}, []
+
+    async def worker():
+        while not queue.empty():
+            item = queue.get_nowait()
+            try:
+                seconds, result = await call(item)
+                latencies.extend(seconds)
+                results[item["name"]] = result
+            except Exception as e:
+                errors.append(f"{item['name']}: {type(e).__name__}: {e}"[:300])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, results, time.perf_counter() - start
+
+
+def _timed_post(http, path, **kwargs):
+    async def post():
+        start = time.perf_counter()
+        response = await http.post(path, **kwargs)
+        seconds = time.perf_counter() - start
+        response.raise_for_status()
+        return seconds, response
+    return post()
+
+
+async def run_level(port, pid, warmup, corpus, concurrency, ws_blobs):
+    base = f"http://127.0.0.1:{port}"
+    uploads = {}
+    out = {}
+    async with httpx.AsyncClient(base_url=base, timeout=600) as http:
+
+        async def upload(item):
+            seconds, response = await _timed_post(http, "/upload-full-audio",
+                                                  files={"file": (item["name"], item["audio"], "audio/wav")})
+            body = response.json()
+            if body.get("status") != "success":
+                raise RuntimeError(body.get("message"))
+            uploads[item["name"]] = body["data"]
+            return [seconds], None
+
+        async def ws(item):
+            seconds = []
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio", max_size=None) as socket:
+                for blob in item["blobs"][:ws_blobs]:
+                    start = time.perf_counter()
+                    await socket.send(blob)
+                    json.loads(await asyncio.wait_for(socket.recv(), 120))
+                    seconds.append(time.perf_counter() - start)
+            return seconds, None
+
+        async def report(item):
+            seconds, response = await _timed_post(http, "/generate-report",
+                                                  json={"conversationData": uploads[item["name"]]})
+            if response.headers.get("content-type") != "application/pdf":
+                raise RuntimeError(response.text[:200])
+            return [seconds], len(response.content)
+
+        async def form(item):
+            data = uploads[item["name"]]
+            transcript = "\n".join(f"{t['speaker']}: {t['text']}" for t in data.get("conversation") or [])
+            seconds, response = await _timed_post(http, "/extract-form-data", json={
+                "transcript": transcript, "session_id": data["metadata"]["session_id"]})
+            if response.json().get("status") != "success":
+                raise RuntimeError(response.text[:200])
+            return [seconds], None
+
+        # Audio and report pools import librosa / load fonts in their first job
+        await upload(warmup)
+        await report(warmup)
+
+        for endpoint, call in (("upload", upload), ("ws", ws), ("report", report), ("form", form)):
+            items = corpus if endpoint in ("upload", "ws") else [item for item in corpus if item["name"] in uploads]
+            with PeakRss(pid) as rss:
+                latencies, errors, _, elapsed = await replay(items, call, concurrency)
+            out[endpoint] = summarize(latencies, errors, elapsed, rss)
+            print_row(endpoint, out[endpoint])
+            for error in errors[:3]:
+                print(f"      ! {error}")
+
+        summary = (await http.get("/metrics/summary")).json()
+    stages = {}
+    for series in summary.get("stage_seconds", {}).get("series", []):
+        stages[series["labels"]["stage"]] = {key: series[key] for key in ("count", "p50", "p95", "p99")}
+    return out, stages
+
+
+def summarize(latencies, errors, elapsed, rss):
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_rss_mb": round(rss.peak_main / 1e6, 1),
+        "peak_rss_tree_mb": round(rss.peak_tree / 1e6, 1),
+    }
+
+
+def print_row(endpoint, row):
+    print(f"  {endpoint:<7} {row['requests']:5d} req {row['errors']:3d} err | {row['throughput_rps']:7.2f} req/s"
+          f" | p50 {row['p50_ms']:8.1f} p95 {row['p95_ms']:8.1f} p99 {row['p99_ms']:8.1f} ms"
+          f" | peak RSS {row['peak_rss_mb']:6.1f} MB ({row['peak_rss_tree_mb']:6.1f} MB with pools)")
+
+
+# --- results ---
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Print changes against `baseline`; returns the regressions found."""
+    regressions = []
+    print(f"== vs {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for level, endpoints in current["results"].items():
+        old_level = baseline.get("results", {}).get(level)
+        if old_level is None:
+            continue
+        for endpoint, row in endpoints.items():
+            old = old_level.get(endpoint)
+            if not old or not old.get("requests"):
+                continue
+            p95 = row["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+            rps = row["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+            rss = row["peak_rss_tree_mb"] - old["peak_rss_tree_mb"]
+            # Relative changes of a few milliseconds (cache hits) are noise, not regressions
+            slower = row["p95_ms"] - old["p95_ms"] > min_delta_ms
+            longer = (row["seconds"] - old["seconds"]) * 1000 > min_delta_ms
+            flag = ""
+            if (p95 > tolerance and slower) or (rps < -tolerance and longer):
+                flag = "  REGRESSION"
+                regressions.append(f"c={level} {endpoint}")
+            print(f"  c={level:<3} {endpoint:<7} p95 {old['p95_ms']:8.1f} -> {row['p95_ms']:8.1f} ms ({p95:+.0%})"
+                  f" | {old['throughput_rps']:7.2f} -> {row['throughput_rps']:7.2f} req/s ({rps:+.0%})"
+                  f" | RSS {rss:+.1f} MB{flag}")
+    return regressions
+
+
+async def run(args):
+    results, stages = {}, {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        os.makedirs(corpus_dir)
+        warmup, *corpus = make_corpus(args.sessions + 1, args.audio_seconds, args.turns, corpus_dir)
+        print(f"== {args.sessions} recordings x {args.audio_seconds:.0f}s, {args.turns} turns, "
+              f"mock latency {args.latency}s (+{args.jitter}s jitter)")
+
+        mock_port = _free_port()
+        mock_log = os.path.join(work_dir, "mock.log")
+        mock = spawn([sys.executable, "-m", "benchmarks.mock_openai", "--port", str(mock_port),
+                      "--latency", str(args.latency), "--jitter", str(args.jitter)], BACKEND_DIR, os.environ, mock_log)
+        try:
+            wait_until_up(f"http://127.0.0.1:{mock_port}/mock/stats", mock, mock_log)
+            httpx.post(f"http://127.0.0.1:{mock_port}/mock/config",
+                       json={"transcripts": {item["digest"]: item["transcript"] for item in [warmup] + corpus}}).raise_for_status()
+            for concurrency in args.concurrency:
+                level_dir = os.path.join(work_dir, f"c{concurrency}")
+                os.makedirs(level_dir)
+                backend, port = start_backend(mock_port, level_dir)
+                print(f"-- concurrency {concurrency} (backend pid {backend.pid})")
+                try:
+                    results[str(concurrency)], stages[str(concurrency)] = await run_level(
+                        port, backend.pid, warmup, corpus, concurrency, args.ws_blobs)
+                finally:
+                    stop(backend)
+            mock_stats = httpx.get(f"http://127.0.0.1:{mock_port}/mock/stats").json()
+        finally:
+            stop(mock)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+            "mock_requests": mock_stats,
+        },
+        "results": results,
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="recordings in the corpus")
+    parser.add_argument("--audio-seconds", type=float, default=20.0, help="length of each recording")
+    parser.add_argument("--turns", type=int, default=24, help="transcript turns per recording")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--ws-blobs", type=int, default=4, help="blobs sent per /ws/audio session")
+    parser.add_argument("--latency", type=float, default=0.3, help="mock OpenAI latency per request")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("-o", "--output", help="results file (default: benchmarks/results/e2e-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 rise / throughput drop")
+    parser.add_argument("--min-delta-ms", type=float, default=50.0,
+                        help="ignore p95 / phase time changes smaller than this")
+    args = parser.parse_args()
+
+    current = asyncio.run(run(args))
+    output = args.output or os.path.join(BACKEND_DIR, "benchmarks", "results", f"e2e-{current['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(current, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: separate vs combined analysis + encounter-form extraction.
+
+Runs the upload flow's LLM stage followed by the dashboard's "Fill Form"
+click against a fake GPT-4o that charges `--latency` plus `--token-delay` per
+prompt and output token. The separate mode sends the transcript twice
+(`analyze_transcript`, then `extract_form_data` on the diarized text). The
+combined mode sends it once and caches the form, so `/extract-form-data`
+becomes a cache lookup.
+
+Reports requests, prompt/output tokens and the latency of each step. Pass
+`--invalid` to make the fake's combined answer fail validation and exercise
+the fallback to separate calls.
+
+Usage (from backend/):
+    python -m benchmarks.bench_form_extraction --turns 40
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+
+from app.services import llm_analysis
+from app.services.result_cache import ResultCache
+from benchmarks.bench_stream_analysis import analysis_payload
+from benchmarks.fakes import CHARS_PER_TOKEN
+
+FORM = {
+    "patientName": "Mr. Jones",
+    "topics": ["Medication", "Economic Stability"],
+    "referrals": ["Pharmacy assistance program"],
+    "risks": ["Missed refills"],
+    "patientGoals": "Take medication every day",
+    "stageOfChange": ["Preparation"],
+    "confidence": "7",
+    "chwNotes": "Patient cannot always afford refills.",
+    "followUpPlan": "Call in one week about the assistance application.",
+}
+
+
+class FormFake:
+    """Answers the analysis, form and combined prompts; counts requests and tokens."""
+
+    def __init__(self, latency, token_delay, turns, invalid=False):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.analysis = analysis_payload(turns)
+        self.invalid = invalid
+        self.calls = {"chat": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _answer(self, system):
+        if system == llm_analysis.SYSTEM_PROMPT_FORM:
+            return FORM
+        if system == llm_analysis.SYSTEM_PROMPT_COMBINED:
+            if self.invalid:
+                return {"analysis": {"summary": "cut short"}, "encounter_form": {"topics": "not a list"}}
+            return {"analysis": self.analysis, "encounter_form": FORM}
+        return self.analysis
+
+    async def create(self, **kwargs):
+        messages = kwargs["messages"]
+        content = json.dumps(self._answer(messages[0]["content"]), indent=2)
+        prompt_tokens = sum(len(m["content"]) for m in messages) // CHARS_PER_TOKEN
+        completion_tokens = len(content) // CHARS_PER_TOKEN
+        self.calls["chat"] += 1
+        self.calls["prompt_tokens"] += prompt_tokens
+        self.calls["completion_tokens"] += completion_tokens
+        # Prefill is much cheaper per token than generation
+        await asyncio.sleep(self.latency + self.token_delay * (prompt_tokens / 10 + completion_tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def fill_form(fake, cache, transcript):
+    """What /extract-form-data does."""
+    key = llm_analysis.form_cache_key(transcript)
+    form = cache.get(key, "form")
+    if form is None:
+        form = await llm_analysis.extract_form_data(fake, transcript)
+        cache.put(key, "form", form)
+    return form
+
+
+async def measure(combined, args, cache):
+    fake = FormFake(args.latency, args.token_delay, args.turns, invalid=args.invalid)
+    raw_text = " ".join(turn["text"] for turn in fake.analysis["conversation"])
+    audio_stats = {"energy_score": 55}
+
+    start = time.perf_counter()
+    if combined:
+        analysis, form = await llm_analysis.analyze_transcript_with_form(fake, raw_text, audio_stats)
+        if form is not None:
+            cache.put(llm_analysis.form_cache_key(llm_analysis.dashboard_transcript(analysis["conversation"])), "form", form)
+    else:
+        analysis = await llm_analysis.analyze_transcript(fake, raw_text, audio_stats)
+    upload = time.perf_counter() - start
+
+    start = time.perf_counter()
+    form = await fill_form(fake, cache, llm_analysis.dashboard_transcript(analysis["conversation"]))
+    click = time.perf_counter() - start
+    assert form == FORM, form
+    return upload, click, fake.calls
+
+
+async def run(args):
+    from app.config.settings import settings
+
+    settings.long_transcript_chars = 0
+    print(f"{args.turns} turns, fake latency {args.latency}s + {args.token_delay * 1000:g} ms/output token"
+          f"{' (combined answer invalid)' if args.invalid else ''}")
+    for label, combined in (("separate", False), ("combined", True)):
+        with tempfile.TemporaryDirectory() as root:
+            upload, click, calls = await measure(combined, args, ResultCache(root))
+        print(f"{label:<9} | upload analysis {upload:6.2f}s | fill form {click * 1000:8.1f} ms"
+              f" | requests {calls['chat']} | prompt tokens {calls['prompt_tokens']:6d}"
+              f" | output tokens {calls['completion_tokens']:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first output token")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds per output token (prompt tokens cost a tenth)")
+    parser.add_argument("--invalid", action="store_true", help="combined answer fails validation")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
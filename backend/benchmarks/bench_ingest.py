@@ -0,0 +1,78 @@
+"""
+Benchmark: guide ingestion throughput (windows/sec).
+
+Builds a synthetic corpus by copying `chw_guide.txt` into N documents (each
+with a unique header so every window gets its own id), then times chunking
+with 1 worker vs the process pool. With `--embed`, also runs the full
+`ingest` pipeline into a throwaway ChromaDB directory.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingest --documents 16 --workers 4
+    python -m benchmarks.bench_ingest --documents 4 --embed
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import chroma_generate
+
+
+def make_corpus(directory, documents):
+    guide = Path(chroma_generate.GUIDE_PATH).read_text(encoding="utf-8")
+    for i in range(documents):
+        text = guide.replace("*** CHAPTER", f"*** CHAPTER (county {i})")
+        (Path(directory) / f"county_guide_{i:03d}.txt").write_text(text, encoding="utf-8")
+
+
+def time_chunking(paths, workers):
+    start = time.perf_counter()
+    if workers == 1:
+        results = [chroma_generate.chunk_document(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(chroma_generate.chunk_document, paths))
+    elapsed = time.perf_counter() - start
+    windows = sum(len(ids) for _, ids, _, _ in results)
+    return windows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--embed", action="store_true", help="also embed into a temporary ChromaDB")
+    parser.add_argument("--embed-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "corpus"
+        corpus.mkdir()
+        make_corpus(corpus, args.documents)
+        paths = list(chroma_generate.iter_documents([corpus]))
+
+        windows, serial = time_chunking(paths, 1)
+        _, parallel = time_chunking(paths, args.workers)
+        print(f"Documents: {len(paths)}  Windows: {windows}")
+        print(f"Chunking, 1 worker:   {windows / serial:10.1f} windows/sec ({serial:.2f}s)")
+        print(f"Chunking, {args.workers} workers: {windows / parallel:10.1f} windows/sec ({parallel:.2f}s)")
+
+        if args.embed:
+            import chromadb
+
+            client = chromadb.PersistentClient(path=str(Path(tmp) / "db"))
+            collection = client.get_or_create_collection(name=chroma_generate.COLLECTION_NAME)
+            stats = chroma_generate.ingest(
+                collection, [corpus], workers=args.workers, embed_workers=args.embed_workers
+            )
+            print(f"Ingest (chunk + embed): {stats['windows'] / stats['chunk_embed_seconds']:10.1f} windows/sec")
+
+            start = time.perf_counter()
+            chroma_generate.ingest(collection, [corpus], workers=args.workers)
+            print(f"Re-ingest unchanged:    {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: bare AsyncOpenAI vs `ResilientOpenAI` against a flaky mock OpenAI server.
+
+Starts `benchmarks.mock_openai` in-process and drives the real service
+functions over HTTP: realtime cue classification (`classify_one`) and report
+solutions (`_request_solution`). The "bare" client is the SDK with its
+defaults (2 retries, 10 min timeout), as the backend used it before. The
+"resilient" one is the wrapper over an SDK client with `max_retries=0`.
+
+Scenarios:
+    flaky   --error-rate / --rate-limit-rate / --slow-rate (slow = --slow-seconds)
+    outage  every request fails with HTTP 500, sent one at a time
+
+Reports success rate (no fallback needed) and p50/p95/p99/max latency per
+workload, and for the outage the time each call takes to fall back.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_resilience --realtime 200 --reports 40
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from openai import AsyncOpenAI
+
+from app.services import metrics
+from benchmarks import mock_openai
+from benchmarks.load_concurrent_sessions import _free_port, start_server
+
+STATEMENT = ("Context:\n- How are you getting to your appointments?\n\n"
+             "Current Statement:\nI can't afford the bus fare and my insulin ran out.")
+
+
+class BareClient:
+    """The SDK client as the backend used it before: no call_site, no wrapper."""
+
+    def __init__(self, client):
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    async def _chat(self, call_site=None, timeout_seconds=None, max_retries=None, retry_base_seconds=None, **kwargs):
+        return await self.client.chat.completions.create(**kwargs)
+
+
+def make_client(kind, base_url):
+    from app.services.llm_client import RequestBudget, ResilientOpenAI
+
+    if kind == "bare":
+        return BareClient(AsyncOpenAI(base_url=base_url, api_key="mock"))
+    return ResilientOpenAI(AsyncOpenAI(base_url=base_url, api_key="mock", max_retries=0), budget=RequestBudget())
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    try:
+        await coro
+        ok = True
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def summarize(label, results):
+    latencies = [seconds for _, seconds in results]
+    ok = sum(success for success, _ in results)
+    print(f"  {label:<9} ok {ok:4d}/{len(results):<4d} ({100 * ok / max(1, len(results)):5.1f}%)"
+          f" | p50 {metrics.percentile(latencies, 50):6.2f}s p95 {metrics.percentile(latencies, 95):6.2f}s"
+          f" p99 {metrics.percentile(latencies, 99):6.2f}s max {max(latencies, default=0):6.2f}s")
+
+
+async def flaky(kind, base_url, args):
+    from app.services import rag_service
+    from app.services.cue_batcher import classify_one
+
+    client = make_client(kind, base_url)
+    mock_openai.configure(error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                          slow_rate=args.slow_rate, slow_seconds=args.slow_seconds, hang_rate=0.0)
+    realtime = [timed(classify_one(client, STATEMENT)) for _ in range(args.realtime)]
+    reports = [timed(rag_service._request_solution(client, "I can't afford my insulin.", None))
+               for _ in range(args.reports)]
+    results = await asyncio.gather(*realtime, *reports)
+    print(f"{kind}:")
+    summarize("realtime", results[:args.realtime])
+    summarize("reports", results[args.realtime:])
+
+
+async def outage(kind, base_url, calls):
+    from app.services.cue_batcher import classify_one
+
+    client = make_client(kind, base_url)
+    mock_openai.configure(error_rate=1.0, rate_limit_rate=0.0, slow_rate=0.0)
+    start = time.perf_counter()
+    results = [await timed(classify_one(client, STATEMENT)) for _ in range(calls)]
+    elapsed = time.perf_counter() - start
+    print(f"{kind}: {calls} calls fell back in {elapsed:6.2f}s total")
+    summarize("realtime", results)
+
+
+async def run(args):
+    from app.config.settings import settings
+
+    settings.llm_breaker_reset_seconds = 3600  # stay open for the whole outage run
+    port = _free_port()
+    server, thread = start_server(mock_openai.app, port)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        print(f"== flaky: {args.error_rate:.0%} HTTP 500, {args.rate_limit_rate:.0%} HTTP 429,"
+              f" {args.slow_rate:.0%} slow ({args.slow_seconds:g}s); latency {mock_openai.MOCK_CONFIG['latency']}s")
+        for kind in ("bare", "resilient"):
+            await flaky(kind, base_url, args)
+        print(f"\n== outage: every request fails (HTTP 500)")
+        for kind in ("bare", "resilient"):
+            await outage(kind, base_url, args.outage_calls)
+        snapshot = metrics.snapshot()
+        print("\nresilient client counters:",
+              {name: sum(series.get("value", 0) for series in snapshot[name]["series"])
+               for name in ("llm_retries_total", "llm_hedges_total", "llm_breaker_rejected_total")})
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--realtime", type=int, default=200, help="realtime cue calls in the flaky scenario")
+    parser.add_argument("--reports", type=int, default=40, help="report solution calls in the flaky scenario")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-seconds", type=float, default=15.0)
+    parser.add_argument("--outage-calls", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: one-shot vs map-reduce `analyze_transcript` on long visits.
+
+A synthetic visit transcript (one sentence every ~5 s, alternating CHW and
+Patient) is analyzed by a fake GPT-4o whose latency grows with the number of
+output tokens and whose output is cut off at `--max-output-tokens`, like the
+real model. A cut-off JSON answer cannot be parsed, so the one-shot path
+loses the whole conversation; the map-reduce path keeps every part small.
+
+Reports wall time, turns returned vs sentences spoken and requests made.
+
+Usage (from backend/):
+    python -m benchmarks.bench_long_transcript --minutes 10 30 60
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from app.services import llm_analysis
+from app.services.transcript_chunks import split_sentences
+
+CHW_LINES = [
+    "How have you been managing your medications this month?",
+    "Can you tell me more about what happened at the pharmacy?",
+    "What would make it easier to get to your appointments?",
+]
+PATIENT_LINES = [
+    "Honestly it has been hard because the refills cost more than I can pay.",
+    "They told me my insurance would not cover it anymore so I left without it.",
+    "If I had a ride I could go, but the bus takes almost two hours each way.",
+]
+CHARS_PER_TOKEN = 4
+
+
+def synthetic_transcript(minutes):
+    sentences = []
+    for i in range(int(minutes * 12)):
+        lines = CHW_LINES if i % 2 == 0 else PATIENT_LINES
+        sentences.append(lines[(i // 2) % len(lines)])
+    return " ".join(sentences)
+
+
+def _turns(sentences, offset):
+    return [
+        {"speaker": "CHW" if (offset + i) % 2 == 0 else "Patient", "text": text,
+         "cues": [] if (offset + i) % 2 == 0 else ["Economic Stability"],
+         "is_masked_distress": False, "is_hesitation": False}
+        for i, text in enumerate(sentences)
+    ]
+
+
+class ScribeFake:
+    """Answers the full, part and summary prompts; latency ~ output tokens; output capped."""
+
+    def __init__(self, latency, token_delay, max_output_tokens):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.max_output_chars = max_output_tokens * CHARS_PER_TOKEN
+        self.calls = {"chat": 0, "truncated": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _answer(self, system, user):
+        names = {"chw_name": "Sarah", "patient_name": "Mr. Jones"}
+        if system == llm_analysis.SYSTEM_PROMPT_REDUCE:
+            return {"summary": "Patient reports cost, insurance and transportation barriers to care."}
+        if system == llm_analysis.SYSTEM_PROMPT_CHUNK:
+            body = user.split("CURRENT PART:\n", 1)[1]
+            context = re.search(r"PRECEDING CONTEXT \(do not diarize\):\n(.*?)\n\n", user, re.S)
+            # Speaker parity continues from the preceding context in this synthetic dialogue
+            offset = 0 if not context else (1 if context.group(1).rstrip().endswith("?") else 0)
+            sentences = split_sentences(body)
+            questions = sum(s.endswith("?") for s in sentences)
+            return {"extracted_names": names, "notes": "Discussed medication cost and access.",
+                    "stats": {"open_ended_questions": questions, "closed_ended_questions": 0},
+                    "conversation": _turns(sentences, offset)}
+        sentences = split_sentences(user.split("RAW TRANSCRIPT:\n", 1)[1])
+        return {"extracted_names": names, "summary": "Patient reports barriers to care.",
+                "stats": {"open_ended_questions": sum(s.endswith("?") for s in sentences), "closed_ended_questions": 0},
+                "conversation": _turns(sentences, 0)}
+
+    async def create(self, **kwargs):
+        self.calls["chat"] += 1
+        messages = kwargs["messages"]
+        content = json.dumps(self._answer(messages[0]["content"], messages[-1]["content"]), indent=2)
+        if len(content) > self.max_output_chars:
+            content = content[: self.max_output_chars]  # finish_reason="length"
+            self.calls["truncated"] += 1
+        await asyncio.sleep(self.latency + self.token_delay * len(content) / CHARS_PER_TOKEN)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def measure(label, fake, transcript, long_chars):
+    from app.config.settings import settings
+
+    settings.long_transcript_chars = long_chars
+    start = time.perf_counter()
+    result = await llm_analysis.analyze_transcript(fake, transcript, {"energy_score": 55})
+    elapsed = time.perf_counter() - start
+    return elapsed, len(result.get("conversation") or []), result.get("stats")
+
+
+async def run(args):
+    from app.config.settings import settings
+
+    settings.long_transcript_chunk_chars = args.chunk_chars
+    settings.long_transcript_max_concurrency = args.concurrency
+    for minutes in args.minutes:
+        transcript = synthetic_transcript(minutes)
+        spoken = len(split_sentences(transcript))
+        for label, long_chars in (("one-shot", 0), ("map-reduce", 1)):
+            fake = ScribeFake(args.latency, args.token_delay, args.max_output_tokens)
+            elapsed, turns, stats = await measure(label, fake, transcript, long_chars)
+            print(f"{minutes:4g} min ({len(transcript):6d} chars) {label:<10} | {elapsed:6.2f}s"
+                  f" | turns {turns:4d}/{spoken} | requests {fake.calls['chat']:2d}"
+                  f" (truncated {fake.calls['truncated']}) | stats {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first output token")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="seconds per output token")
+    parser.add_argument("--max-output-tokens", type=int, default=16384)
+    parser.add_argument("--chunk-chars", type=int, default=6000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: PDF report rendering for /generate-report, on the event loop vs in the render pool.
+
+For each transcript size (--turns, default 10, 100 and 1000 turns), fires
+--reports renders, --concurrency at a time. All reports arrive at once. Prints reports/sec,
+p50/p95 latency from arrival (queueing included), and the worst event-loop
+stall seen by a 5 ms ticker:
+
+    inline  the old path: render on the event loop, write
+            generated_reports/report_<seconds>.pdf, read it back
+    pool    `submit_report_render` in `report_jobs` (--workers processes),
+            bytes returned to the handler, nothing written to disk
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_render --reports 40 --concurrency 8 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.config.settings import settings
+from app.services import metrics, report_jobs
+from app.services.pdf_service import render_pdf_report
+from benchmarks.bench_stream_analysis import analysis_payload
+
+SOLUTION = ("Connect the patient with the prescription assistance program and confirm a "
+            "follow-up call within one week. (AI-generated suggestion; not medical advice.)")
+
+
+def report_input(turns):
+    data = analysis_payload(turns)
+    data["metadata"] = {"session_id": f"SESS-{turns:06d}", "date": "2026-01-01", "patient_name": "Mr. Jones",
+                        "chw_name": "Sarah", "start_time": "09:00", "end_time": "09:30"}
+    flagged = [turn for turn in data["conversation"] if turn["cues"]][:20]
+    return data, [{"cues": turn["cues"], "text": turn["text"], "solution": SOLUTION} for turn in flagged]
+
+
+def render_inline(out_dir, data, solved_problems):
+    # What /generate-report did before: render, write to disk, FileResponse reads it back
+    path = os.path.join(out_dir, f"report_{int(time.time())}.pdf")
+    with open(path, "wb") as f:
+        f.write(render_pdf_report(data, solved_problems))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def ticker(stalls, stop):
+    interval = 0.005
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def run_mode(mode, turns, args, out_dir):
+    data, solved_problems = report_input(turns)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, stalls, stop = [], [], asyncio.Event()
+
+    async def one():
+        async with semaphore:
+            if mode == "inline":
+                pdf_bytes = render_inline(out_dir, data, solved_problems)
+            else:
+                pdf_bytes = await report_jobs.submit_report_render(data, solved_problems)
+            latencies.append(time.perf_counter() - start)
+            return len(pdf_bytes)
+
+    tick = asyncio.create_task(ticker(stalls, stop))
+    start = time.perf_counter()  # every report arrives at once; latency includes queueing
+    sizes = await asyncio.gather(*(one() for _ in range(args.reports)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    print(f"  {mode:<7} {args.reports / elapsed:8.1f} reports/s | p50 {metrics.percentile(latencies, 50) * 1000:7.1f} ms"
+          f" p95 {metrics.percentile(latencies, 95) * 1000:7.1f} ms | max loop stall {max(stalls, default=0) * 1000:6.1f} ms"
+          f" | {sizes[0] / 1024:.0f} KB")
+
+
+async def run(args):
+    settings.report_pool_workers = args.workers
+    settings.report_pool_max_pending = args.reports
+    settings.report_store_dir = ""
+    report_jobs.start_report_pool()
+    # Wait for the workers to start and warm up
+    await asyncio.gather(*(report_jobs.submit_report_render(*report_input(1)) for _ in range(args.workers)))
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            for turns in args.turns:
+                print(f"== {turns} turns, {args.reports} reports, {args.concurrency} concurrent, {args.workers} workers")
+                for mode in ("inline", "pool"):
+                    await run_mode(mode, turns, args, out_dir)
+    finally:
+        report_jobs.shutdown_report_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--reports", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
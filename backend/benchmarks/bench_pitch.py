@@ -0,0 +1,79 @@
+"""
+Benchmark: YIN pitch backend vs librosa.pyin.
+
+Runs both backends on the same recordings and reports runtime, speedup and
+how closely the voiced-F0 standard deviation (the only pitch statistic the
+analysis uses) agrees. Without arguments a synthetic 60 s "voice" is used:
+a harmonic tone with slow pitch movement, pauses and background noise.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pitch
+    python -m benchmarks.bench_pitch recorded_sessions/*.webm
+"""
+import argparse
+import time
+
+import librosa
+import numpy as np
+
+from app.services.pitch import estimate_f0
+
+
+def synthetic_voice(seconds=60, sr=48000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 170 + 35 * np.sin(2 * np.pi * 0.3 * t) + 10 * np.sin(2 * np.pi * 2.1 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum((0.4 / k) * np.sin(k * phase) for k in range(1, 8))
+    # 1 s pause every 4 s, like turn-taking
+    y[(t % 4) > 3] = 0
+    y = y + 0.003 * rng.standard_normal(len(y))
+    true_std = float(np.std(f0[(t % 4) <= 3]))
+    return y.astype(np.float32), sr, true_std
+
+
+def voiced_std(f0):
+    valid = f0[~np.isnan(f0)]
+    return float(np.std(valid)) if len(valid) else 0.0, len(valid)
+
+
+def compare(label, y, sr, skip_pyin=False):
+    start = time.perf_counter()
+    yin_std, yin_voiced = voiced_std(estimate_f0(y, sr, backend="yin", vad=True))
+    yin_time = time.perf_counter() - start
+
+    line = f"{label:<32} {len(y) / sr:7.1f}s audio | yin {yin_time:7.3f}s std {yin_std:6.2f} Hz ({yin_voiced} voiced)"
+    if not skip_pyin:
+        start = time.perf_counter()
+        pyin_std, pyin_voiced = voiced_std(estimate_f0(y, sr, backend="pyin"))
+        pyin_time = time.perf_counter() - start
+        delta = abs(yin_std - pyin_std) / pyin_std * 100 if pyin_std else float("nan")
+        line += (f" | pyin {pyin_time:7.3f}s std {pyin_std:6.2f} Hz ({pyin_voiced} voiced)"
+                 f" | speedup x{pyin_time / yin_time:.0f}, std diff {delta:.1f}%")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="recordings to analyze (default: synthetic voice)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic recording")
+    parser.add_argument("--skip-pyin", action="store_true", help="only time the yin backend")
+    args = parser.parse_args()
+
+    # Warm up lazy imports (resampler, numba) so they don't count against either backend
+    warm_y, warm_sr, _ = synthetic_voice(1.0)
+    estimate_f0(warm_y, warm_sr, backend="yin")
+    if not args.skip_pyin:
+        estimate_f0(warm_y, warm_sr, backend="pyin")
+
+    if not args.files:
+        y, sr, true_std = synthetic_voice(args.seconds)
+        print(f"Synthetic voice: true F0 std {true_std:.2f} Hz")
+        compare("synthetic voice", y, sr, args.skip_pyin)
+    for path in args.files:
+        y, sr = librosa.load(path, sr=None)
+        compare(path, y, sr, args.skip_pyin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Benchmark: prompt size, cacheable prefix and token cost per LLM call site.
+
+Part 1 builds one representative request per prompt in the registry
+(`app/services/prompts.py`), using the same `Prompt.messages()` layout the
+backend sends. It reports static (system) and variable tokens, how many
+prompt tokens OpenAI's prefix cache can serve (prefixes of at least 1024
+tokens), and the input cost of a cold and a warm call. The numbers are
+compared with `benchmarks/data/prompt_baseline.json`. A prompt edit that
+grows a request or shrinks its cacheable prefix beyond `--tolerance` is
+flagged, and the exit status is 1.
+
+Part 2 runs `--sessions` simulated visits concurrently through the real
+service functions against the fake client. Each visit runs the upload
+analysis with its form, report solutions and live cues. It prints the
+`/metrics/llm` report, tokens and cost per call site and per session.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompts
+    python -m benchmarks.bench_prompts --write-baseline   # after an intended prompt change
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from app.services import llm_usage, prompts
+from benchmarks.bench_form_extraction import FORM
+from benchmarks.bench_long_transcript import synthetic_transcript
+from benchmarks.bench_stream_analysis import analysis_payload
+from benchmarks.fakes import CHARS_PER_TOKEN, FakeAsyncOpenAI, cacheable_tokens
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "data", "prompt_baseline.json")
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+    TOKENIZER = "tiktoken o200k_base"
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except Exception:
+    TOKENIZER = f"~{CHARS_PER_TOKEN} chars/token"
+
+    def count_tokens(text):
+        return len(text) // CHARS_PER_TOKEN
+
+
+GUIDE_EXCERPTS = "\n\n".join(
+    f"[Chapter {chapter}] " + "Help the patient find local resources such as prescription assistance, "
+    "sliding-scale clinics and transportation vouchers, and confirm a follow-up date. " * 3
+    for chapter in (2, 5, 7)
+)
+STATEMENT = ("Context:\n- How are you getting to your appointments?\n- Do you have someone to help?\n\n"
+             "Current Statement:\nI missed the last two because the bus stopped running near my place.")
+
+
+def representative_sections(minutes):
+    """One typical user input per call site, laid out as the services send it."""
+    from app.services.llm_analysis import _biometric_context
+
+    transcript = synthetic_transcript(minutes)
+    biometrics = _biometric_context({"energy_score": 55})
+    part = transcript[:6000]
+    return {
+        "analysis": (biometrics, f"RAW TRANSCRIPT:\n{transcript}"),
+        "analysis_with_form": (biometrics, f"RAW TRANSCRIPT:\n{transcript}"),
+        "analysis_part": (biometrics, "PART 2 OF 3", f"PRECEDING CONTEXT (do not diarize):\n{part[-200:]}",
+                          f"CURRENT PART:\n{part}"),
+        "analysis_summary": (biometrics, "NOTES BY PART:\n" + "\n".join(
+            f"{i}. Patient reports medication cost and transport barriers." for i in range(1, 4))),
+        "form": (f"TRANSCRIPT:\n{transcript}",),
+        "report_solution": (f"CHW GUIDE EXCERPTS:\n{GUIDE_EXCERPTS}",
+                            "PATIENT COMPLAINT:\nI can't afford my insulin this month."),
+        "realtime_cues": (STATEMENT,),
+        "realtime_cues_batch": ("\n\n".join(f"### Item {i}\n{STATEMENT}" for i in range(1, 9)),),
+    }
+
+
+def measure_prompts(minutes):
+    rows = {}
+    for call_site, sections in representative_sections(minutes).items():
+        prompt = prompts.PROMPTS[call_site]
+        system, user = prompt.messages(*sections)
+        static = count_tokens(system["content"])
+        variable = count_tokens(user["content"])
+        cached = cacheable_tokens(static)
+        rows[call_site] = {
+            "version": prompt.version,
+            "model": prompt.model,
+            "static_tokens": static,
+            "input_tokens": static + variable,
+            "cacheable_tokens": cached,
+            "cold_input_usd": llm_usage.estimate_cost(prompt.model, static + variable, 0, 0),
+            "warm_input_usd": llm_usage.estimate_cost(prompt.model, static + variable, 0, cached),
+        }
+    return rows
+
+
+def compare(rows, baseline, tolerance):
+    regressions = []
+    for call_site, row in rows.items():
+        before = baseline.get(call_site)
+        if before is None:
+            continue
+        for key in ("static_tokens", "input_tokens"):
+            if row[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{call_site}: {key} {before[key]} -> {row[key]}")
+        if row["cacheable_tokens"] < before["cacheable_tokens"]:
+            regressions.append(f"{call_site}: cacheable_tokens {before['cacheable_tokens']} -> {row['cacheable_tokens']}")
+    return regressions
+
+
+def print_prompts(rows, baseline):
+    print(f"Prompt layout ({TOKENIZER}):")
+    print(f"{'call site':<20} {'version':<13} {'static':>7} {'input':>7} {'cacheable':>9}"
+          f" {'cold $':>9} {'warm $':>9}  vs baseline")
+    for call_site, row in rows.items():
+        before = baseline.get(call_site)
+        if before is None:
+            delta = "new"
+        elif before["version"] == row["version"]:
+            delta = "unchanged"
+        else:
+            delta = f"edited, input {row['input_tokens'] - before['input_tokens']:+d} tokens"
+        print(f"{call_site:<20} {row['version']:<13} {row['static_tokens']:7d} {row['input_tokens']:7d}"
+              f" {row['cacheable_tokens']:9d} {row['cold_input_usd']:9.5f} {row['warm_input_usd']:9.5f}  {delta}")
+
+
+def _fake_answer(kwargs):
+    system = kwargs["messages"][0]["content"]
+    analysis = analysis_payload(12)
+    if system == prompts.SYSTEM_PROMPT_COMBINED:
+        return {"analysis": analysis, "encounter_form": FORM}
+    if system == prompts.SYSTEM_PROMPT_FORM:
+        return FORM
+    if system == prompts.REALTIME_BATCH_SYSTEM_PROMPT:
+        items = kwargs["messages"][1]["content"].count("### Item ")
+        return {"results": [{"id": i, "detected_cues": []} for i in range(1, items + 1)]}
+    if system == prompts.REALTIME_SYSTEM_PROMPT:
+        return {"detected_cues": []}
+    return analysis
+
+
+async def simulate_visit(fake, session_id, transcript):
+    from app.services import rag_service
+    from app.services.cue_batcher import cue_batcher
+    from app.services.llm_analysis import analyze_transcript_with_form
+
+    llm_usage.current_session.set(session_id)
+    # Live cues while recording (batched across the concurrent visits)
+    await asyncio.gather(*(cue_batcher.classify(fake, STATEMENT) for _ in range(6)))
+    # Upload: analysis + encounter form
+    analysis, _ = await analyze_transcript_with_form(fake, transcript, {"energy_score": 55})
+    # "Generate Report": one solution per flagged patient turn
+    flagged = [turn["text"] for turn in analysis["conversation"] if turn["speaker"] == "Patient" and turn["cues"]]
+    await asyncio.gather(*(rag_service._request_solution(fake, text, None) for text in flagged[:3]))
+
+
+async def simulate(sessions, minutes):
+    from app.config.settings import settings
+
+    settings.long_transcript_chars = 0
+    llm_usage.reset()
+    fake = FakeAsyncOpenAI(latency=0.05, chat_payload=_fake_answer)
+    transcript = synthetic_transcript(minutes)
+    await asyncio.gather(*(simulate_visit(fake, f"SESS-{i:06d}", transcript) for i in range(sessions)))
+    return llm_usage.report(sessions)
+
+
+def print_report(report, sessions):
+    print(f"\n{sessions} simulated visits through the services (fake client, {CHARS_PER_TOKEN} chars/token):")
+    print(f"{'call site':<20} {'calls':>6} {'prompt':>9} {'cached':>8} {'completion':>10} {'cost $':>9} {'p95 s':>7}")
+    for call_site, site in sorted(report["call_sites"].items()):
+        print(f"{call_site:<20} {site['calls']:6g} {site['prompt_tokens']:9g} {site['cached_tokens']:8g}"
+              f" {site['completion_tokens']:10g} {site['cost_usd']:9.4f} {site['p95_seconds']:7.3f}")
+    totals = report["totals"]
+    print(f"{'total':<20} {totals['calls']:6g} {totals['prompt_tokens']:9g} {totals['cached_tokens']:8g}"
+          f" {totals['completion_tokens']:10g} {totals['cost_usd']:9.4f}")
+    if report["sessions"]:
+        entries = [entry["totals"] for entry in report["sessions"]]
+        print(f"per session (avg): {sum(e['calls'] for e in entries) / len(entries):.2f} calls,"
+              f" {sum(e['prompt_tokens'] for e in entries) / len(entries):.0f} prompt tokens,"
+              f" ${sum(e['cost_usd'] for e in entries) / len(entries):.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10, help="length of the representative visit")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated visits (0 skips part 2)")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed token growth before flagging")
+    parser.add_argument("--write-baseline", action="store_true", help=f"save the results to {BASELINE_PATH}")
+    args = parser.parse_args()
+
+    rows = measure_prompts(args.minutes)
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            saved = json.load(f)
+        if saved.get("tokenizer") != TOKENIZER or saved.get("minutes") != args.minutes:
+            print(f"⚠️ Baseline used {saved.get('tokenizer')} / {saved.get('minutes')} min; comparison is approximate.")
+        baseline = saved.get("call_sites", {})
+    print_prompts(rows, baseline)
+
+    if args.sessions > 0:
+        print_report(asyncio.run(simulate(args.sessions, args.minutes)), args.sessions)
+
+    if args.write_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"tokenizer": TOKENIZER, "minutes": args.minutes, "call_sites": rows}, f, indent=2)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return
+
+    regressions = compare(rows, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Prompt regressions vs baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
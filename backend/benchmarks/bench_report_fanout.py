@@ -0,0 +1,63 @@
+"""
+Benchmark: RAG solution fan-out for /generate-report.
+
+Compares resolving N flagged turns one at a time (the old loop) with
+`get_solutions_for_turns` at the configured concurrency limit, then repeats
+the concurrent run with the solution cache enabled (cold, then warm).
+
+Usage (from backend/):
+    python -m benchmarks.bench_report_fanout --turns 12 --latency 1.0
+"""
+import argparse
+import asyncio
+import time
+
+from app.config.settings import settings
+from app.services import rag_service
+from app.services.rag_service import get_solution_from_context, get_solutions_for_turns
+from app.services.solution_cache import SemanticCache
+from benchmarks.fakes import FakeAsyncOpenAI
+
+
+async def run(args):
+    client = FakeAsyncOpenAI(latency=args.latency)
+    texts = [f"Flagged patient statement #{i}" for i in range(args.turns)]
+
+    settings.solution_cache_enabled = False
+    start = time.perf_counter()
+    for text in texts:
+        await get_solution_from_context(client, text)
+    sequential = time.perf_counter() - start
+
+    settings.rag_max_concurrency = args.concurrency
+    start = time.perf_counter()
+    solutions = await get_solutions_for_turns(client, texts)
+    concurrent = time.perf_counter() - start
+    assert len(solutions) == len(texts)
+
+    # In-memory cache, exact matches only (no embedding model needed)
+    settings.solution_cache_enabled = True
+    rag_service.solution_cache = SemanticCache()
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        await get_solutions_for_turns(client, texts)
+        timings.append(time.perf_counter() - start)
+
+    print(f"Turns: {args.turns}  Latency/call: {args.latency:.2f}s  Concurrency: {args.concurrency}")
+    print(f"Sequential:              {sequential:8.3f}s")
+    print(f"Concurrent:              {concurrent:8.3f}s  (x{sequential / concurrent:.1f})")
+    print(f"Concurrent, cold cache:  {timings[0]:8.3f}s")
+    print(f"Concurrent, warm cache:  {timings[1]:8.3f}s  {rag_service.solution_cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=settings.rag_max_concurrency)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark: session store (SQLite, WAL, batched writes) vs loose JSON files.
+
+First compares writer throughput with one transaction per session and with
+group commit, on --write-sample pre-built sessions. Then writes --sessions
+synthetic analysed visits (one year of dates, --patients patients, --chws
+CHWs, SDOH cues on ~30% of patient turns) and times the dashboard queries:
+
+    patient        every visit of one patient (first page)
+    chw+month      one CHW's visits in one month
+    cue+range      visits flagged with one cue in a two-week range
+    page 200       the 200th page of 50 of all sessions (cursor walk)
+    get            one session with its analysis, form and reports
+
+The baseline is what answering "all visits for patient X this month"
+costs today: open and parse every JSON file. It is measured on
+--json-files files and scaled linearly to --sessions.
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_store --sessions 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.session_store import SessionStore
+
+CUES = ["Economic Stability", "Education", "Health Care", "Environment", "Social Context"]
+
+
+def visit(i, turns, patients, chws, rng):
+    conversation = []
+    for t in range(turns):
+        if t % 2 == 0:
+            conversation.append({"speaker": "CHW", "text": "How have things been since we last spoke?", "cues": []})
+        else:
+            cues = [rng.choice(CUES)] if rng.random() < 0.3 else []
+            conversation.append({"speaker": "Patient", "text": "It has been a hard month with the bills.",
+                                 "cues": cues, "is_masked_distress": rng.random() < 0.02})
+    day = rng.randrange(365)
+    return {
+        "metadata": {"session_id": f"SESS-{i:07d}", "date": time.strftime("%Y-%m-%d", time.gmtime(1767225600 + day * 86400)),
+                     "start_time": "09:00 AM", "end_time": "09:30 AM",
+                     "patient_name": f"Patient {rng.randrange(patients)}", "chw_name": f"CHW {rng.randrange(chws)}"},
+        "audio_stats": {"duration_seconds": 1800}, "summary": "Follow-up visit about housing and bills.",
+        "stats": {"open_ended_questions": turns // 2, "closed_ended_questions": 0},
+        "conversation": conversation,
+    }
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def json_scan(json_dir, patient, month):
+    hits = []
+    for name in os.listdir(json_dir):
+        with open(os.path.join(json_dir, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        meta = data["metadata"]
+        if meta["patient_name"] == patient and meta["date"].startswith(month):
+            hits.append(meta["session_id"])
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=16)
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--chws", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=200, help="timed runs per query")
+    parser.add_argument("--json-files", type=int, default=5000, help="baseline sample size")
+    parser.add_argument("--write-sample", type=int, default=20000, help="sessions for the write throughput test")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Writer throughput on the same pre-built sessions: one transaction each vs group commit
+        sample = [visit(i, args.turns, args.patients, args.chws, rng) for i in range(args.write_sample)]
+        rates = {}
+        for batch_size in (1, 256):
+            probe = SessionStore(os.path.join(tmp, f"probe-{batch_size}.db"), batch_size=batch_size).open()
+            start = time.perf_counter()
+            for data in sample:
+                probe.save_session(data["metadata"]["session_id"], data)
+            probe.flush()
+            rates[batch_size] = len(sample) / (time.perf_counter() - start)
+            probe.close()
+        del sample
+
+        store = SessionStore(os.path.join(tmp, "sessions.db"), batch_size=256).open()
+        start = time.perf_counter()
+        for i in range(args.sessions):
+            data = visit(i, args.turns, args.patients, args.chws, rng)
+            store.save_session(data["metadata"]["session_id"], data, upload_digest=f"{i:064x}")
+            if i % 10 == 0:
+                store.save_form(data["metadata"]["session_id"], {"patientName": data["metadata"]["patient_name"],
+                                                                 "dateOfVisit": data["metadata"]["date"]})
+        store.flush()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(store.path) + os.path.getsize(store.path + "-wal")
+        print(f"== {args.sessions} sessions x {args.turns} turns, {args.patients} patients, {args.chws} CHWs")
+        print(f"  write    one commit each {rates[1]:6.0f} sessions/s | batched {rates[256]:6.0f} sessions/s"
+              f" ({args.write_sample} sessions)")
+        print(f"  fill     {args.sessions / elapsed:6.0f} sessions/s incl. generating them | {size / 1e6:.0f} MB on disk")
+
+        def month_query(chw, month):
+            return store.query_sessions(chw=chw, date_from=f"2026-{month:02d}-01", date_to=f"2026-{month:02d}-31")
+
+        def walk(pages):
+            cursor = None
+            for _ in range(pages):
+                cursor = store.query_sessions(limit=50, cursor=cursor)["next_cursor"]
+
+        queries = [
+            ("patient", lambda: store.query_sessions(patient=f"patient {rng.randrange(args.patients)}")),
+            ("chw+month", lambda: month_query(f"CHW {rng.randrange(args.chws)}", rng.randrange(1, 13))),
+            ("cue+range", lambda: store.query_sessions(cue=rng.choice(CUES), date_from="2026-03-01",
+                                                       date_to="2026-03-14")),
+            ("get", lambda: store.get_session(f"SESS-{rng.randrange(args.sessions):07d}")),
+        ]
+        for label, query in queries:
+            p50, p95 = timed(query, args.runs)
+            print(f"  {label:<10} p50 {p50 * 1e3:7.2f} ms  p95 {p95 * 1e3:7.2f} ms")
+        cursor = None
+        for _ in range(199):
+            cursor = store.query_sessions(limit=50, cursor=cursor)["next_cursor"]
+        p50, p95 = timed(lambda: store.query_sessions(limit=50, cursor=cursor), args.runs)
+        print(f"  {'page 200':<10} p50 {p50 * 1e3:7.2f} ms  p95 {p95 * 1e3:7.2f} ms"
+              f" (walking all 200 pages: {timed(lambda: walk(200), 3)[0] * 1e3:.0f} ms)")
+        store.close()
+
+        json_dir = os.path.join(tmp, "json")
+        os.makedirs(json_dir)
+        for i in range(args.json_files):
+            with open(os.path.join(json_dir, f"SESS-{i:07d}.json"), "w", encoding="utf-8") as f:
+                json.dump(visit(i, args.turns, args.patients, args.chws, rng), f, indent=2)
+        scan = timed(lambda: json_scan(json_dir, "Patient 1", "2026-03"), 5)[0]
+        print(f"  JSON scan  {scan * 1e3:7.0f} ms for {args.json_files} files"
+              f" -> ~{scan * args.sessions / args.json_files:.1f} s at {args.sessions} sessions")
+
+
+if __name__ == "__main__":
+    main()
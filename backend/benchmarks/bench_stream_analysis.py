@@ -0,0 +1,115 @@
+"""
+Benchmark: time-to-first-turn, /upload-full-audio vs /upload-full-audio/stream.
+
+Uploads a synthetic recording to a local server whose OpenAI client is a fake
+that "generates" the analysis JSON at `--token-delay` seconds per token (and
+streams it token by token when asked). The blocking endpoint shows nothing
+until the whole analysis is written; the SSE endpoint is timed per event:
+audio stats, summary, first turn and final payload.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_analysis --turns 60 --token-delay 0.01
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+
+import httpx
+import soundfile as sf
+
+from benchmarks.bench_pitch import synthetic_voice
+from benchmarks.fakes import FakeAsyncOpenAI
+from benchmarks.load_concurrent_sessions import _free_port, start_server
+
+
+def analysis_payload(turns):
+    conversation = []
+    for i in range(turns):
+        speaker = "CHW" if i % 2 == 0 else "Patient"
+        text = ("How have things been with your medication since we last spoke?" if speaker == "CHW"
+                else "Honestly it has been hard, I can't always afford the refills on time.")
+        conversation.append({"speaker": speaker, "text": text, "cues": [] if speaker == "CHW" else ["Economic Stability"],
+                             "is_masked_distress": False, "is_hesitation": False})
+    return {
+        "extracted_names": {"chw_name": "Sarah", "patient_name": "Mr. Jones"},
+        "summary": "Patient reports recurring difficulty affording medication refills.",
+        "stats": {"open_ended_questions": turns // 2, "closed_ended_questions": 0},
+        "conversation": conversation,
+    }
+
+
+def wav_upload(seconds):
+    y, sr, _ = synthetic_voice(seconds, sr=16000)
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+async def blocking(http, audio):
+    start = time.perf_counter()
+    response = await http.post("/upload-full-audio", files={"file": ("session_1700000000000.wav", audio)})
+    response.raise_for_status()
+    return {"final": time.perf_counter() - start}
+
+
+async def streaming(http, audio):
+    marks = {}
+    start = time.perf_counter()
+    event = None
+    async with http.stream("POST", "/upload-full-audio/stream",
+                           files={"file": ("session_1700000000000.wav", audio)}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                name = "first_turn" if event == "turn" else event
+                marks.setdefault(name, time.perf_counter() - start)
+                if event == "error":
+                    raise RuntimeError(json.loads(line[6:]))
+    return marks
+
+
+async def run(args):
+    from app.config.settings import settings
+    from app.main import app
+    from app.routes import stream
+
+    settings.upload_cache_enabled = False  # time the full pipeline every run
+    fake = FakeAsyncOpenAI(latency=0, chat_payload=analysis_payload(args.turns))
+    stream.client = fake
+    audio = wav_upload(args.seconds)
+
+    port = _free_port()
+    server, thread = start_server(app, port)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as http:
+            await blocking(http, audio)  # warm the audio workers (instant fake)
+            fake.latency, fake.token_delay = args.latency, args.token_delay
+            plain = await blocking(http, audio)
+            sse = await streaming(http, audio)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"{args.turns} turns, fake latency {args.latency}s + {args.token_delay * 1000:g} ms/token")
+    print(f"/upload-full-audio         first turn {plain['final']:6.2f}s  (everything arrives at once)")
+    print(f"/upload-full-audio/stream  audio_stats {sse.get('audio_stats', float('nan')):6.2f}s"
+          f"  summary {sse.get('summary', float('nan')):6.2f}s"
+          f"  first turn {sse.get('first_turn', float('nan')):6.2f}s"
+          f"  final {sse.get('final', float('nan')):6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--seconds", type=float, default=30.0, help="length of the synthetic recording")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the fake starts answering")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per generated token")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
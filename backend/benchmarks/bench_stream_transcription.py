@@ -0,0 +1,133 @@
+"""
+Benchmark: /ws/audio per-blob transcription vs VAD utterance segmentation.
+
+Plays a synthetic conversation (3 s of speech, 1 s pause, repeated) to the
+WebSocket as 3 s WAV blobs (`--blob-seconds`), paced like the browser (sped up by `--speed`),
+once with STREAM_SEGMENTATION=blob (the old one-Whisper-call-per-blob path)
+and once with vad. OpenAI is replaced by a fake with `--latency` per call.
+
+Reports API calls per minute of audio and cue latency: the time from the
+end of each spoken utterance (as captured by the "microphone") to the first
+cue that arrives after it, plus how many transcripts the /ws/audio pipeline
+coalesced or dropped (raise `--latency` above the blob length to see the
+classifier fall behind) and whether cue `seq` numbers arrived in order. With VAD segmentation an utterance can only end
+once a blob carrying its trailing silence arrives, so latency is bounded by
+the blob length; fewer, complete utterances are sent instead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_transcription --seconds 60
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+
+import numpy as np
+import soundfile as sf
+import websockets
+
+from benchmarks.bench_pitch import synthetic_voice
+from benchmarks.fakes import FakeAsyncOpenAI
+from benchmarks.load_concurrent_sessions import _free_port, start_server
+
+SR = 16000
+
+
+def make_blobs(seconds, blob_seconds=3):
+    y, sr, _ = synthetic_voice(seconds, sr=SR)
+    blobs = []
+    for start in range(0, len(y), blob_seconds * sr):
+        buf = io.BytesIO()
+        sf.write(buf, y[start:start + blob_seconds * sr], sr, format="WAV", subtype="PCM_16")
+        blobs.append(buf.getvalue())
+    # synthetic_voice speaks for 3 s out of every 4 s
+    speech_ends = [t + 3.0 for t in np.arange(0, seconds, 4.0)]
+    return blobs, speech_ends
+
+
+async def play(port, blobs, blob_seconds, speed, drain_seconds):
+    """Send blobs in (scaled) real time; return the wall-clock arrival of every cue."""
+    arrivals = []
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio") as ws:
+        async def receive():
+            async for message in ws:
+                arrivals.append((time.perf_counter(), json.loads(message).get("seq")))
+
+        reader = asyncio.create_task(receive())
+        start = time.perf_counter()
+        for i, blob in enumerate(blobs):
+            # The recorder hands over a blob once its slice has been captured
+            await asyncio.sleep(max(0.0, start + (i + 1) * blob_seconds / speed - time.perf_counter()))
+            await ws.send(blob)
+        await asyncio.sleep(drain_seconds)
+        reader.cancel()
+    return start, arrivals
+
+
+def cue_latencies(start, arrivals, speech_ends, speed):
+    latencies = []
+    for end in speech_ends:
+        spoken_at = start + end / speed
+        later = [a for a, _ in arrivals if a >= spoken_at]
+        if later:
+            latencies.append(later[0] - spoken_at)
+    return latencies
+
+
+def _delta(before, after, name):
+    total = lambda snap: sum(series["value"] for series in snap.get(name, {}).get("series", []))
+    return total(after) - total(before)
+
+
+async def run(args):
+    from app.config.settings import settings
+    from app.main import app
+    from app.routes import stream
+    from app.services import metrics
+
+    blobs, speech_ends = make_blobs(args.seconds, args.blob_seconds)
+    port = _free_port()
+    server, thread = start_server(app, port)
+    settings.stream_transcription_backend = "openai"
+
+    try:
+        for mode in ("blob", "vad"):
+            fake = FakeAsyncOpenAI(latency=args.latency)
+            stream.client = fake
+            settings.stream_segmentation = mode
+
+            before = metrics.snapshot()
+            start, arrivals = await play(port, blobs, args.blob_seconds, args.speed, args.drain)
+            after = metrics.snapshot()
+            seqs = [seq for _, seq in arrivals]
+            latencies = cue_latencies(start, arrivals, speech_ends, args.speed)
+            minutes = args.seconds / 60
+            p50 = np.percentile(latencies, 50) if latencies else float("nan")
+            p95 = np.percentile(latencies, 95) if latencies else float("nan")
+            print(
+                f"{mode:<5} | whisper {fake.calls['transcriptions'] / minutes:6.1f}/min"
+                f"  chat {fake.calls['chat'] / minutes:6.1f}/min"
+                f" | cues {len(arrivals):3d} | cue latency p50 {p50:5.2f}s p95 {p95:5.2f}s"
+                f" (wall, audio x{args.speed:g})"
+                f" | coalesced {_delta(before, after, 'ws_coalesced_total'):g}"
+                f" dropped {_delta(before, after, 'ws_dropped_total'):g}"
+                f" | seq ordered {seqs == sorted(seqs)}"
+            )
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60, help="length of the synthetic conversation")
+    parser.add_argument("--blob-seconds", type=int, default=3, help="slice length sent by the recorder")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed-up over real time")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake OpenAI call")
+    parser.add_argument("--drain", type=float, default=3.0, help="seconds to wait for late cues")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
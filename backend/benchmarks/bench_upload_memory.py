@@ -0,0 +1,156 @@
+"""
+Benchmark: peak RSS while persisting a large upload.
+
+Writes a synthetic recording of `--size-mb` MB, then saves it through
+`save_upload_stream` (chunked copy + hash) and, for comparison, through the
+old whole-file `await file.read()` path. Each run reports two peaks:
+Python allocations (tracemalloc, works everywhere) and RSS growth from
+/proc/self/status (VmHWM, reset between runs where the kernel allows it).
+
+Exits with status 1 if:
+    - either streaming peak exceeds `--budget-mb`
+    - the saved file's size or sha256 differs from the source
+    - the read-all run does not show the whole upload in memory (the
+      measurement would then be blind, so a pass would mean nothing)
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_memory --size-mb 300
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from starlette.datastructures import UploadFile
+
+from app.services.uploads import save_upload_stream
+
+
+def _status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return None
+
+
+def current_rss_mb():
+    kb = _status_kb("VmRSS")
+    return kb / 1024 if kb is not None else 0.0
+
+
+def peak_rss_mb():
+    kb = _status_kb("VmHWM")
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def make_recording(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+async def save_naive(upload, destination):
+    contents = await upload.read()
+    digest = hashlib.sha256(contents).hexdigest()
+    with open(destination, "wb") as f:
+        f.write(contents)
+    return digest, len(contents)
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def measure(label, saver, source, destination, rss_reset):
+    """Returns (digest, size, traced peak MB, RSS growth MB or None if VmHWM can't be reset)."""
+    reset_peak_rss()
+    baseline = current_rss_mb()
+    tracemalloc.start()
+    try:
+        with open(source, "rb") as f:
+            upload = UploadFile(file=f, filename=os.path.basename(source))
+            start = time.perf_counter()
+            digest, size = await saver(upload, destination)
+            elapsed = time.perf_counter() - start
+        traced = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+    growth = peak_rss_mb() - baseline if rss_reset else None
+    rss = f"{growth:8.1f} MB" if growth is not None else "     n/a"
+    print(f"{label:<10} {size / 1e6:8.1f} MB in {elapsed:6.2f}s  peak traced {traced:8.1f} MB"
+          f"  RSS growth {rss}  sha256 {digest[:12]}")
+    return digest, size, traced, growth
+
+
+async def run(args):
+    rss_reset = reset_peak_rss()
+    if not rss_reset:
+        print("(VmHWM reset unsupported here; checking the traced peak only)")
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "session_synthetic.webm")
+        make_recording(source, args.size_mb)
+        expected = (file_sha256(source), os.path.getsize(source))
+
+        destination = os.path.join(tmp, "recorded_sessions", "streamed.webm")
+        digest, size, traced, growth = await measure(
+            "streaming",
+            lambda upload, dest: save_upload_stream(upload, dest, chunk_size=args.chunk_kb * 1024),
+            source, destination, rss_reset,
+        )
+        if (digest, size) != expected or (file_sha256(destination), os.path.getsize(destination)) != expected:
+            failures.append("saved file or reported digest/size differs from the source")
+        if traced > args.budget_mb:
+            failures.append(f"streaming upload allocated {traced:.1f} MB (budget {args.budget_mb} MB)")
+        if growth is not None and growth > args.budget_mb:
+            failures.append(f"streaming upload grew RSS by {growth:.1f} MB (budget {args.budget_mb} MB)")
+
+        if not args.skip_naive:
+            os.remove(destination)
+            _, _, naive_traced, _ = await measure("read-all", save_naive, source,
+                                                  os.path.join(tmp, "naive.webm"), rss_reset)
+            if naive_traced < args.size_mb / 2:
+                failures.append(f"read-all peaked at only {naive_traced:.1f} MB: the measurement can't see the upload")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: a {args.size_mb} MB upload stayed within {args.budget_mb} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--budget-mb", type=float, default=32.0)
+    parser.add_argument("--skip-naive", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Offline evaluation of the local cue filter (app/services/cue_filter.py).
+
+Runs every labelled utterance in `benchmarks/data/cue_utterances.jsonl`
+through the filter, lexicon only and lexicon + embedding prototypes, and
+reports, against the labels:
+
+- recall: cue utterances still sent to the LLM (misses are lost cues)
+- precision: share of LLM-bound utterances that really carry a cue
+- LLM calls saved: utterances answered locally instead of by gpt-4o-mini
+- latency per utterance (p50/p95)
+
+Usage (from backend/):
+    python -m benchmarks.eval_cue_filter
+    python -m benchmarks.eval_cue_filter --thresholds 0.2 0.35 0.5 --show-misses
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from app.services.cue_filter import CueFilter, _default_embed
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "cue_utterances.jsonl")
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(label, cue_filter, rows, show_misses=False):
+    times, predictions = [], []
+    for row in rows:
+        start = time.perf_counter()
+        score, _ = cue_filter.score(row["text"])
+        times.append(time.perf_counter() - start)
+        predictions.append(score >= cue_filter.threshold)
+
+    truth = np.array([row["cue"] for row in rows])
+    pred = np.array(predictions)
+    tp = int((truth & pred).sum())
+    recall = tp / max(1, truth.sum())
+    precision = tp / max(1, pred.sum())
+    saved = 1 - pred.mean()
+    ms = np.array(times) * 1000
+    print(
+        f"{label:<24} threshold {cue_filter.threshold:4.2f} | recall {recall:6.1%}  precision {precision:6.1%}"
+        f" | LLM calls saved {saved:6.1%} ({int((~pred).sum())}/{len(rows)})"
+        f" | latency p50 {np.percentile(ms, 50):6.2f} ms  p95 {np.percentile(ms, 95):6.2f} ms"
+    )
+    if show_misses:
+        for row, p in zip(rows, pred):
+            if row["cue"] and not p:
+                print(f"    missed [{row['category']}] {row['text']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.35])
+    parser.add_argument("--lexicon-only", action="store_true", help="skip the embedding stage")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    rows = load(args.data)
+    print(f"{len(rows)} utterances, {sum(r['cue'] for r in rows)} with cues")
+
+    embed = None
+    if not args.lexicon_only:
+        try:
+            _default_embed(["warm up"])
+            embed = _default_embed
+        except Exception as e:
+            print(f"(embedding model unavailable, lexicon only: {e})")
+
+    for threshold in args.thresholds:
+        evaluate("lexicon", CueFilter(threshold=threshold), rows, args.show_misses)
+        if embed:
+            evaluate("lexicon + embeddings", CueFilter(threshold=threshold, embed=embed), rows, args.show_misses)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+In-process stand-ins for the OpenAI client.
+
+They mimic the small surface the backend uses (`audio.transcriptions.create`
+and `chat.completions.create`, optionally streamed) and sleep for a configurable latency without
+blocking the event loop, so benchmarks can measure the backend itself.
+
+Chat answers carry a `usage` like the real API's: ~4 characters per token,
+and a system prompt already seen by this client counts as cached prompt
+tokens under OpenAI's prefix-caching rule (see `cacheable_tokens`).
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+CHARS_PER_TOKEN = 4
+
+# OpenAI prefix caching: prompts of at least 1024 tokens, cached in 128-token steps
+CACHE_MIN_TOKENS = 1024
+CACHE_INCREMENT_TOKENS = 128
+
+
+def cacheable_tokens(prefix_tokens):
+    """Tokens of an identical prompt prefix that can be served from the provider's cache."""
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return prefix_tokens // CACHE_INCREMENT_TOKENS * CACHE_INCREMENT_TOKENS
+
+DEFAULT_TRANSCRIPT = "I can't afford my insulin this month and I have no ride to the clinic."
+
+DEFAULT_CHAT_PAYLOAD = {
+    "detected_cues": [
+        {"category": "Economic Stability", "issue_summary": "Cannot afford insulin", "severity": "Severe"}
+    ],
+    "extracted_names": {"chw_name": "Sarah", "patient_name": "Mr. Jones"},
+    "summary": "Patient reports financial barriers to medication and transportation.",
+    "stats": {"open_ended_questions": 1, "closed_ended_questions": 1},
+    "conversation": [
+        {"speaker": "CHW", "text": "How are you managing your medication?", "cues": [],
+         "is_masked_distress": False, "is_hesitation": False},
+        {"speaker": "Patient", "text": DEFAULT_TRANSCRIPT, "cues": ["Economic Stability"],
+         "is_masked_distress": False, "is_hesitation": False},
+    ],
+}
+
+
+class _Transcriptions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        self._owner.calls["transcriptions"] += 1
+        await asyncio.sleep(self._owner.latency)
+        return SimpleNamespace(text=self._owner.transcript)
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        self._owner.calls["chat"] += 1
+        await asyncio.sleep(self._owner.latency)
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            payload = self._owner.chat_payload
+            content = json.dumps(payload(kwargs) if callable(payload) else payload, indent=2)
+        else:
+            content = "Refer the patient to a prescription assistance program. (AI-generated suggestion.)"
+
+        pieces = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        usage = self._usage(kwargs.get("messages") or [], len(pieces))
+        if kwargs.get("stream"):
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage")
+            return self._stream(pieces, usage if include_usage else None)
+        # A non-streamed answer arrives only after the whole output is generated
+        await asyncio.sleep(self._owner.token_delay * len(pieces))
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _usage(self, messages, completion_tokens):
+        prompt_tokens = sum(len(m["content"]) for m in messages) // CHARS_PER_TOKEN
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        cached = cacheable_tokens(len(system) // CHARS_PER_TOKEN) if system in self._owner.seen_prefixes else 0
+        self._owner.seen_prefixes.add(system)
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+        )
+
+    async def _stream(self, pieces, usage):
+        for piece in pieces:
+            await asyncio.sleep(self._owner.token_delay)
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        if usage is not None:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+class FakeAsyncOpenAI:
+    """
+    Async OpenAI look-alike with a fixed per-call latency.
+
+    `chat_payload` is the JSON returned for json_object requests, or a
+    callable that builds it from the request kwargs. `token_delay` adds
+    generation time per ~4-character token; `stream=True` requests yield the
+    output token by token.
+    """
+
+    def __init__(self, latency=0.5, transcript=DEFAULT_TRANSCRIPT, chat_payload=None, token_delay=0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.transcript = transcript
+        self.chat_payload = chat_payload or DEFAULT_CHAT_PAYLOAD
+        self.calls = {"transcriptions": 0, "chat": 0}
+        self.seen_prefixes = set()
+        self.audio = SimpleNamespace(transcriptions=_Transcriptions(self))
+        self.chat = SimpleNamespace(completions=_Completions(self))
@@ -0,0 +1,110 @@
+"""
+Load test: N concurrent sessions against a single uvicorn worker.
+
+Every OpenAI call is replaced by a fake that takes `--latency` seconds. If the
+handlers blocked the event loop, N sessions would take N times as long as one;
+with the async client they should finish in roughly the time of a single session.
+
+Usage (from backend/):
+    python -m benchmarks.load_concurrent_sessions --sessions 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import io
+import json
+import socket
+import threading
+import time
+
+import httpx
+import soundfile as sf
+import uvicorn
+import websockets
+
+from benchmarks.bench_pitch import synthetic_voice
+from benchmarks.fakes import FakeAsyncOpenAI
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port):
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", workers=1)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def speech_blob(seconds=3, sr=16000):
+    """A decodable 3 s WAV blob of synthetic speech, like one browser slice."""
+    y, sr, _ = synthetic_voice(seconds, sr=sr)
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+async def ws_session(port, blobs, blob):
+    """One CHW: send `blobs` audio chunks and wait for each cue message."""
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio") as ws:
+        for _ in range(blobs):
+            await ws.send(blob)
+            json.loads(await ws.recv())
+
+
+async def form_request(http):
+    response = await http.post("/extract-form-data", json={"transcript": "CHW: Hi\nPatient: Hello"})
+    response.raise_for_status()
+
+
+async def run(args):
+    from app.config.settings import settings
+    from app.main import app
+    from app.routes import stream
+
+    fake = FakeAsyncOpenAI(latency=args.latency)
+    stream.client = fake
+    # One transcription per blob, so every blob gets exactly one reply
+    settings.stream_transcription_backend = "openai"
+    settings.stream_segmentation = "blob"
+    blob = speech_blob()
+
+    port = _free_port()
+    server, thread = start_server(app, port)
+
+    try:
+        # Each /ws/audio blob costs one Whisper + one chat call.
+        ws_serial = args.sessions * args.blobs * 2 * args.latency
+        start = time.perf_counter()
+        await asyncio.gather(*(ws_session(port, args.blobs, blob) for _ in range(args.sessions)))
+        ws_wall = time.perf_counter() - start
+
+        http_serial = args.sessions * args.latency
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(form_request(http) for _ in range(args.sessions)))
+            http_wall = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"Sessions: {args.sessions}  Fake latency: {args.latency:.2f}s  OpenAI calls: {fake.calls}")
+    print(f"/ws/audio           wall {ws_wall:6.2f}s  serialized {ws_serial:6.2f}s  speedup x{ws_serial / ws_wall:.1f}")
+    print(f"/extract-form-data  wall {http_wall:6.2f}s  serialized {http_serial:6.2f}s  speedup x{http_serial / http_wall:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--blobs", type=int, default=3, help="audio blobs per WebSocket session")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake OpenAI call")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
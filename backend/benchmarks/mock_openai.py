@@ -0,0 +1,284 @@
+"""
+Local mock of the OpenAI API, for testing the backend against slow and failing responses.
+
+Serves `POST /v1/chat/completions` (JSON or SSE stream, with `usage`) and
+`POST /v1/audio/transcriptions`. Chat answers are canned per system prompt
+from the prompt registry, so every backend call site gets a well-formed
+payload. Analysis prompts diarize the transcript sentence by sentence.
+
+Each request can be made to fail, checked in this order:
+    --hang-rate        no answer for --hang-seconds (a hung connection)
+    --error-rate       HTTP 500
+    --rate-limit-rate  HTTP 429 with Retry-After: --retry-after
+    --slow-rate        answers after --slow-seconds instead of --latency (+ --jitter)
+Change the behaviour at runtime with `POST /mock/config` (same names, JSON,
+underscores) and read request counts by outcome from `GET /mock/stats`.
+Transcriptions return `transcript`, unless `transcripts` (set through
+/mock/config: {audio SHA-256: text}) has an entry for the uploaded audio, so
+each recording of a replayed corpus keeps its own transcript.
+
+Usage (from backend/):
+    python -m benchmarks.mock_openai --port 8100 --error-rate 0.1 --slow-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+
+import soundfile as sf
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services import prompts
+from app.services.transcript_chunks import split_sentences
+from benchmarks.fakes import CHARS_PER_TOKEN, DEFAULT_TRANSCRIPT, cacheable_tokens
+
+MOCK_CONFIG = {
+    "latency": 0.3,
+    "jitter": 0.1,
+    "token_delay": 0.0,  # seconds per streamed token
+    "slow_rate": 0.0,
+    "slow_seconds": 10.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "retry_after": 1.0,
+    "hang_rate": 0.0,
+    "hang_seconds": 600.0,
+    "transcript": DEFAULT_TRANSCRIPT,
+    "transcripts": {},  # audio SHA-256 -> transcript; set through /mock/config only
+}
+STATS = Counter()
+
+CUE_WORDS = {
+    "Economic Stability": r"afford|money|rent|bill|job|pay",
+    "Health Care": r"insurance|medication|insulin|refill|doctor|clinic|pharmacy",
+    "Environment": r"bus|ride|transport|mold|neighborhood",
+    "Social Context": r"alone|lonely|nobody|family",
+}
+FORM_ANSWER = {
+    "patientName": "Mr. Jones",
+    "topics": ["Medication use and adherence", "Transportation needs"],
+    "referrals": ["Transportation program"],
+    "risks": ["Unmet medication needs"],
+    "stageOfChange": ["Patient is thinking about making changes."],
+    "patientGoals": "Get refills on time",
+    "confidence": "3",
+    "chwNotes": "Patient reports cost and transport barriers.",
+    "followUpPlan": "Call next week about the ride program.",
+}
+
+app = FastAPI()
+_seen_prefixes = set()
+
+
+def configure(**changes):
+    unknown = set(changes) - set(MOCK_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown mock settings: {sorted(unknown)}")
+    MOCK_CONFIG.update(changes)
+
+
+def _cues(text):
+    return [category for category, pattern in CUE_WORDS.items() if re.search(pattern, text, re.I)]
+
+
+def _diarize(text):
+    turns = []
+    for i, sentence in enumerate(split_sentences(text)):
+        speaker = "CHW" if sentence.endswith("?") or i == 0 else "Patient"
+        cues = _cues(sentence) if speaker == "Patient" else []
+        turns.append({"speaker": speaker, "text": sentence, "cues": cues,
+                      "is_masked_distress": False, "is_hesitation": False})
+    return turns
+
+
+def _section(user, heading):
+    return user.split(heading, 1)[1] if heading in user else user
+
+
+def _analysis(user, heading="RAW TRANSCRIPT:\n"):
+    conversation = _diarize(_section(user, heading))
+    questions = sum(turn["text"].endswith("?") for turn in conversation)
+    return {
+        "extracted_names": {"chw_name": "Sarah", "patient_name": "Mr. Jones"},
+        "summary": "Patient reports barriers to medication and transportation.",
+        "stats": {"open_ended_questions": questions, "closed_ended_questions": 0},
+        "conversation": conversation,
+    }
+
+
+def _realtime(statement):
+    statement = _section(statement, "Current Statement:\n")
+    return [{"category": category, "issue_summary": f"{category} concern", "severity": "Moderate"}
+            for category in _cues(statement)]
+
+
+def answer(messages):
+    """Canned content for a chat request, chosen by its system prompt."""
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    user = messages[-1]["content"] if messages else ""
+    if system == prompts.SYSTEM_PROMPT_RAG:
+        return "Refer the patient to a prescription assistance program. (AI-generated suggestion; not medical advice.)"
+    if system == prompts.REALTIME_SYSTEM_PROMPT:
+        data = {"detected_cues": _realtime(user)}
+    elif system == prompts.REALTIME_BATCH_SYSTEM_PROMPT:
+        items = re.split(r"### Item (\d+)\n", user)[1:]
+        data = {"results": [{"id": int(items[i]), "detected_cues": _realtime(items[i + 1])}
+                            for i in range(0, len(items), 2)]}
+    elif system == prompts.SYSTEM_PROMPT_COMBINED:
+        data = {"analysis": _analysis(user), "encounter_form": FORM_ANSWER}
+    elif system == prompts.SYSTEM_PROMPT_FORM:
+        data = FORM_ANSWER
+    elif system == prompts.SYSTEM_PROMPT_CHUNK:
+        data = {**_analysis(user, "CURRENT PART:\n"), "notes": "Discussed medication cost and access."}
+        data.pop("summary")
+    elif system == prompts.SYSTEM_PROMPT_REDUCE:
+        data = {"summary": "Patient reports barriers to medication and transportation across the visit."}
+    else:
+        data = _analysis(user)
+    return json.dumps(data, indent=2)
+
+
+def _usage(messages, content):
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    cached = cacheable_tokens(len(system) // CHARS_PER_TOKEN) if system in _seen_prefixes else 0
+    _seen_prefixes.add(system)
+    completion_tokens = len(content) // CHARS_PER_TOKEN
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached},
+    }
+
+
+def _error(status, message, headers=None):
+    return JSONResponse(status_code=status, headers=headers,
+                        content={"error": {"message": message, "type": "mock_error", "code": None}})
+
+
+async def _inject(kind):
+    """A failure response (or a long wait) picked by the configured rates; None to answer normally."""
+    config = MOCK_CONFIG
+    roll = random.random()
+    for outcome, rate in (("hang", config["hang_rate"]), ("error", config["error_rate"]),
+                          ("rate_limited", config["rate_limit_rate"])):
+        if roll < rate:
+            STATS[f"{kind}_{outcome}"] += 1
+            if outcome == "hang":
+                await asyncio.sleep(config["hang_seconds"])
+                return _error(504, "mock hang")
+            if outcome == "error":
+                await asyncio.sleep(config["latency"] + random.uniform(0, config["jitter"]))
+                return _error(500, "mock server error")
+            return _error(429, "mock rate limit", headers={"Retry-After": str(config["retry_after"])})
+        roll -= rate
+
+    if random.random() < config["slow_rate"]:
+        STATS[f"{kind}_slow"] += 1
+        await asyncio.sleep(config["slow_seconds"])
+    else:
+        STATS[f"{kind}_ok"] += 1
+        await asyncio.sleep(config["latency"] + random.uniform(0, config["jitter"]))
+    return None
+
+
+async def _stream_chunks(completion_id, model, content, usage, include_usage):
+    def chunk(**fields):
+        return "data: " + json.dumps({"id": completion_id, "object": "chat.completion.chunk",
+                                      "created": int(time.time()), "model": model, **fields}) + "\n\n"
+
+    for i in range(0, len(content), CHARS_PER_TOKEN):
+        if MOCK_CONFIG["token_delay"]:
+            await asyncio.sleep(MOCK_CONFIG["token_delay"])
+        piece = content[i:i + CHARS_PER_TOKEN]
+        yield chunk(choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+    yield chunk(choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if include_usage:
+        yield chunk(choices=[], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    failure = await _inject("chat")
+    if failure is not None:
+        return failure
+
+    messages = body.get("messages") or []
+    content = answer(messages)
+    usage = _usage(messages, content)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = body.get("model", "gpt-4o")
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(_stream_chunks(completion_id, model, content, usage, include_usage),
+                                 media_type="text/event-stream")
+
+    if MOCK_CONFIG["token_delay"]:
+        await asyncio.sleep(MOCK_CONFIG["token_delay"] * usage["completion_tokens"])
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    form = await request.form()
+    audio = await form["file"].read()
+    failure = await _inject("transcription")
+    if failure is not None:
+        return failure
+    try:
+        seconds = sf.info(io.BytesIO(audio)).duration
+    except Exception:
+        seconds = 0.0
+    text = MOCK_CONFIG["transcripts"].get(hashlib.sha256(audio).hexdigest(), MOCK_CONFIG["transcript"])
+    return {"text": text, "usage": {"type": "duration", "seconds": round(seconds, 2)}}
+
+
+@app.post("/mock/config")
+async def update_config(request: Request):
+    try:
+        configure(**await request.json())
+    except ValueError as e:
+        return _error(400, str(e))
+    return MOCK_CONFIG
+
+
+@app.get("/mock/stats")
+async def mock_stats():
+    return dict(STATS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    for key, value in MOCK_CONFIG.items():
+        if isinstance(value, dict):
+            continue
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    configure(**args)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,35 @@
-import chromadb
+import argparse
+import hashlib
+import os
 import re
-import chromadb.errors
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
 
-# 1. SETUP CLIENT
-client = chromadb.PersistentClient(path="./chw_sentence_db")
+import chromadb
+import chromadb.errors
 
-# Try to delete, but ignore the error if it doesn't exist
-try:
-    client.delete_collection(name="chw_sentences")
-except chromadb.errors.NotFoundError: # <--- CATCH THE CORRECT ERROR
-    print("Collection didn't exist yet, creating new one...")
-except ValueError:
-    # Older versions of Chroma sometimes raised ValueError, keeping this for safety
-    pass
+DB_PATH = "./chw_sentence_db"
+COLLECTION_NAME = "chw_sentences"
+GUIDE_PATH = "chw_guide.txt"
+BATCH_SIZE = 128
+DOCUMENT_PATTERNS = ("*.txt", "*.md")
 
-collection = client.create_collection(name="chw_sentences")
+# Display names for documents whose label predates per-file sources.
+SOURCE_LABELS = {
+    "chw_guide.txt": "CHW Guide",
+}
 
-# 2. HELPER FUNCTIONS
+# 1. HELPER FUNCTIONS
 
 def clean_text(text):
     """Removes page markers and excessive whitespace."""
     # Remove lines like "--- PAGE 1 ---"
     text = re.sub(r'--- PAGE \d+ ---', '', text)
     # Remove citation tags if you don't want them e.g. (Optional)
-    # text = re.sub(r'\[cite_.*?\]', '', text) 
+    # text = re.sub(r'\[cite_.*?\]', '', text)
     return text.strip()
 
 def split_into_sentences(text):
@@ -32,7 +38,7 @@ def split_into_sentences(text):
     Look for punctuation (.!?) followed by whitespace or end of string.
     """
     # This pattern looks for . ! ? followed by a space and an uppercase letter, or end of string.
-    # It avoids splitting on common abbreviations like 'Dr.' or 'Mr.' is harder without NLTK, 
+    # It avoids splitting on common abbreviations like 'Dr.' or 'Mr.' is harder without NLTK,
     # but this simple regex works well for structured text.
     sentences = re.split(r'(?<=[.!?])\s+', text)
     return [s.strip() for s in sentences if len(s) > 10]
@@ -46,75 +52,260 @@ def create_sliding_windows(sentences, window_size=3):
     if len(sentences) < window_size:
         # If section is too short, just take what we have
         return [" ".join(sentences)]
-    
+
     for i in range(len(sentences) - window_size + 1):
         # Create a chunk of 3 sentences
         window = sentences[i : i + window_size]
         windows.append(" ".join(window))
-    
+
     return windows
 
-# 3. PROCESSING PIPELINE
+def window_id(key, chapter, window):
+    """
+    Content-hash id for a window of the document `key` (its relative path).
+    The same text in the same chapter of the same file always gets the same
+    id, so unchanged windows are recognised on the next run.
+    """
+    digest = hashlib.sha256(f"{key}\x1f{chapter}\x1f{window}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def build_windows(full_text, source="CHW Guide", document=None, key=None):
+    """
+    Returns (ids, documents, metadatas) for every 3-sentence window in the text.
+    `key` (default: `source`) identifies the document in ids and pruning.
+    """
+    key = key or source
+    # Step A: Split by Chapter first so we can attach the Chapter Title to every sentence chunk
+    chapter_chunks = full_text.split("*** CHAPTER")
+
+    final_documents = []
+    final_metadatas = []
+    final_ids = []
+    seen = set()
+
+    for chunk in chapter_chunks:
+        if len(chunk.strip()) < 10:
+            continue
+
+        # Extract Title (First line)
+        clean_chunk = clean_text(chunk)
+        lines = clean_chunk.split('\n')
+        # Usually the first non-empty line after splitting is the title or number
+        chapter_title = lines[0].strip().replace(':', '').strip()
 
-# Assumption: You have the text saved in 'chw_guide.txt'
-try:
-    with open("chw_guide.txt", "r", encoding="utf-8") as f:
+        # Step B: Get all sentences in this chapter
+        # We join lines first to handle sentences that wrap across lines
+        chapter_body = " ".join(lines)
+        sentences = split_into_sentences(chapter_body)
+
+        # Step C: Create 3-sentence windows
+        windows = create_sliding_windows(sentences, window_size=3)
+
+        for window in windows:
+            doc_id = window_id(key, chapter_title, window)
+            if doc_id in seen:
+                # Repeated boilerplate inside a chapter; one copy is enough
+                continue
+            seen.add(doc_id)
+            final_documents.append(window)
+            final_metadatas.append({
+                "source": source,
+                "document": document or source,
+                "path": key,
+                "chapter": chapter_title
+            })
+            final_ids.append(doc_id)
+
+    return final_ids, final_documents, final_metadatas
+
+def source_label(path):
+    """Metadata `source` for a document: a legacy label or the file stem."""
+    path = Path(path)
+    return SOURCE_LABELS.get(path.name, path.stem)
+
+def document_key(path, root=None):
+    """
+    A document's identity in the collection: its path relative to `root` (the
+    database directory's parent; default: the working directory), so
+    same-named files in different folders never collide and the key doesn't
+    depend on where the script is run from.
+    """
+    return Path(os.path.relpath(Path(path).resolve(), Path(root or os.getcwd()).resolve())).as_posix()
+
+def chunk_document(path, root=None):
+    """
+    Read and window one document. Runs in a worker process, so only the
+    documents currently being chunked are held in memory.
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
         full_text = f.read()
-except FileNotFoundError:
-    print("Please save your text to 'chw_guide.txt' first.")
-    exit()
-
-# Step A: Split by Chapter first so we can attach the Chapter Title to every sentence chunk
-chapter_chunks = full_text.split("*** CHAPTER")
-
-final_documents = []
-final_metadatas = []
-final_ids = []
-
-global_counter = 0
-
-for chunk in chapter_chunks:
-    if len(chunk.strip()) < 10: 
-        continue
-
-    # Extract Title (First line)
-    clean_chunk = clean_text(chunk)
-    lines = clean_chunk.split('\n')
-    # Usually the first non-empty line after splitting is the title or number
-    chapter_title = lines[0].strip().replace(':', '').strip()
-    
-    # Step B: Get all sentences in this chapter
-    # We join lines first to handle sentences that wrap across lines
-    chapter_body = " ".join(lines)
-    sentences = split_into_sentences(chapter_body)
-    
-    # Step C: Create 3-sentence windows
-    windows = create_sliding_windows(sentences, window_size=3)
-    
-    for window in windows:
-        final_documents.append(window)
-        final_metadatas.append({
-            "source": "CHW Guide",
-            "chapter": chapter_title
-        })
-        final_ids.append(f"id_{global_counter}")
-        global_counter += 1
-
-print(f"Generated {len(final_documents)} chunks (3-sentence windows).")
-print("Adding to ChromaDB...")
-
-# 4. ADD TO CHROMA
-# We process in batches to be safe, though Chroma handles large lists well now.
-collection.add(
-    documents=final_documents,
-    metadatas=final_metadatas,
-    ids=final_ids
-)
-
-print("Data added successfully!")
-print("-" * 30)
-
-# # 5. RETRIEVAL TEST
+    ids, documents, metadatas = build_windows(full_text, source=source_label(path), document=path.name,
+                                              key=document_key(path, root))
+    return str(path), ids, documents, metadatas
+
+def iter_documents(paths):
+    """Yield document files from a mix of files and directories (recursively)."""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            for pattern in DOCUMENT_PATTERNS:
+                yield from sorted(path.rglob(pattern))
+        else:
+            yield path
+
+def fetch_existing_documents(collection, page_size=5000):
+    """
+    Map of every stored id to its document's (`path`, `source`) metadata (no
+    embeddings loaded). Windows indexed before paths were stored have no `path`.
+    """
+    existing = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            metadata = metadata or {}
+            existing[doc_id] = (metadata.get("path"), metadata.get("source"))
+        if len(page["ids"]) < page_size:
+            return existing
+        offset += page_size
+
+def _embed_batch(embedding_function, ids, documents, metadatas):
+    return ids, documents, metadatas, embedding_function(documents)
+
+def ingest(collection, paths, workers=None, embed_workers=2, batch_size=BATCH_SIZE,
+           prune=False, embedding_function=None, root=None):
+    """
+    Index many documents into the collection in one pass.
+
+    Documents are chunked in a process pool as they are read. Windows that are
+    not stored yet are embedded in parallel batches on a thread pool and upserted
+    as each batch finishes, so every committed batch survives a crash. Windows
+    that disappeared from an indexed document are deleted at the end; with
+    `prune`, documents that are no longer present at all are removed too.
+    Documents are keyed by their path relative to `root` (see `document_key`).
+
+    Returns a stats dict (documents, windows, embedded, deleted, timings).
+    """
+    if embedding_function is None:
+        from chromadb.utils import embedding_functions
+        embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+    existing = fetch_existing_documents(collection)
+    wanted = set()
+    indexed_paths = set()
+    indexed_sources = set()
+    stats = {"documents": 0, "windows": 0, "embedded": 0, "deleted": 0}
+
+    start = time.perf_counter()
+    in_flight = deque()
+    max_in_flight = max(1, embed_workers) * 2
+
+    def upsert_oldest():
+        ids, documents, metadatas, embeddings = in_flight.popleft().result()
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        stats["embedded"] += len(ids)
+        elapsed = time.perf_counter() - start
+        print(f"  Embedded {stats['embedded']} windows ({stats['embedded'] / max(elapsed, 1e-9):.1f} windows/sec)")
+
+    with ProcessPoolExecutor(max_workers=workers) as chunk_pool, \
+            ThreadPoolExecutor(max_workers=max(1, embed_workers)) as embed_pool:
+        chunked = chunk_pool.map(partial(chunk_document, root=root), iter_documents(paths))
+        for path, ids, documents, metadatas in chunked:
+            stats["documents"] += 1
+            stats["windows"] += len(ids)
+            if metadatas:
+                indexed_paths.add(metadatas[0]["path"])
+                indexed_sources.add(metadatas[0]["source"])
+
+            pending = [i for i, doc_id in enumerate(ids) if doc_id not in existing and doc_id not in wanted]
+            wanted.update(ids)
+            print(f"{path}: {len(ids)} windows, {len(pending)} to embed")
+
+            for done in range(0, len(pending), batch_size):
+                batch = pending[done : done + batch_size]
+                in_flight.append(embed_pool.submit(
+                    _embed_batch,
+                    embedding_function,
+                    [ids[i] for i in batch],
+                    [documents[i] for i in batch],
+                    [metadatas[i] for i in batch],
+                ))
+                if len(in_flight) >= max_in_flight:
+                    upsert_oldest()
+
+        while in_flight:
+            upsert_oldest()
+
+    stats["chunk_embed_seconds"] = time.perf_counter() - start
+
+    # Windows of re-indexed files that are gone; legacy windows (no path) go by source label
+    stale = sorted(
+        doc_id for doc_id, (path, source) in existing.items()
+        if doc_id not in wanted
+        and (prune or path in indexed_paths or (path is None and source in indexed_sources))
+    )
+    for done in range(0, len(stale), batch_size):
+        collection.delete(ids=stale[done : done + batch_size])
+    stats["deleted"] = len(stale)
+    stats["total_seconds"] = time.perf_counter() - start
+    return stats
+
+# 2. PROCESSING PIPELINE
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index CHW protocol documents into ChromaDB (incremental, multi-source)."
+    )
+    parser.add_argument("paths", nargs="*", default=[GUIDE_PATH],
+                        help="Document files or directories of .txt/.md files (default: chw_guide.txt)")
+    parser.add_argument("--db", default=DB_PATH, help="ChromaDB directory (default: ./chw_sentence_db)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Windows embedded per batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Chunking processes")
+    parser.add_argument("--embed-workers", type=int, default=2, help="Parallel embedding batches")
+    parser.add_argument("--prune", action="store_true",
+                        help="Also delete documents that are no longer among the given paths")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the collection and re-embed everything")
+    args = parser.parse_args()
+
+    missing = [p for p in args.paths if not Path(p).exists()]
+    if missing:
+        print(f"Please save your text to {', '.join(missing)} first.")
+        raise SystemExit(1)
+
+    # SETUP CLIENT
+    client = chromadb.PersistentClient(path=args.db)
+
+    if args.rebuild:
+        try:
+            client.delete_collection(name=COLLECTION_NAME)
+        except (chromadb.errors.NotFoundError, ValueError):
+            # Older versions of Chroma raised ValueError for a missing collection
+            pass
+
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    stats = ingest(
+        collection,
+        args.paths,
+        workers=args.workers,
+        embed_workers=args.embed_workers,
+        batch_size=args.batch_size,
+        prune=args.prune,
+        root=Path(args.db).resolve().parent,
+    )
+
+    print("-" * 30)
+    print(f"Documents: {stats['documents']}  Windows: {stats['windows']}  "
+          f"Embedded: {stats['embedded']}  Deleted: {stats['deleted']}")
+    print(f"Throughput: {stats['windows'] / max(stats['chunk_embed_seconds'], 1e-9):.1f} windows/sec "
+          f"({stats['total_seconds']:.1f}s total)")
+    print("Collection is up to date!")
+
+if __name__ == "__main__":
+    main()
+
+# # 3. RETRIEVAL TEST
 # query = "How should a CHW handle a client who is ambivalent about change?"
 
 # print(f"Query: '{query}'\n")
@@ -0,0 +1,90 @@
+"""
+Export many session reports at once, without the server (same pipeline as POST /reports/bulk).
+
+Sessions can be given as session ids, upload digests, saved form files
+(forms/SESS-123456.json, named after their session) or JSON files that hold
+a session's dashboard data (an /upload-full-audio response or its `data`).
+Solutions come from the RAG solution cache and, when OPENAI_API_KEY is set,
+from the OpenAI API; otherwise uncached complaints get the fallback text.
+
+Usage (from backend/):
+    python export_reports.py SESS-123456 SESS-654321 -o reports.zip
+    python export_reports.py forms/*.json --format pdf -o week.pdf
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from app.services.bulk_export import FORMATS, export_reports, resolve_sessions, session_ref
+from app.services.llm_client import ResilientOpenAI
+from app.services.report_jobs import shutdown_report_pool, start_report_pool
+from app.services.session_store import session_store
+from app.services.solution_cache import solution_cache
+
+
+def _session_file(path):
+    """Dashboard data stored in a JSON file, or None if it is not one (e.g. a saved form)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data = data.get("data", data) if isinstance(data, dict) else None
+    return data if isinstance(data, dict) and data.get("conversation") else None
+
+
+def collect_sources(refs):
+    sources, session_refs = [], []
+    for ref in refs:
+        data = _session_file(ref) if os.path.isfile(ref) else None
+        if data is not None:
+            name = (data.get("metadata") or {}).get("session_id") or session_ref(ref)
+            sources.append((name, lambda path=ref: _session_file(path)))
+        else:
+            session_refs.append(session_ref(ref))
+    resolved, missing = resolve_sessions(session_refs)
+    return sources + resolved, missing
+
+
+async def run(args):
+    load_dotenv()
+    client = ResilientOpenAI(AsyncOpenAI(max_retries=0)) if os.getenv("OPENAI_API_KEY") else None
+    if client is None:
+        print("⚠️ OPENAI_API_KEY not set: using cached solutions only.")
+
+    sources, missing = collect_sources(args.sessions)
+    for ref in missing:
+        print(f"⚠️ Not found in the session store or upload cache: {ref}")
+    if not sources:
+        raise SystemExit("No sessions to export.")
+
+    await asyncio.to_thread(solution_cache.load)
+    start_report_pool()
+    start = time.perf_counter()
+    written = 0
+    try:
+        with open(args.output, "wb") as f:
+            async for chunk in export_reports(client, sources, args.format, missing):
+                f.write(chunk)
+                written += len(chunk)
+    finally:
+        shutdown_report_pool()
+        solution_cache.save()
+        session_store.close()
+    print(f"✅ {args.output}: {len(sources)} sessions, {written / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sessions", nargs="+", help="session ids, upload digests, saved form files or session JSON files")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="zip")
+    parser.add_argument("-o", "--output", help="output file (default: reports.<format>)")
+    args = parser.parse_args()
+    args.output = args.output or f"reports.{args.format}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
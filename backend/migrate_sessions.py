@@ -0,0 +1,133 @@
+"""
+Import existing files into the session store (SESSION_DB_PATH).
+
+    recorded_sessions/*   audio uploads: one session each (id and times from
+                          the file name, as /upload-full-audio does), linked to
+                          its upload cache entry by content hash
+    upload cache          every stored `final` result: the session's dashboard
+                          data, patient/CHW names and SDOH cues
+    forms/*.json          encounter forms saved by /save-form
+    REPORT_STORE_DIR      saved report PDFs
+
+Safe to run more than once: rows are upserted, nothing is deleted or moved.
+
+Usage (from backend/):
+    python migrate_sessions.py
+    python migrate_sessions.py --forms-dir ./forms --audio-dir recorded_sessions --db ./aurion_sessions.db
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from app.config.settings import settings
+from app.services.result_cache import upload_cache
+from app.services.session_store import SessionStore
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, the same digest /upload-full-audio caches results under."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def import_audio(store, audio_dir):
+    """Returns {upload digest: (session_id, audio path)}."""
+    from app.routes.stream import get_session_time_data
+
+    audio = {}
+    if not os.path.isdir(audio_dir):
+        return audio
+    for name in sorted(os.listdir(audio_dir)):
+        path = os.path.join(audio_dir, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        digest = file_digest(path)
+        time_meta = get_session_time_data(name, 0)
+        session_id = time_meta["session_id"]
+        if session_id == "Unknown":
+            session_id = f"upload-{digest[:12]}"
+        # Times only; the end time needs the duration, which the cached result has
+        store.save_session(session_id, {"metadata": {"date": time_meta["date"], "start_time": time_meta["start_time"]}},
+                           upload_digest=digest, audio_path=f"recorded_sessions/{name}")
+        audio[digest] = (session_id, f"recorded_sessions/{name}")
+    return audio
+
+
+def import_results(store, audio):
+    count = 0
+    for entry in sorted(upload_cache.entries(), key=lambda e: e["modified"]):
+        if "final" not in entry["stages"]:
+            continue
+        data = upload_cache.get(entry["digest"], "final")
+        if not data:
+            continue
+        session_id = (data.get("metadata") or {}).get("session_id")
+        linked_id, audio_path = audio.get(entry["digest"], (None, None))
+        if not session_id or session_id == "Unknown":
+            session_id = linked_id or f"upload-{entry['digest'][:12]}"
+        store.save_session(session_id, data, upload_digest=entry["digest"], audio_path=audio_path)
+        count += 1
+    return count
+
+
+def import_forms(store, forms_dir):
+    count = 0
+    if not os.path.isdir(forms_dir):
+        return count
+    for name in sorted(os.listdir(forms_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(forms_dir, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping {name}: {e}")
+            continue
+        if isinstance(data, dict):
+            store.save_form(name[:-5], data)
+            count += 1
+    return count
+
+
+def import_reports(store, reports_dir):
+    count = 0
+    if not reports_dir or not os.path.isdir(reports_dir):
+        return count
+    for name in sorted(os.listdir(reports_dir)):
+        path = os.path.join(reports_dir, name)
+        if name.endswith(".pdf") and os.path.isfile(path):
+            store.add_report(name[:-4], path, os.path.getsize(path))
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=settings.session_db_path)
+    parser.add_argument("--forms-dir", default="./forms")
+    parser.add_argument("--audio-dir", default="recorded_sessions")
+    parser.add_argument("--reports-dir", default=settings.report_store_dir, help="default: REPORT_STORE_DIR")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = SessionStore(args.db, batch_size=settings.session_store_batch_size).open()
+    try:
+        audio = import_audio(store, args.audio_dir)
+        print(f"🔊 {len(audio)} recordings from {args.audio_dir}")
+        print(f"🧠 {import_results(store, audio)} analysed sessions from {upload_cache.root}")
+        print(f"📝 {import_forms(store, args.forms_dir)} forms from {args.forms_dir}")
+        print(f"📄 {import_reports(store, args.reports_dir)} reports from {args.reports_dir or '(REPORT_STORE_DIR not set)'}")
+        store.flush()
+        counts = store.counts()
+    finally:
+        store.close()
+    print(f"✅ {args.db}: {counts} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
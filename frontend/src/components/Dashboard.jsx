@@ -126,7 +126,7 @@ const Dashboard = () => {
         const response = await fetch("http://localhost:8000/extract-form-data", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ transcript: transcriptText })
+            body: JSON.stringify({ transcript: transcriptText, session_id: data?.metadata?.session_id })
         });
 
         if (response.ok) {
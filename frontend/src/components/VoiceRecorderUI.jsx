@@ -167,9 +167,10 @@ const VoiceRecorderUI = () => {
             const message = JSON.parse(event.data);
             if (message.type === "health_analysis") {
                 const newCuesWithIds = message.payload.detected_cues.map(c => ({
-                    ...c, id: Date.now() + Math.random() 
+                    ...c, id: Date.now() + Math.random(), seq: message.seq ?? 0
                 }));
-                setCues((prev) => [...newCuesWithIds, ...prev]);
+                // Newest utterance first, even if messages arrive out of order
+                setCues((prev) => [...newCuesWithIds, ...prev].sort((a, b) => b.seq - a.seq));
                 // Auto-remove alert after 5 seconds
                 newCuesWithIds.forEach(cue => {
                     setTimeout(() => {